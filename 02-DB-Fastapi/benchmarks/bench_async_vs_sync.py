@@ -0,0 +1,163 @@
+"""
+Compare the sync routers (threadpool) with the async routers (aiosqlite)
+under high concurrency.
+
+Each mode runs in its own subprocess because USE_ASYNC_DB is read when
+the app and its engines are first configured. The app is driven in-process through httpx's
+ASGI transport, so the numbers measure the app, not a network stack.
+
+Usage (from 02-DB-Fastapi):
+    python benchmarks/bench_async_vs_sync.py --concurrency 200 --requests 5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+# Endpoints hit round-robin by every worker; {id} is filled with a seeded blog
+ENDPOINTS = [
+    ("GET", "/blog/?limit=20", False),
+    ("GET", "/blog/{id}", False),
+    ("GET", "/blog/my-blogs?limit=20", True),
+    ("GET", "/user/me?limit=20", True),
+]
+
+
+def seed(blog_count: int) -> str:
+    """Create one user with blog_count blogs and return a bearer token for it."""
+    import database
+    import models
+    import jwt_token
+    from hashing import Hash
+
+    db = database.SessionLocal()
+    try:
+        user = models.User(
+            name="bench", email="bench@example.com", password=Hash.bcrypt("bench")
+        )
+        db.add(user)
+        db.flush()
+        db.add_all(
+            models.Blog(title=f"title {i}", body="lorem ipsum " * 50, user_id=user.id)
+            for i in range(blog_count)
+        )
+        db.commit()
+        return jwt_token.create_access_token({"sub": user.email, "user_id": user.id})
+    finally:
+        db.close()
+
+
+async def drive(app, token: str, blog_count: int, total: int, concurrency: int):
+    import httpx
+
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker(client):
+        nonlocal errors
+        for n in counter:
+            method, path, auth = ENDPOINTS[n % len(ENDPOINTS)]
+            path = path.format(id=n % blog_count + 1)
+            start = time.perf_counter()
+            response = await client.request(
+                method, path, headers=headers if auth else None
+            )
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def run_app(args, token: str) -> dict:
+    import database
+    import main
+
+    try:
+        return await drive(main.app, token, args.blogs, args.requests, args.concurrency)
+    finally:
+        # httpx's ASGI transport skips lifespan, so close aiosqlite threads here
+        await database.dispose()
+
+
+def run_child(args) -> None:
+    sys.path.insert(0, str(APP_DIR))
+    import migrations
+
+    migrations.upgrade()
+
+    token = seed(args.blogs)
+    print(json.dumps(asyncio.run(run_app(args, token))))
+
+
+def run_mode(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+            USE_ASYNC_DB="1" if mode == "async" else "0",
+        )
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", *sys.argv[1:]],
+            env=env,
+            cwd=APP_DIR,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--blogs", type=int, default=1000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    print(
+        f"{args.requests} requests, concurrency {args.concurrency}, "
+        f"{args.blogs} blogs"
+    )
+    print(f"{'mode':<6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for mode in ("sync", "async"):
+        r = run_mode(mode, args)
+        print(
+            f"{mode:<6} {r['req_per_s']:>9.1f} {r['p50_ms']:>9.2f} "
+            f"{r['p99_ms']:>9.2f} {r['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
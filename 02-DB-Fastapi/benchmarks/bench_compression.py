@@ -0,0 +1,101 @@
+"""
+CPU cost versus bytes saved when compressing blog list responses.
+
+Pages are built like GET /blog/ builds them (fast_json.dump_blog_page over
+ShowBlog rows) with prose-like bodies drawn from a fixed vocabulary, then
+encoded with the same encoders CompressionMiddleware uses at several levels.
+Rows marked * are the middleware defaults.
+
+Usage (from 02-DB-Fastapi):
+    python benchmarks/bench_compression.py --page-sizes 20 100 --rounds 50
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import compression  # noqa: E402
+import fast_json  # noqa: E402
+import models  # noqa: E402
+
+WORDS = (
+    "the of and to in is for on with as by at from this that it be are was "
+    "fastapi python database query index cache request response latency page "
+    "blog post author user token session engine pool thread async await sqlite "
+    "performance benchmark throughput memory network server client json schema"
+).split()
+
+
+def make_page(blog_count: int, seed: int = 7) -> bytes:
+    """JSON body of one GET /blog/ page with blog_count blogs."""
+    rng = random.Random(seed)
+    authors = [
+        models.User(id=i, name=f"Author {i}", email=f"author{i}@example.com")
+        for i in range(1, 11)
+    ]
+    items = [
+        models.Blog(
+            id=i,
+            title=" ".join(rng.choices(WORDS, k=6)).capitalize(),
+            body=" ".join(rng.choices(WORDS, k=rng.randint(80, 200))) + ".",
+            user=rng.choice(authors),
+        )
+        for i in range(1, blog_count + 1)
+    ]
+    page = {"items": items, "next_cursor": "aWQ6MTAwMA"}
+    return fast_json.FastJSONResponse(fast_json.dump_blog_page(page)).body
+
+
+def encoders():
+    for level in (1, 4, 6, 9):
+        default = level == compression.COMPRESSION_GZIP_LEVEL
+        yield f"gzip {level}{' *' if default else ''}", lambda level=level: (
+            compression._GzipEncoder(level)
+        )
+    if compression.brotli is None:
+        return
+    for quality in (1, 4, 6, 11):
+        default = quality == compression.COMPRESSION_BROTLI_QUALITY
+        yield f"br {quality}{' *' if default else ''}", lambda quality=quality: (
+            compression._BrotliEncoder(quality)
+        )
+
+
+def measure(make_encoder, body: bytes, rounds: int):
+    started = time.process_time()
+    for _ in range(rounds):
+        encoded = make_encoder().compress(body, final=True)
+    cpu = (time.process_time() - started) / rounds
+    return len(encoded), cpu
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[20, 100])
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    if compression.brotli is None:
+        print("brotli not installed (pip install .[compression]); gzip only")
+    for blog_count in args.page_sizes:
+        body = make_page(blog_count)
+        print(f"\n{blog_count} blogs per page, {len(body) / 1024:.1f} KiB of JSON")
+        print(
+            f"{'encoding':<10} {'bytes':>9} {'saved':>7} {'CPU ms':>8} "
+            f"{'MB/s':>8} {'KiB saved / CPU ms':>19}"
+        )
+        for name, make_encoder in encoders():
+            size, cpu = measure(make_encoder, body, args.rounds)
+            saved = len(body) - size
+            print(
+                f"{name:<10} {size:>9} {saved / len(body):>7.1%} {cpu * 1000:>8.3f} "
+                f"{len(body) / cpu / 1e6:>8.1f} {saved / 1024 / (cpu * 1000):>19.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Measure blog-creation throughput and latency with and without group commit.
+
+Every run is a fresh subprocess (GROUP_COMMIT and the window are read at
+import time) that fires concurrent POST /blog/ requests through httpx's
+ASGI transport. Group commit trades a little latency (up to the window)
+for far fewer commits; the gap grows with the cost of a commit, so also
+try --profile default (synchronous=FULL).
+
+Usage (from 02-DB-Fastapi):
+    python benchmarks/bench_group_commit.py --concurrency 64 --requests 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench_async_vs_sync import seed
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+# (label, GROUP_COMMIT, GROUP_COMMIT_MAX_DELAY_MS)
+MODES = [
+    ("off", "0", "0"),
+    ("on 1ms", "1", "1"),
+    ("on 5ms", "1", "5"),
+]
+
+
+async def drive(app, token: str, total: int, concurrency: int) -> dict:
+    import httpx
+
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker(client):
+        nonlocal errors
+        for n in counter:
+            start = time.perf_counter()
+            response = await client.post(
+                "/blog/",
+                json={"title": f"post {n}", "body": "b" * 500},
+                headers=headers,
+            )
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 201:
+                errors += 1
+
+    # Count server errors (e.g. "database is locked") instead of raising them
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def run_child(args) -> None:
+    sys.path.insert(0, str(APP_DIR))
+    import group_commit
+    import main
+    import migrations
+
+    migrations.upgrade()
+    token = seed(0)
+    try:
+        result = asyncio.run(drive(main.app, token, args.requests, args.concurrency))
+    finally:
+        # httpx's ASGI transport skips lifespan, so stop the writer here
+        group_commit.shutdown()
+    print(json.dumps(result))
+
+
+def run_mode(enabled: str, delay_ms: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+            DB_PROFILE=args.profile,
+            GROUP_COMMIT=enabled,
+            GROUP_COMMIT_MAX_DELAY_MS=delay_ms,
+        )
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", *sys.argv[1:]],
+            env=env,
+            cwd=APP_DIR,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--profile", default="production")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    print(
+        f"{args.requests} creates, concurrency {args.concurrency}, "
+        f"profile {args.profile}"
+    )
+    print(f"{'mode':<8} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for label, enabled, delay_ms in MODES:
+        r = run_mode(enabled, delay_ms, args)
+        print(
+            f"{label:<8} {r['req_per_s']:>9.1f} {r['p50_ms']:>9.2f} "
+            f"{r['p99_ms']:>9.2f} {r['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+CPU cost of turning a page of blogs into a JSON body, per 1,000 blogs.
+
+"pydantic" is what a route with response_model=schemas.BlogPage does with
+ORM rows: validate them into models (from_attributes), dump to JSON-able
+data and encode with the stdlib json module. The fast_json rows are the
+path the read routes use now: plain dicts from the ORM attributes, encoded
+with stdlib json or orjson.
+
+Usage (from 02-DB-Fastapi):
+    python benchmarks/bench_serialization.py --blogs 1000 --rounds 50
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# Nothing is written; the engine just needs a file URL to be created
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from pydantic import TypeAdapter  # noqa: E402
+
+import fast_json  # noqa: E402
+import models  # noqa: E402
+import schemas  # noqa: E402
+
+
+def make_page(blog_count: int) -> dict:
+    """A page of transient ORM blogs with their author loaded."""
+    author = models.User(id=1, name="bench", email="bench@example.com")
+    items = [
+        models.Blog(
+            id=i, title=f"title {i}", body="lorem ipsum dolor " * 30, user=author
+        )
+        for i in range(1, blog_count + 1)
+    ]
+    return {"items": items, "next_cursor": "aWQ6MTAwMA"}
+
+
+def pydantic_path(page: dict) -> bytes:
+    adapter = TypeAdapter(schemas.BlogPage)
+    value = adapter.validate_python(page, from_attributes=True)
+    content = adapter.dump_python(value, mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def fast_path(page: dict) -> bytes:
+    return fast_json.FastJSONResponse(fast_json.dump_blog_page(page)).body
+
+
+def cpu_ms_per_1000(fn, page: dict, rounds: int) -> float:
+    fn(page)  # warm up (pydantic builds its validators lazily)
+    started = time.process_time()
+    for _ in range(rounds):
+        fn(page)
+    elapsed = time.process_time() - started
+    return elapsed / rounds / len(page["items"]) * 1000 * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--blogs", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    page = make_page(args.blogs)
+    assert json.loads(pydantic_path(page)) == json.loads(fast_path(page))
+
+    orjson = fast_json.orjson
+    results = [("pydantic + json", cpu_ms_per_1000(pydantic_path, page, args.rounds))]
+    fast_json.orjson = None
+    results.append(("fast_json + json", cpu_ms_per_1000(fast_path, page, args.rounds)))
+    fast_json.orjson = orjson
+    if orjson is not None:
+        results.append(
+            ("fast_json + orjson", cpu_ms_per_1000(fast_path, page, args.rounds))
+        )
+
+    print(f"{args.blogs} blogs per page, {args.rounds} rounds")
+    print(f"{'path':<20} {'CPU ms / 1000 blogs':>20} {'speedup':>8}")
+    baseline = results[0][1]
+    for name, ms in results:
+        print(f"{name:<20} {ms:>20.2f} {baseline / ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+"""
+Benchmark every endpoint of the blog, user and authentication routers.
+
+Each scale runs in its own subprocess against a freshly seeded SQLite
+database, driving main.app in-process through httpx's ASGI transport (with
+the app lifespan running). Every scenario reports req/s and p50/p99
+latency; each run also reports the peak RSS of the process.
+
+Results are compared with benchmarks/baseline.json, and the script exits
+with status 1 when a scenario's p99 or throughput, or the peak memory,
+is worse than the baseline by more than the allowed threshold, or has no
+baseline entry at all. Baselines are machine specific: record one on the
+machine that runs the comparison, and again whenever scenarios are added.
+
+Usage (from 02-DB-Fastapi):
+    python benchmarks/bench_suite.py --scale 1k
+    python benchmarks/bench_suite.py --scale 1k --scale 100k --save-baseline
+    python benchmarks/bench_suite.py --scale 1m --async --requests 500
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+# Blogs per seeded user; the benchmark user is user 1
+BLOGS_PER_USER = 100
+PASSWORD = "bench-password"
+SEED_CHUNK = 10_000
+
+
+def seed(blog_count: int) -> dict:
+    """
+    Fill an empty database with users and blog_count blogs.
+
+    Rows are written with executemany in large chunks and the search index
+    and author stats are rebuilt once at the end, so a million blogs take
+    seconds, not hours.
+
+    Returns:
+        Ids and credentials the scenarios need
+    """
+    import database
+    import models
+    import search
+    import user_stats
+    import versions
+    from hashing import pwd_context
+    from repository.blog import body_columns
+    from sqlalchemy import insert
+
+    user_count = max(1, blog_count // BLOGS_PER_USER)
+    password = pwd_context().hash(PASSWORD)
+    db = database.SessionLocal()
+    try:
+        db.execute(
+            insert(models.User),
+            [
+                {
+                    "name": f"user {n}",
+                    "email": f"user{n}@bench.test",
+                    "password": password,
+                }
+                for n in range(1, user_count + 1)
+            ],
+        )
+        rows = (
+            {
+                "title": f"title {i}",
+                "user_id": i % user_count + 1,
+                **body_columns(
+                    f"benchmark body {i} " + "lorem ipsum dolor sit amet " * 20
+                ),
+            }
+            for i in range(blog_count)
+        )
+        while chunk := list(itertools.islice(rows, SEED_CHUNK)):
+            db.execute(insert(models.Blog), chunk)
+        versions.bump(db, versions.BLOGS)
+        db.commit()
+        search.rebuild(db)
+        user_stats.reconcile(db)
+    finally:
+        db.close()
+    return {"blogs": blog_count, "users": user_count, "email": "user1@bench.test"}
+
+
+def scenarios(seeded: dict):
+    """
+    Build the request generators, one per endpoint.
+
+    Each entry is (name, auth, request factory); the factory takes the
+    request number and returns (method, path, keyword arguments).
+    """
+    blogs = seeded["blogs"]
+    users = seeded["users"]
+    email = seeded["email"]
+    # The benchmark user owns every blog whose id is 1 modulo the user count
+    own_blog_ids = range(1, blogs + 1, users)
+    new_blog = {"title": "bench", "body": "lorem ipsum " * 20}
+
+    return [
+        # routers/blog.py
+        ("GET /blog/", False, lambda n: ("GET", "/blog/?limit=20", {})),
+        (
+            "GET /blog/?view=excerpt",
+            False,
+            lambda n: ("GET", "/blog/?limit=20&view=excerpt", {}),
+        ),
+        (
+            "GET /blog/?after",
+            False,
+            lambda n: ("GET", f"/blog/?limit=20&after={_cursor(n % blogs)}", {}),
+        ),
+        ("GET /blog/my-blogs", True, lambda n: ("GET", "/blog/my-blogs?limit=20", {})),
+        (
+            "GET /blog/search",
+            False,
+            lambda n: ("GET", f"/blog/search?q=body+{n % blogs}&limit=20", {}),
+        ),
+        ("GET /blog/{id}", False, lambda n: ("GET", f"/blog/{n % blogs + 1}", {})),
+        (
+            "GET /blog/batch",
+            False,
+            lambda n: (
+                "GET",
+                "/blog/batch?ids="
+                + ",".join(str((n * 20 + i) % blogs + 1) for i in range(20)),
+                {},
+            ),
+        ),
+        ("POST /blog/", True, lambda n: ("POST", "/blog/", {"json": new_blog})),
+        (
+            "POST /blog/bulk",
+            True,
+            lambda n: ("POST", "/blog/bulk", {"json": [new_blog] * 50}),
+        ),
+        (
+            "PUT /blog/{id}",
+            True,
+            lambda n: (
+                "PUT",
+                f"/blog/{own_blog_ids[n % len(own_blog_ids)]}",
+                {"json": {"title": f"updated {n}", "body": "updated body"}},
+            ),
+        ),
+        # Deletes remove the blogs created by the POST /blog/ scenario
+        (
+            "DELETE /blog/{id}",
+            True,
+            lambda n: ("DELETE", f"/blog/{blogs + 1 + n}", {}),
+        ),
+        # routers/user.py
+        ("GET /user/me", True, lambda n: ("GET", "/user/me?limit=20", {})),
+        (
+            "GET /user/{id}",
+            True,
+            lambda n: ("GET", f"/user/{n % users + 1}?limit=20", {}),
+        ),
+        (
+            "GET /user/email/{email}",
+            True,
+            lambda n: ("GET", f"/user/email/user{n % users + 1}@bench.test", {}),
+        ),
+        (
+            "GET /user/{id}/stats",
+            True,
+            lambda n: ("GET", f"/user/{n % users + 1}/stats", {}),
+        ),
+        # routers/authentication.py (bcrypt bound)
+        (
+            "POST /auth/signup",
+            False,
+            lambda n: (
+                "POST",
+                "/auth/signup",
+                {
+                    "json": {
+                        "name": "new",
+                        "email": f"new{n}@bench.test",
+                        "password": PASSWORD,
+                    }
+                },
+            ),
+        ),
+        (
+            "POST /auth/login",
+            False,
+            lambda n: (
+                "POST",
+                "/auth/login",
+                {"json": {"email": email, "password": PASSWORD}},
+            ),
+        ),
+        (
+            "POST /auth/token",
+            False,
+            lambda n: (
+                "POST",
+                "/auth/token",
+                {"data": {"username": email, "password": PASSWORD}},
+            ),
+        ),
+    ]
+
+
+def _cursor(after_id: int) -> str:
+    from pagination import encode_cursor
+
+    return encode_cursor(after_id)
+
+
+async def run_scenario(client, factory, headers, total: int, concurrency: int):
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for n in counter:
+            method, path, kwargs = factory(n)
+            start = time.perf_counter()
+            response = await client.request(method, path, headers=headers, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000,
+    }
+
+
+async def run_app(args, seeded: dict) -> dict:
+    import httpx
+    import jwt_token
+    import main
+
+    token = jwt_token.create_access_token({"sub": seeded["email"], "user_id": 1})
+    auth = {"Authorization": f"Bearer {token}"}
+    results = {}
+    transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            for name, needs_auth, factory in scenarios(seeded):
+                if args.only and not any(part in name for part in args.only):
+                    continue
+                total = args.requests
+                if name.startswith("POST /auth/"):
+                    total = min(total, args.auth_requests)
+                results[name] = await run_scenario(
+                    client,
+                    factory,
+                    auth if needs_auth else None,
+                    total,
+                    args.concurrency,
+                )
+    return results
+
+
+def run_child(args) -> None:
+    sys.path.insert(0, str(APP_DIR))
+    import migrations
+
+    migrations.upgrade()
+
+    if args.seed_only:
+        started = time.perf_counter()
+        seeded = seed(SCALES[args.scale[0]])
+        print(json.dumps({**seeded, "seed_seconds": time.perf_counter() - started}))
+        return
+
+    seeded = json.loads(args.seeded)
+    scenarios_result = asyncio.run(run_app(args, seeded))
+    # ru_maxrss is in KiB on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        json.dumps(
+            {
+                "seed_seconds": seeded["seed_seconds"],
+                "peak_rss_mb": peak_rss_mb,
+                "scenarios": scenarios_result,
+            }
+        )
+    )
+
+
+def run_scale(scale: str, args) -> dict:
+    # Seeding runs in its own process so peak RSS only covers serving
+    child_args = [arg for arg in sys.argv[1:] if arg != "--save-baseline"]
+    command = [sys.executable, __file__, "--child", "--scale", scale, *child_args]
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+            USE_ASYNC_DB="1" if args.use_async else "0",
+            # One client logging in as one user: the auth limiter would
+            # answer most of the bcrypt scenarios with 429s
+            AUTH_RATE_LIMIT="0",
+        )
+
+        def child(*extra: str) -> dict:
+            output = subprocess.run(
+                [*command, *extra],
+                env=env,
+                cwd=APP_DIR,
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            return json.loads(output.strip().splitlines()[-1])
+
+        seeded = child("--seed-only")
+        return child("--seeded", json.dumps(seeded))
+
+
+def compare(key: str, current: dict, baseline: dict, args) -> list:
+    """
+    Return the regressions of current against baseline as readable strings.
+
+    Scenarios missing from the baseline count as failures too.
+    """
+    failures = []
+    for name, result in current["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            # A scenario without a baseline could never regress
+            failures.append(
+                f"{key} {name}: no baseline entry (record one with --save-baseline)"
+            )
+            continue
+        if result["p99_ms"] > base["p99_ms"] * (1 + args.max_latency_regression):
+            failures.append(
+                f"{key} {name}: p99 {result['p99_ms']:.2f} ms "
+                f"vs baseline {base['p99_ms']:.2f} ms"
+            )
+        if result["req_per_s"] < base["req_per_s"] * (1 - args.max_throughput_drop):
+            failures.append(
+                f"{key} {name}: {result['req_per_s']:.1f} req/s "
+                f"vs baseline {base['req_per_s']:.1f} req/s"
+            )
+        if result["errors"] > base["errors"]:
+            failures.append(
+                f"{key} {name}: {result['errors']} errors "
+                f"vs baseline {base['errors']}"
+            )
+    if current["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + args.max_memory_growth):
+        failures.append(
+            f"{key}: peak RSS {current['peak_rss_mb']:.1f} MiB "
+            f"vs baseline {baseline['peak_rss_mb']:.1f} MiB"
+        )
+    return failures
+
+
+def print_report(key: str, current: dict, baseline) -> None:
+    print(
+        f"\n== {key}: seeded in {current['seed_seconds']:.1f}s, "
+        f"peak RSS {current['peak_rss_mb']:.1f} MiB"
+    )
+    print(
+        f"{'scenario':<26} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} "
+        f"{'errors':>7} {'p99 vs base':>12}"
+    )
+    for name, r in current["scenarios"].items():
+        delta = ""
+        base = baseline["scenarios"].get(name) if baseline else None
+        if base:
+            delta = f"{(r['p99_ms'] / base['p99_ms'] - 1) * 100:+.0f}%"
+        print(
+            f"{name:<26} {r['req_per_s']:>9.1f} {r['p50_ms']:>9.2f} "
+            f"{r['p99_ms']:>9.2f} {r['errors']:>7} {delta:>12}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--scale", action="append", choices=SCALES, help="repeatable; default 1k"
+    )
+    parser.add_argument("--requests", type=int, default=300, help="per scenario")
+    parser.add_argument(
+        "--auth-requests", type=int, default=50, help="per bcrypt-bound scenario"
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--async", dest="use_async", action="store_true")
+    parser.add_argument(
+        "--only", action="append", help="run scenarios whose name contains this"
+    )
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--max-latency-regression", type=float, default=0.5)
+    parser.add_argument("--max-throughput-drop", type=float, default=0.3)
+    parser.add_argument("--max-memory-growth", type=float, default=0.25)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--seed-only", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--seeded", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.scale = args.scale or ["1k"]
+
+    if args.child:
+        run_child(args)
+        return
+
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    failures = []
+    for scale in dict.fromkeys(args.scale):
+        key = f"{scale}-{'async' if args.use_async else 'sync'}"
+        current = run_scale(scale, args)
+        baseline = baselines.get(key)
+        print_report(key, current, baseline)
+        if args.save_baseline:
+            baselines[key] = current
+        elif baseline:
+            failures += compare(key, current, baseline, args)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"\nBaseline written to {args.baseline}")
+    elif failures:
+        print("\nRegressions:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
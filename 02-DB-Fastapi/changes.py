@@ -0,0 +1,245 @@
+# Change feed for blogs (server-sent events)
+#
+# The blog routers publish an event after every committed create, update
+# and delete; GET /blog/changes streams them to clients as
+# text/event-stream, so they no longer poll GET /blog/ to discover posts:
+#
+#     id: 5f3a9c01-42         (process epoch - sequence number)
+#     event: created          (or updated, deleted)
+#     data: {"id": 7, "user_id": 3}
+#
+# ChangeBroker fans events out in process. Each subscriber has a bounded
+# buffer (CHANGES_BUFFER events); a subscriber that falls that far behind
+# is dropped, its stream ends and the client reconnects with the standard
+# Last-Event-ID header. The last CHANGES_LOG_SIZE events are kept in memory
+# to replay from there. A client whose Last-Event-ID has already left the
+# log, or comes from another process (a restart), gets a "reset" event
+# instead, meaning: reload from GET /blog/ and carry on from this event.
+#
+# The broker is per process: with several workers, a client only sees the
+# writes served by the worker it is connected to.
+#
+#   CHANGES_BUFFER      events buffered per subscriber
+#   CHANGES_LOG_SIZE    events kept for Last-Event-ID resume
+#   CHANGES_HEARTBEAT   seconds between keep-alive comments on idle streams
+
+import asyncio
+import json
+import os
+import secrets
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional
+
+CHANGES_BUFFER = int(os.getenv("CHANGES_BUFFER", "256"))
+CHANGES_LOG_SIZE = int(os.getenv("CHANGES_LOG_SIZE", "1000"))
+CHANGES_HEARTBEAT = float(os.getenv("CHANGES_HEARTBEAT", "15"))
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+
+# Delay before EventSource clients reconnect after a dropped stream (ms)
+RETRY_MS = 1000
+
+
+@dataclass(frozen=True)
+class Event:
+    id: str  # "<epoch>-<seq>", sent as the SSE id
+    seq: int
+    kind: str
+    data: str
+
+    def encode(self) -> bytes:
+        return f"id: {self.id}\nevent: {self.kind}\ndata: {self.data}\n\n".encode()
+
+
+class Subscription:
+    """One client's view of the feed: replayed events, then live ones."""
+
+    def __init__(
+        self,
+        broker: "ChangeBroker",
+        backlog: List[Event],
+        reset: Optional[Event],
+    ):
+        self.broker = broker
+        self.backlog = backlog
+        # "reset" event to send first, None when resuming worked
+        self.reset = reset
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue(broker.buffer_size)
+        self.dropped = False
+
+    def _offer(self, event: Event) -> bool:
+        """Buffer event (on the subscriber's loop); False once dropped."""
+        if self.dropped:
+            return False
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.dropped = True
+            return False
+
+    async def next(self, timeout: float) -> Optional[Event]:
+        """
+        Wait for the next live event.
+
+        Returns:
+            The event, or None if none arrived within timeout
+
+        Raises:
+            ConnectionResetError: If the subscriber was dropped as too slow
+        """
+        if self.dropped and self._queue.empty():
+            raise ConnectionResetError("subscriber fell behind")
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class ChangeBroker:
+    """
+    In-process fan-out of change events to subscribers.
+
+    publish() may be called from any thread (threadpool handlers, the group
+    commit writer); events reach each subscriber on its own event loop.
+    """
+
+    def __init__(
+        self, buffer_size: int = CHANGES_BUFFER, log_size: int = CHANGES_LOG_SIZE
+    ):
+        self.buffer_size = buffer_size
+        # Event ids of an earlier process never resume against this one
+        self.epoch = secrets.token_hex(4)
+        self._lock = threading.Lock()
+        self._log: "deque[Event]" = deque(maxlen=log_size)
+        self._last_id = 0
+        self._subscribers: set = set()
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, kind: str, **data) -> Event:
+        """Record an event and hand it to every subscriber."""
+        with self._lock:
+            self._last_id += 1
+            event = Event(
+                f"{self.epoch}-{self._last_id}", self._last_id, kind, json.dumps(data)
+            )
+            self._log.append(event)
+            self.published += 1
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription._loop.call_soon_threadsafe(
+                    self._deliver, subscription, event
+                )
+            except RuntimeError:  # its loop is closed
+                self.unsubscribe(subscription)
+        return event
+
+    def _deliver(self, subscription: Subscription, event: Event) -> None:
+        if not subscription._offer(event) and subscription in self._subscribers:
+            self.unsubscribe(subscription)
+            with self._lock:
+                self.dropped += 1
+
+    def _resume_from(self, last_event_id: str) -> Optional[int]:
+        # Sequence number to replay after, None if the log cannot tell
+        epoch, _, seq = last_event_id.rpartition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        oldest = self._log[0].seq if self._log else self._last_id + 1
+        if int(seq) > self._last_id or int(seq) + 1 < oldest:
+            return None
+        return int(seq)
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        """
+        Register a subscriber (call on its event loop).
+
+        Args:
+            last_event_id: Last-Event-ID of a reconnecting client
+
+        Returns:
+            Subscription with the events to replay first, or a "reset"
+            event when they are no longer all in the log
+        """
+        with self._lock:
+            # Registered under the lock that publish() takes, so every event
+            # is either in the backlog or delivered live, never both
+            backlog, reset = [], None
+            if last_event_id:
+                seq = self._resume_from(last_event_id)
+                if seq is None:
+                    reset = Event(
+                        f"{self.epoch}-{self._last_id}", self._last_id, "reset", "{}"
+                    )
+                else:
+                    backlog = [e for e in self._log if e.seq > seq]
+            subscription = Subscription(self, backlog, reset)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stats(self) -> dict:
+        """Subscriber gauge and published/dropped counters, for GET /metrics."""
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "dropped": self.dropped,
+            }
+
+
+broker = ChangeBroker(CHANGES_BUFFER, CHANGES_LOG_SIZE)
+
+
+def publish_blog(kind: str, blog_id: int, user_id: int) -> None:
+    """Announce a committed blog write (call after the commit)."""
+    broker.publish(kind, id=blog_id, user_id=user_id)
+
+
+async def event_stream(
+    last_event_id: Optional[str] = None,
+    source: ChangeBroker = broker,
+    heartbeat: float = CHANGES_HEARTBEAT,
+) -> AsyncIterator[bytes]:
+    """
+    text/event-stream body of one subscriber.
+
+    Subscribes on the first iteration, so a response that is never sent
+    leaves no subscriber behind. Ends when the subscriber is dropped, and
+    unsubscribes when the client goes away (StreamingResponse cancels the
+    iteration).
+
+    Args:
+        last_event_id: Last-Event-ID header of a reconnecting client
+        source: Broker to subscribe to
+        heartbeat: Seconds of silence before a keep-alive comment
+    """
+    subscription = source.subscribe(last_event_id)
+    try:
+        yield f"retry: {RETRY_MS}\n\n".encode()
+        if subscription.reset is not None:
+            yield subscription.reset.encode()
+        for event in subscription.backlog:
+            yield event.encode()
+        subscription.backlog = []
+        while True:
+            try:
+                event = await subscription.next(heartbeat)
+            except ConnectionResetError:
+                return
+            yield b": keep-alive\n\n" if event is None else event.encode()
+    finally:
+        subscription.close()
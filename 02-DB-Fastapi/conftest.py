@@ -0,0 +1,105 @@
+# Shared pytest fixtures
+# The tests run against a throwaway SQLite file so blog.db is never touched
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+_tmpdir = tempfile.mkdtemp(prefix="blog-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/test.db")
+# Every TestClient request comes from the same address; the auth fixtures
+# sign up and log in far faster than a real client would
+os.environ.setdefault("AUTH_IP_BURST", "10000")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import database  # noqa: E402
+import main  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+_user_counter = 0
+
+
+@pytest.fixture
+def auth_headers(client):
+    """Sign up a fresh user and return Authorization headers for it."""
+    global _user_counter
+    _user_counter += 1
+    email = f"user{_user_counter}@example.com"
+    response = client.post(
+        "/auth/signup", json={"name": "Test", "email": email, "password": "secret"}
+    )
+    assert response.status_code == 201, response.text
+    response = client.post("/auth/login", json={"email": email, "password": "secret"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+class QueryCounter:
+    """Collects every SQL statement executed by the app's active engine."""
+
+    def __init__(self):
+        self.statements = []
+        # (statement, parameters, executemany) for every execution
+        self.executions = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        self.executions.append((statement, parameters, executemany))
+
+
+def active_engines():
+    # With USE_ASYNC_DB the routers run on the async engines' sync cores;
+    # reads and writes use separate pools (read_engine may be engine itself)
+    if database.async_engine is not None:
+        engines = [database.async_engine, database.async_read_engine]
+        return list({e.sync_engine for e in engines})
+    return list({database.engine, database.read_engine})
+
+
+@contextmanager
+def count_queries():
+    counter = QueryCounter()
+    engines = active_engines()
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", counter._record)
+    try:
+        yield counter
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", counter._record)
+
+
+@pytest.fixture
+def assert_max_queries():
+    """
+    Fail when the wrapped block runs more SQL statements than its budget.
+
+    Usage:
+        with assert_max_queries(2):
+            client.get("/blog/")
+    """
+
+    @contextmanager
+    def _assert_max_queries(budget):
+        with count_queries() as counter:
+            yield counter
+        assert counter.count <= budget, (
+            f"expected at most {budget} SQL statements, got {counter.count}:\n"
+            + "\n".join(counter.statements)
+        )
+
+    return _assert_max_queries
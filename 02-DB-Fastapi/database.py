@@ -1,48 +1,509 @@
 # Database Configuration and Setup
 # This file configures the SQLAlchemy database connection and session management
 
+import asyncio
+import functools
+import os
+import threading
+import time
+from typing import Dict, Optional
+
 # Import SQLAlchemy components
-from sqlalchemy import create_engine  # Creates database engine
+from sqlalchemy import create_engine, event, make_url  # Creates database engine
 from sqlalchemy.ext.declarative import declarative_base  # Base class for ORM models
 from sqlalchemy.orm import sessionmaker, Session
-from fastapi import Depends  # Dependency injection for FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from fastapi import Depends, Request  # Dependency injection for FastAPI
+from settings import Settings, env_choice
 
 
 # Creates database sessions
 
-# Database URL configuration
-# SQLite database connection string pointing to a local file named 'blog.db'
-# Format: sqlite:///./filename.db (relative path to current directory)
-SQLALCHEMY_DATABASE_URL = "sqlite:///./blog.db"
-
-# Create database engine
-# The engine is the starting point for any SQLAlchemy application
-# connect_args={"check_same_thread": False} is required for SQLite to work with FastAPI
-# This disables SQLite's thread safety check since FastAPI uses multiple threads
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Connection pool size
+# A request can hold its connection while it waits for a threadpool worker
+# (e.g. between get_current_user and the route body), so a capped pool lets
+# waiting requests starve the ones that would release a connection.
+# SQLite connections are cheap file handles: keep DB_POOL_SIZE open and allow
+# unlimited overflow by default (DB_MAX_OVERFLOW=-1).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "40"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "-1"))
+
+# SQLite engine profiles
+# PRAGMAs applied to every new connection. "default" keeps SQLite's own
+# settings (rollback journal, synchronous=FULL, ~2 MB page cache);
+# "production" switches to WAL so readers never block behind a writer.
+# Individual values can be overridden with SQLITE_<PRAGMA> variables,
+# e.g. SQLITE_SYNCHRONOUS=FULL.
+ENGINE_PROFILES = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",  # safe with WAL; fsync at checkpoints only
+        "busy_timeout": "5000",  # ms to wait for a lock before "database is locked"
+        "cache_size": "-65536",  # negative = KiB, i.e. 64 MiB page cache
+        "mmap_size": "268435456",  # 256 MiB memory-mapped reads
+    },
+}
+DB_PROFILE = env_choice("DB_PROFILE", "production", ENGINE_PROFILES)
+SQLITE_PRAGMAS = {
+    name: os.getenv(f"SQLITE_{name.upper()}", value)
+    for name, value in ENGINE_PROFILES[DB_PROFILE].items()
+}
+
+
+def apply_sqlite_pragmas(engine, read_only: bool = False) -> None:
+    """
+    Configure every new DBAPI connection of engine with SQLITE_PRAGMAS.
+
+    Args:
+        engine: Sync engine (use async_engine.sync_engine for async engines)
+        read_only: Also set query_only so the connection rejects writes
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    pragmas = dict(SQLITE_PRAGMAS)
+    if read_only:
+        # The journal mode is a property of the database file; leave it to
+        # the write pool and make these connections refuse writes instead
+        pragmas.pop("journal_mode", None)
+        pragmas["query_only"] = "ON"
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def create_writer_engine(url: str, pool_size: int = 1):
+    """
+    Create an engine for explicit write transactions.
+
+    Transactions on it start with BEGIN IMMEDIATE (the write lock is taken
+    up front) and DDL and SAVEPOINTs behave transactionally. Used by
+    group_commit, migrations and the jobs workers.
+
+    Args:
+        url: Database URL
+        pool_size: Connections (jobs runs one per worker)
+    """
+    writer = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=pool_size,
+        max_overflow=0,
+    )
+    if writer.dialect.name != "sqlite":
+        return writer
+    apply_sqlite_pragmas(writer)
+
+    @event.listens_for(writer, "connect")
+    def _no_implicit_begin(dbapi_connection, connection_record):
+        # pysqlite only emits BEGIN before DML: DDL would run outside the
+        # transaction, and the first SAVEPOINT would open the transaction
+        # itself so that its RELEASE commits it
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(writer, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return writer
+
+
+def uses_file(url: str) -> bool:
+    """True if url names an SQLite database file that several pools can share."""
+    # In-memory databases are private to one connection, so a second pool
+    # would see a different (empty) database
+    database = make_url(url).database
+    return url.startswith("sqlite") and database not in (None, "", ":memory:")
+
+
+class PoolStats:
+    """
+    Checkout counters of one connection pool, fed by its pool events.
+
+    hold_seconds adds up how long connections stayed checked out, which is
+    what early release (close_sessions_after) shortens.
+    """
+
+    def __init__(self, engine):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checked_out = 0
+        self.hold_seconds = 0.0
+        event.listen(engine, "checkout", self._checkout)
+        event.listen(engine, "checkin", self._checkin)
+
+    def _checkout(self, dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+
+    def _checkin(self, dbapi_connection, connection_record):
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is None:
+            return
+        with self._lock:
+            self.checked_out -= 1
+            self.hold_seconds += time.perf_counter() - started
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checked_out": self.checked_out,
+                "hold_seconds": self.hold_seconds,
+            }
 
-# Create SessionLocal class
-# This class will be used to create database sessions
-# autocommit=False: We'll manually commit transactions
-# autoflush=False: We'll manually flush changes to the database
-# bind=engine: This session factory is bound to our database engine
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
 # Create Base class
 # This will be the base class for all our ORM models
 # All database models will inherit from this Base class
 Base = declarative_base()
 
+# Engines and session factories
+# Nothing connects at import time: configure(settings) creates them (the app
+# does so in its lifespan, see main.create_app). Scripts and tests that just
+# use database.engine, database.SessionLocal, ... get them configured from
+# the environment on first access (module __getattr__ below).
+_settings: Optional[Settings] = None
+# Pool role ("write", "read", "async_write", "async_read") -> PoolStats
+_pools: Dict[str, PoolStats] = {}
+_CONFIGURED_NAMES = (
+    "SQLALCHEMY_DATABASE_URL",
+    "ASYNC_DATABASE_URL",
+    "USE_ASYNC_DB",
+    "DB_READ_POOL",
+    "engine",
+    "read_engine",
+    "async_engine",
+    "async_read_engine",
+    "SessionLocal",
+    "ReadSessionLocal",
+    "AsyncSessionLocal",
+    "AsyncReadSessionLocal",
+)
+
+
+def configure(settings: Optional[Settings] = None) -> None:
+    """
+    Create the engines and session factories described by settings.
+
+    Calling it again with equal settings is a no-op.
+
+    Args:
+        settings: Defaults to Settings.from_env()
+
+    Raises:
+        RuntimeError: If already configured with different settings
+            (call dispose() first)
+    """
+    global _settings, SQLALCHEMY_DATABASE_URL, ASYNC_DATABASE_URL, USE_ASYNC_DB
+    global DB_READ_POOL, engine, read_engine, async_engine, async_read_engine
+    global SessionLocal, ReadSessionLocal, AsyncSessionLocal, AsyncReadSessionLocal
+
+    settings = settings or Settings.from_env()
+    if _settings is not None:
+        if settings != _settings:
+            raise RuntimeError(
+                "database is already configured with other settings; "
+                "call dispose() first"
+            )
+        return
+
+    # Database URL configuration
+    # SQLite database connection string pointing to a local file named 'blog.db'
+    # Format: sqlite:///./filename.db (relative path to current directory)
+    # Can be overridden with the DATABASE_URL environment variable (used by the tests)
+    SQLALCHEMY_DATABASE_URL = settings.database_url
+    # Read/write split
+    # Read-only handlers use a second pool whose connections are flagged
+    # query_only, so page reads never wait for a connection held by a write.
+    # DB_READ_POOL=0 sends reads through the main engine instead.
+    DB_READ_POOL = settings.db_read_pool
+    # Async database access (optional)
+    # USE_ASYNC_DB=1 switches main.py to the async routers, which talk to SQLite
+    # through aiosqlite instead of occupying a threadpool worker per request.
+    # The async URL defaults to the sync one with the aiosqlite driver swapped in.
+    USE_ASYNC_DB = settings.use_async_db
+    ASYNC_DATABASE_URL = settings.resolved_async_database_url
+
+    # Create database engine
+    # The engine is the starting point for any SQLAlchemy application
+    # connect_args={"check_same_thread": False} is required for SQLite to work
+    # with FastAPI. This disables SQLite's thread safety check since FastAPI
+    # uses multiple threads
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+    )
+    apply_sqlite_pragmas(engine)
+
+    # Read-only engine over the same database file
+    if DB_READ_POOL and uses_file(SQLALCHEMY_DATABASE_URL):
+        read_engine = create_engine(
+            SQLALCHEMY_DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+        )
+        apply_sqlite_pragmas(read_engine, read_only=True)
+    else:
+        read_engine = engine
+
+    # Create SessionLocal class
+    # This class will be used to create database sessions
+    # autocommit=False: We'll manually commit transactions
+    # autoflush=False: We'll manually flush changes to the database
+    # bind=engine: This session factory is bound to our database engine
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    # Sessions for read-only handlers (see DB_READ_POOL)
+    ReadSessionLocal = sessionmaker(
+        bind=read_engine, autocommit=False, autoflush=False
+    )
+
+    # The async engine is only built when enabled so aiosqlite stays optional
+    # expire_on_commit=False: objects stay readable after commit, since an async
+    # session cannot lazily refresh them while FastAPI serializes the response
+    async_engine = None
+    async_read_engine = None
+    AsyncSessionLocal = None
+    AsyncReadSessionLocal = None
+    if USE_ASYNC_DB:
+        async_engine = create_async_engine(
+            ASYNC_DATABASE_URL, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW
+        )
+        apply_sqlite_pragmas(async_engine.sync_engine)
+        async_read_engine = async_engine
+        if DB_READ_POOL and uses_file(ASYNC_DATABASE_URL):
+            async_read_engine = create_async_engine(
+                ASYNC_DATABASE_URL,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+            )
+            apply_sqlite_pragmas(async_read_engine.sync_engine, read_only=True)
+        AsyncSessionLocal = async_sessionmaker(
+            bind=async_engine, autoflush=False, expire_on_commit=False
+        )
+        AsyncReadSessionLocal = async_sessionmaker(
+            bind=async_read_engine, autoflush=False, expire_on_commit=False
+        )
+
+    roles = {"write": engine, "read": read_engine}
+    if async_engine is not None:
+        roles["async_write"] = async_engine.sync_engine
+        roles["async_read"] = async_read_engine.sync_engine
+    seen = set()
+    for role, pooled in roles.items():
+        if pooled not in seen:
+            seen.add(pooled)
+            _pools[role] = PoolStats(pooled)
+
+    _settings = settings
+
 
-# Dependency function to provide a database session for each request
-def get_db():
-    db = SessionLocal()  # Create a new database session
+def _ensure_configured() -> None:
+    if _settings is None:
+        configure()
+
+
+def active_engines() -> list:
+    """
+    Every sync engine of the current configuration (async engines as their
+    sync cores), e.g. to attach event listeners.
+    """
+    _ensure_configured()
+    engines = {engine, read_engine}
+    if async_engine is not None:
+        engines |= {async_engine.sync_engine, async_read_engine.sync_engine}
+    return list(engines)
+
+
+def pool_stats() -> Dict[str, dict]:
+    """Checkout counters per pool role, for GET /metrics (empty until configured)."""
+    return {role: pool.stats() for role, pool in _pools.items()}
+
+
+async def dispose() -> None:
+    """
+    Close every pooled connection and drop the configuration.
+
+    aiosqlite runs each connection on its own thread, so the app calls this
+    on shutdown to let the process exit.
+    """
+    global _settings
+    if _settings is None:
+        return
+    if async_engine is not None:
+        for pooled in {async_engine, async_read_engine}:
+            await pooled.dispose()
+    for pooled in {engine, read_engine}:
+        pooled.dispose()
+    module = globals()
+    for name in _CONFIGURED_NAMES:
+        module.pop(name, None)
+    _pools.clear()
+    _settings = None
+
+
+def __getattr__(name: str):
+    # Only reached while unconfigured (configure() defines these names)
+    if name in _CONFIGURED_NAMES:
+        configure()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Request-scoped sessions
+# get_db, get_read_db (and their async counterparts) and
+# oauth2.get_current_user all take their session from one RequestSessions
+# per request, so:
+#
+#   - a session is only created when a dependency asks for it, and only
+#     checks out a connection on its first statement: a token found in the
+#     token cache, or a request rejected before the handler, never touches
+#     a pool
+#   - get_current_user looks the user up on the session the route itself
+#     uses (the write session if the route depends on get_db, else the read
+#     one), so authenticated requests hold one connection, not two
+#   - TimedRoute closes the route's sessions as soon as the endpoint returns
+#     (close_sessions_after), before the response is serialized; anything
+#     left over is closed when the request ends
+
+
+class RequestSessions:
+    """The database sessions of one request, each created on first use."""
+
+    def __init__(self, writes: bool = True):
+        # Whether the route writes, i.e. which session reads should share
+        self.writes = writes
+        self._sessions: dict = {}
+
+    def _get(self, factory):
+        session = self._sessions.get(factory)
+        if session is None:
+            session = self._sessions[factory] = factory()
+        return session
+
+    def get(self, write: bool = True) -> Session:
+        """The request's session on the write pool or the read-only pool."""
+        _ensure_configured()
+        if write or read_engine is engine:
+            return self._get(SessionLocal)
+        return self._get(ReadSessionLocal)
+
+    def get_async(self, write: bool = True) -> AsyncSession:
+        """Async counterpart of get() for the routers/async_* modules."""
+        _ensure_configured()
+        if AsyncSessionLocal is None:
+            raise RuntimeError("Async database access is disabled (set USE_ASYNC_DB=1)")
+        if write or async_read_engine is async_engine:
+            return self._get(AsyncSessionLocal)
+        return self._get(AsyncReadSessionLocal)
+
+    async def close(self) -> None:
+        for session in self._sessions.values():
+            if isinstance(session, AsyncSession):
+                await session.close()
+            else:
+                session.close()
+        self._sessions.clear()
+
+
+def _depends_on(dependant, calls) -> bool:
+    return any(
+        sub.call in calls or _depends_on(sub, calls) for sub in dependant.dependencies
+    )
+
+
+def _writes(request: Request) -> bool:
+    route = request.scope.get("route")
+    if getattr(route, "dependant", None) is None:
+        return True
+    # Worked out once per route and kept on it
+    writes = getattr(route, "_writes_db", None)
+    if writes is None:
+        writes = route._writes_db = _depends_on(route.dependant, (get_db, get_async_db))
+    return writes
+
+
+async def request_sessions(request: Request):
+    sessions = RequestSessions(_writes(request))
     try:
-        yield db  # Yield the session to be used in the request
+        yield sessions
     finally:
-        db.close()  # Ensure the session is closed after the request
+        await sessions.close()
+
+
+# Dependency providing the request's database session (write pool)
+# The session-returning dependencies are async so resolving them does not
+# cost a threadpool hop; they never block.
+async def get_db(sessions: RequestSessions = Depends(request_sessions)) -> Session:
+    return sessions.get(write=True)
+
+
+# Same as get_db, but for handlers that only read (uses the read-only pool)
+async def get_read_db(
+    sessions: RequestSessions = Depends(request_sessions),
+) -> Session:
+    return sessions.get(write=False)
+
+
+# Async counterpart of get_db used by the routers/async_* modules
+async def get_async_db(
+    sessions: RequestSessions = Depends(request_sessions),
+) -> AsyncSession:
+    return sessions.get_async(write=True)
+
+
+async def get_async_read_db(
+    sessions: RequestSessions = Depends(request_sessions),
+) -> AsyncSession:
+    return sessions.get_async(write=False)
+
+
+def close_sessions_after(call):
+    """
+    Wrap an endpoint so the sessions passed to it are closed (their
+    connections returned to the pool) as soon as it returns.
+
+    Objects already loaded stay readable for response serialization;
+    routes must not rely on lazy loads after returning.
+    """
+    # Keeps the sync/async nature of call, like instrumentation's wrapper
+    if asyncio.iscoroutinefunction(call):
+
+        @functools.wraps(call)
+        async def closing_call(*args, **kwargs):
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                for value in kwargs.values():
+                    if isinstance(value, AsyncSession):
+                        await value.close()
+                    elif isinstance(value, Session):
+                        value.close()
+
+    else:
+
+        @functools.wraps(call)
+        def closing_call(*args, **kwargs):
+            try:
+                return call(*args, **kwargs)
+            finally:
+                for value in kwargs.values():
+                    if isinstance(value, Session):
+                        value.close()
+
+    return closing_call
 
 
 def dbOps(param, db: Session = Depends(get_db)):
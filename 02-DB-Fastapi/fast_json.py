@@ -0,0 +1,121 @@
+# Fast JSON responses for trusted ORM results
+#
+# Returning ORM objects through response_model makes FastAPI validate every
+# row into a pydantic model and then encode it with jsonable_encoder and the
+# stdlib json module. For list endpoints that dominates the request's CPU.
+#
+# The read routes instead turn rows straight into plain dicts (the dump_*
+# functions below, which mirror the schemas.Show* models field for field)
+# and return a FastJSONResponse. response_model stays on the routes for the
+# OpenAPI docs (routes taking ?fields= advertise fieldsets.BLOG/USER, the
+# full or sparse schema); test_fast_json.py checks the dicts match what the
+# pydantic models would have produced.
+#
+# orjson is used when installed (pip install .[fast]), stdlib json otherwise.
+
+import json
+from typing import Any, Optional, Tuple
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that encodes with orjson when it is available."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def respond(
+    content: Any, response: Optional[Response] = None, status_code: int = 200
+) -> FastJSONResponse:
+    """
+    Wrap already serializable content in a FastJSONResponse.
+
+    Args:
+        content: Dicts/lists of JSON types (e.g. from the dump_* functions)
+        response: FastAPI's injected response; its headers (ETag, ...) are kept
+        status_code: HTTP status code
+
+    Returns:
+        Response to return from the route as-is
+    """
+    headers = dict(response.headers) if response is not None else None
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
+
+
+def dump_user_in_blog(user) -> Optional[dict]:
+    """schemas.UserInBlog"""
+    if user is None:
+        return None
+    return {"id": user.id, "email": user.email, "name": user.name}
+
+
+# Sparse fieldsets (see fieldsets.py) only read the requested attributes,
+# so columns the query left unloaded are never touched
+_BLOG_GETTERS = {
+    "title": lambda blog: blog.title,
+    "body": lambda blog: blog.body,
+    "id": lambda blog: blog.id,
+    "user": lambda blog: dump_user_in_blog(blog.user),
+    "excerpt": lambda blog: blog.excerpt,
+    "body_length": lambda blog: blog.body_length,
+}
+
+
+def dump_blog(blog, fields: Optional[Tuple[str, ...]] = None) -> dict:
+    """schemas.ShowBlog (blog.user must already be loaded), or its fields"""
+    if fields is not None:
+        return {name: _BLOG_GETTERS[name](blog) for name in fields}
+    return {
+        "title": blog.title,
+        "body": blog.body,
+        "id": blog.id,
+        "user": dump_user_in_blog(blog.user),
+    }
+
+
+def dump_blog_page(page: dict, fields: Optional[Tuple[str, ...]] = None) -> dict:
+    """schemas.BlogPage from the repository's {"items", "next_cursor"}"""
+    return {
+        "items": [dump_blog(blog, fields) for blog in page["items"]],
+        "next_cursor": page["next_cursor"],
+    }
+
+
+def dump_blog_batch(batch: dict, fields: Optional[Tuple[str, ...]] = None) -> dict:
+    """schemas.BlogBatch from the repository's {"items", "missing"}"""
+    return {
+        "items": [dump_blog(blog, fields) for blog in batch["items"]],
+        "missing": batch["missing"],
+    }
+
+
+def dump_user(
+    user,
+    blogs,
+    next_cursor: Optional[str],
+    fields: Optional[Tuple[str, ...]] = None,
+    stats: Optional[dict] = None,
+) -> dict:
+    """schemas.ShowUser with one page of blogs, or its fields (+ stats)"""
+    content = {}
+    for name in fields or ("id", "email", "name", "blogs"):
+        if name == "blogs":
+            content["blogs"] = [
+                {"id": blog.id, "title": blog.title, "body": blog.body}
+                for blog in blogs
+            ]
+            content["blogs_next_cursor"] = next_cursor
+        elif name == "stats":
+            content["stats"] = stats
+        else:
+            content[name] = getattr(user, name)
+    return content
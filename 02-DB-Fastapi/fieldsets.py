@@ -0,0 +1,169 @@
+# Sparse fieldsets
+#
+# The blog and user read endpoints accept ?fields=id,title to return only
+# some top-level fields of their schema. The selection is pushed down to the
+# queries: unrequested columns are not loaded (load_only), and relationships
+# or embedded pages that are not requested are never queried. Responses are
+# built by the fast_json dump_* functions with just the requested keys.
+#
+# A fieldset is a tuple of field names in schema order, or None for the full
+# representation (also what an explicit list of every field resolves to).
+#
+# The routes' response_model is documentation only (they return fast_json
+# responses), so it advertises what a client can actually get: the full
+# schema or its sparse variant, where every field may be absent (see
+# sparse_model; BLOG, USER and the page/batch models below).
+#
+# Blogs also offer excerpt and body_length, stored columns that are not part
+# of ShowBlog; the list endpoints' ?view=excerpt selects them instead of the
+# body, so listing cost does not grow with article size.
+
+from functools import lru_cache
+from typing import Any, Callable, List, Literal, Optional, Tuple, Type, Union
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel, create_model
+import schemas
+
+Fields = Optional[Tuple[str, ...]]
+
+
+def parse_fields(
+    raw: Optional[str], allowed: Tuple[str, ...], full: Tuple[str, ...] = ()
+) -> Fields:
+    """
+    Resolve a comma separated ?fields= value against a schema's fields.
+
+    Args:
+        raw: Query string value (None for the full representation)
+        allowed: Selectable fields, in output order
+        full: Fields of the full representation (default: all of allowed)
+
+    Returns:
+        Requested fields in schema order, or None for the full representation
+
+    Raises:
+        HTTPException: If a field is unknown or none is given
+    """
+    if raw is None:
+        return None
+    requested = {name.strip() for name in raw.split(",") if name.strip()}
+    if not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="fields must name at least one field",
+        )
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                f"Unknown field(s): {', '.join(sorted(unknown))}; "
+                f"allowed: {', '.join(allowed)}"
+            ),
+        )
+    if requested == set(full or allowed):
+        return None
+    return tuple(name for name in allowed if name in requested)
+
+
+def field_params(
+    model: Type[BaseModel], exclude: Tuple[str, ...] = (), extra: Tuple[str, ...] = ()
+) -> Callable[..., Fields]:
+    """
+    Build a FastAPI dependency that parses ?fields= for model.
+
+    Args:
+        model: Response schema whose top-level fields can be selected
+        exclude: Fields that come along with another one (not selectable)
+        extra: Selectable fields beyond the schema's (not in the full one)
+    """
+    full = tuple(name for name in model.model_fields if name not in exclude)
+    allowed = full + extra
+
+    def dependency(fields: Optional[str] = _fields_query(allowed)) -> Fields:
+        return parse_fields(fields, allowed, full)
+
+    return dependency
+
+
+def _fields_query(allowed: Tuple[str, ...]):
+    """The ?fields= query parameter, documented with its allowed fields."""
+    return Query(None, description=f"Comma separated subset of: {', '.join(allowed)}")
+
+
+@lru_cache(maxsize=None)
+def sparse_model(
+    model: Type[BaseModel], extra: Tuple[Tuple[str, Any], ...] = ()
+) -> Type[BaseModel]:
+    """
+    Build the schema of model's ?fields= representations (cached per model).
+
+    Args:
+        model: Full response schema
+        extra: (name, type) of the selectable fields beyond the schema's
+
+    Returns:
+        Model named Sparse<model> whose fields, extra ones included, are all
+        optional: a sparse response only carries the requested ones
+    """
+    fields = {
+        name: (info.annotation, None) for name, info in model.model_fields.items()
+    }
+    fields.update((name, (annotation, None)) for name, annotation in extra)
+    return create_model(f"Sparse{model.__name__}", **fields)
+
+
+def with_items(model: Type[BaseModel], item: Any) -> Type[BaseModel]:
+    """Copy of a page/batch schema whose items are of type item."""
+    return create_model(
+        f"Sparse{model.__name__}", __base__=model, items=(List[item], ...)
+    )
+
+
+def variant(fields: Fields) -> str:
+    """ETag variant suffix for a sparse representation ("" when full)."""
+    return "" if fields is None else ";fields=" + ",".join(fields)
+
+
+# schemas.ShowBlog: title, body, id, user (+ excerpt, body_length)
+_BLOG_EXTRA = ("excerpt", "body_length")
+blog_fields = field_params(schemas.ShowBlog, extra=_BLOG_EXTRA)
+_BLOG_FULL = tuple(schemas.ShowBlog.model_fields)
+_BLOG_ALLOWED = _BLOG_FULL + _BLOG_EXTRA
+
+# response_model of the blog routes taking ?fields=
+_SPARSE_BLOG = sparse_model(schemas.ShowBlog, (("excerpt", str), ("body_length", int)))
+BLOG = Union[schemas.ShowBlog, _SPARSE_BLOG]
+BLOG_PAGE = with_items(schemas.BlogPage, BLOG)
+BLOG_BATCH = with_items(schemas.BlogBatch, BLOG)
+
+# ?view=excerpt on the list endpoints
+EXCERPT_VIEW = ("title", "id", "user", "excerpt", "body_length")
+
+
+def blog_list_fields(
+    view: Literal["full", "excerpt"] = Query(
+        "full", description="excerpt: excerpt and body_length instead of body"
+    ),
+    fields: Optional[str] = _fields_query(_BLOG_ALLOWED),
+) -> Fields:
+    """
+    Fieldset of a blog list: explicit ?fields= wins over ?view=.
+
+    The view is decided on the raw parameter, before parse_fields folds a
+    list of every field into None (which would read as "no ?fields=").
+    """
+    if fields is None:
+        return EXCERPT_VIEW if view == "excerpt" else None
+    return parse_fields(fields, _BLOG_ALLOWED, _BLOG_FULL)
+
+
+# schemas.ShowUser: id, email, name, blogs (blogs_next_cursor comes with blogs)
+# (+ stats, a schemas.UserStats)
+user_fields = field_params(
+    schemas.ShowUser, exclude=("blogs_next_cursor",), extra=("stats",)
+)
+
+# response_model of the user routes taking ?fields=
+_SPARSE_USER = sparse_model(schemas.ShowUser, (("stats", schemas.UserStats),))
+USER = Union[schemas.ShowUser, _SPARSE_USER]
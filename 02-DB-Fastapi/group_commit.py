@@ -0,0 +1,162 @@
+# Group commit for blog writes
+#
+# Every create/update normally ends in its own COMMIT, and with SQLite each
+# commit is a separate journal sync, which caps write throughput no matter
+# how many requests are waiting. With GROUP_COMMIT=1 those writes are handed
+# to a single writer thread instead: everything that arrives within
+# GROUP_COMMIT_MAX_DELAY_MS (up to GROUP_COMMIT_MAX_BATCH jobs) runs in one
+# transaction and is committed once.
+#
+# Each job runs in its own SAVEPOINT, so a job that raises (404, 403, ...)
+# is rolled back alone and only its caller sees the error. If the final
+# COMMIT fails, every job of the batch gets that error.
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional
+from sqlalchemy.orm import sessionmaker
+import database
+
+GROUP_COMMIT = os.getenv("GROUP_COMMIT", "0").lower() in ("1", "true", "yes")
+GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv("GROUP_COMMIT_MAX_DELAY_MS", "2"))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "64"))
+
+
+class GroupCommitter:
+    """
+    Single writer thread that coalesces write jobs into shared transactions.
+
+    A job is a repository function called as fn(db, *args, commit=False);
+    it must flush its changes but leave the commit to the committer.
+    """
+
+    def __init__(self, url: str, max_delay: float, max_batch: int):
+        self.engine = database.create_writer_engine(url)
+        self.max_delay = max_delay
+        self.max_batch = max(1, max_batch)
+        self._session = sessionmaker(bind=self.engine, autoflush=False)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.jobs = 0
+        self.largest_batch = 0
+        self._thread = threading.Thread(
+            target=self._run, name="group-commit", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, fn, *args) -> Future:
+        """Queue fn(db, *args, commit=False) and return a future of its result."""
+        future: Future = Future()
+        self._queue.put((future, fn, args))
+        return future
+
+    def close(self) -> None:
+        """Finish the queued jobs, stop the thread and dispose the engine."""
+        self._queue.put(None)
+        self._thread.join()
+        self.engine.dispose()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "jobs": self.jobs,
+                "largest_batch": self.largest_batch,
+                "avg_batch": self.jobs / (self.batches or 1),
+            }
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            job = self._queue.get()
+            if job is None:
+                return
+            batch = [job]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    job = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                batch.append(job)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch) -> None:
+        outcomes = []
+        db = self._session()
+        try:
+            for future, fn, args in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with db.begin_nested():
+                        outcomes.append((future, fn(db, *args, commit=False), None))
+                except Exception as error:
+                    outcomes.append((future, None, error))
+            db.commit()
+        except Exception as error:
+            db.rollback()
+            for future, _, job_error in outcomes:
+                future.set_exception(job_error or error)
+            return
+        finally:
+            db.close()
+
+        with self._lock:
+            self.batches += 1
+            self.jobs += len(outcomes)
+            self.largest_batch = max(self.largest_batch, len(outcomes))
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+_committer: Optional[GroupCommitter] = None
+_committer_lock = threading.Lock()
+
+
+def _get_committer() -> GroupCommitter:
+    global _committer
+    with _committer_lock:
+        if _committer is None:
+            _committer = GroupCommitter(
+                database.SQLALCHEMY_DATABASE_URL,
+                GROUP_COMMIT_MAX_DELAY_MS / 1000,
+                GROUP_COMMIT_MAX_BATCH,
+            )
+        return _committer
+
+
+def run(fn, *args):
+    """Run a write job through the group committer and wait for its result."""
+    return _get_committer().submit(fn, *args).result()
+
+
+async def run_async(fn, *args):
+    """Async counterpart of run() for the async routers."""
+    return await asyncio.wrap_future(_get_committer().submit(fn, *args))
+
+
+def stats() -> dict:
+    with _committer_lock:
+        committer = _committer
+    return committer.stats() if committer is not None else {}
+
+
+def shutdown() -> None:
+    """Flush and stop the writer thread (called from the app lifespan)."""
+    global _committer
+    with _committer_lock:
+        committer, _committer = _committer, None
+    if committer is not None:
+        committer.close()
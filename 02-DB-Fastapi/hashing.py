@@ -1,13 +1,176 @@
-from passlib.context import CryptContext
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+from fastapi import HTTPException, status
+import instrumentation
 
-pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@functools.lru_cache(maxsize=None)
+def pwd_context():
+    """The passlib context, created (and passlib/bcrypt imported) on first use."""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# Password hashing pool
+# bcrypt is deliberately slow CPU work; running it in worker processes keeps
+# a login burst from holding the GIL that every other endpoint needs.
+# HASH_WORKERS=0 hashes inline in the calling thread (useful for debugging).
+# HASH_MAX_PENDING bounds queued + running jobs; beyond it requests get a
+# fast 503 instead of waiting behind the backlog.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", "64"))
+
+
+def _timed_hash(password: str):
+    started = time.time()
+    result = pwd_context().hash(password)
+    return result, started, time.time() - started
+
+
+def _timed_verify(plain_password: str, hashed_password: str):
+    started = time.time()
+    result = pwd_context().verify(plain_password, hashed_password)
+    return result, started, time.time() - started
+
+
+class HashMetrics:
+    """Counters for the hashing pool (read with Hash.stats())."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_seconds = 0.0
+        self.hash_seconds = 0.0
+
+    def record(self, queue_wait: float, hash_time: float) -> None:
+        with self._lock:
+            self.completed += 1
+            self.queue_wait_seconds += queue_wait
+            self.hash_seconds += hash_time
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                "workers": HASH_WORKERS,
+                "max_pending": HASH_MAX_PENDING,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "queue_wait_seconds_total": self.queue_wait_seconds,
+                "hash_seconds_total": self.hash_seconds,
+                "queue_wait_seconds_avg": self.queue_wait_seconds / completed,
+                "hash_seconds_avg": self.hash_seconds / completed,
+            }
+
+
+metrics = HashMetrics()
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that already runs server threads is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """Stop the worker processes (called from the app lifespan)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _submit(fn, *args) -> Future:
+    """
+    Run fn(*args) on the hashing pool and return a future of its result.
+
+    Raises:
+        HTTPException: 503 if HASH_MAX_PENDING jobs are already in flight
+    """
+    with metrics._lock:
+        if metrics.pending >= HASH_MAX_PENDING:
+            metrics.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        metrics.pending += 1
+
+    submitted = time.time()
+    result: Future = Future()
+
+    def finish(job: Future) -> None:
+        with metrics._lock:
+            metrics.pending -= 1
+        if job.cancelled():
+            result.cancel()
+            return
+        error = job.exception()
+        if error is not None:
+            result.set_exception(error)
+            return
+        value, started, hash_time = job.result()
+        metrics.record(max(0.0, started - submitted), hash_time)
+        result.set_result(value)
+
+    if HASH_WORKERS <= 0:
+        job: Future = Future()
+        try:
+            job.set_result(fn(*args))
+        except Exception as error:
+            job.set_exception(error)
+        finish(job)
+    else:
+        _get_pool().submit(fn, *args).add_done_callback(finish)
+    return result
 
 
 class Hash:
+    # Each call is reported as the request's "hash" phase, queueing included
+
     @classmethod
     def bcrypt(cls, password: str):
-        return pwd_ctx.hash(password)
+        # Blocks the calling (threadpool) thread without holding the GIL
+        with instrumentation.timed("hash"):
+            return _submit(_timed_hash, password).result()
 
     @classmethod
     def verify(cls, plain_password: str, hashed_password: str):
-        return pwd_ctx.verify(plain_password, hashed_password)
+        with instrumentation.timed("hash"):
+            return _submit(_timed_verify, plain_password, hashed_password).result()
+
+    @classmethod
+    async def bcrypt_async(cls, password: str):
+        with instrumentation.timed("hash"):
+            return await asyncio.wrap_future(_submit(_timed_hash, password))
+
+    @classmethod
+    async def verify_async(cls, plain_password: str, hashed_password: str):
+        with instrumentation.timed("hash"):
+            return await asyncio.wrap_future(
+                _submit(_timed_verify, plain_password, hashed_password)
+            )
+
+    @classmethod
+    def stats(cls) -> dict:
+        return metrics.snapshot()
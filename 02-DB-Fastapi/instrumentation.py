@@ -0,0 +1,396 @@
+# Per-request instrumentation: Server-Timing headers and Prometheus metrics
+#
+# InstrumentationMiddleware gives every HTTP request a RequestTimings object
+# (held in a context variable, so threadpool workers and run_sync greenlets
+# see the same one). Code paths report into it:
+#
+#   auth       oauth2.get_current_user (cache lookup, JWT, user query)
+#   jwt        JWT signature check and decoding
+#   db         every SQL statement, via engine events (count and time)
+#   hash       bcrypt work in hashing.Hash, including time queued for a worker
+#   endpoint   the route function itself
+#   serialize  response model validation and JSON rendering (TimedRoute)
+#   compress   gzip/brotli encoding of the body (compression.py)
+#
+# Phases overlap (auth includes its db time). The totals are sent back in a
+# Server-Timing header and aggregated per route for GET /metrics.
+
+import asyncio
+import functools
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+import database
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Order of the phases in the Server-Timing header
+PHASES = ("auth", "jwt", "db", "hash", "endpoint", "serialize", "compress")
+
+# Engines that already report statement timings
+_instrumented_engines = weakref.WeakSet()
+
+
+class RequestTimings:
+    """Phase counters for a single request."""
+
+    def __init__(self):
+        self.phases: Dict[str, list] = {}
+        self.endpoint_done: Optional[float] = None
+
+    def add(self, phase: str, seconds: float, count: int = 1) -> None:
+        entry = self.phases.setdefault(phase, [0, 0.0])
+        entry[0] += count
+        entry[1] += seconds
+
+    def server_timing(self, total: float) -> str:
+        parts = []
+        for phase in PHASES:
+            if phase not in self.phases:
+                continue
+            count, seconds = self.phases[phase]
+            part = f"{phase};dur={seconds * 1000:.2f}"
+            if phase == "db":
+                part += f';desc="{count} queries"'
+            parts.append(part)
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def record(phase: str, seconds: float, count: int = 1) -> None:
+    """Add time to a phase of the current request (no-op outside requests)."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(phase, seconds, count)
+
+
+@contextmanager
+def timed(phase: str):
+    """Time the enclosed block as one occurrence of phase."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - started)
+
+
+def instrument_engine(engine) -> None:
+    """
+    Count and time every statement run on engine (once per engine, so
+    restarting an app on the same engines does not double count).
+
+    Args:
+        engine: Sync engine (use async_engine.sync_engine for async engines)
+    """
+    if engine in _instrumented_engines:
+        return
+    _instrumented_engines.add(engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._instrumentation_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_instrumentation_started", None)
+        if started is not None:
+            record("db", time.perf_counter() - started)
+
+
+def _timed_endpoint(call):
+    # Keeps the sync/async nature of call: FastAPI uses it to decide whether
+    # the endpoint runs on the threadpool
+    def finish(started: float) -> None:
+        timings = _current.get()
+        if timings is not None:
+            timings.endpoint_done = time.perf_counter()
+            timings.add("endpoint", timings.endpoint_done - started)
+
+    if asyncio.iscoroutinefunction(call):
+
+        @functools.wraps(call)
+        async def timed_call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                finish(started)
+
+    else:
+
+        @functools.wraps(call)
+        def timed_call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return call(*args, **kwargs)
+            finally:
+                finish(started)
+
+    return timed_call
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that reports endpoint and serialization time.
+
+    Serialization is the time from the endpoint returning to the route
+    handing back a Response: response_model validation plus JSON rendering.
+    The endpoint's database sessions are closed before it starts
+    (database.close_sessions_after), so connections are not held meanwhile.
+    """
+
+    def get_route_handler(self):
+        self.dependant.call = _timed_endpoint(
+            database.close_sessions_after(self.dependant.call)
+        )
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            timings = _current.get()
+            if timings is not None and timings.endpoint_done is not None:
+                timings.add("serialize", time.perf_counter() - timings.endpoint_done)
+            return response
+
+        return timed_handler
+
+
+class _Histogram:
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.buckets[index] += 1
+
+
+class MetricsRegistry:
+    """Process-wide request metrics, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], _Histogram] = {}
+        self.phase_seconds: Dict[Tuple[str, str], float] = {}
+        self.db_statements: Dict[str, int] = {}
+
+    def observe(
+        self, method: str, route: str, status: int, seconds: float, timings
+    ) -> None:
+        with self._lock:
+            key = (method, route, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.setdefault((method, route), _Histogram()).observe(seconds)
+            for phase, (count, phase_time) in timings.phases.items():
+                key = (route, phase)
+                self.phase_seconds[key] = self.phase_seconds.get(key, 0.0) + phase_time
+                if phase == "db":
+                    self.db_statements[route] = self.db_statements.get(route, 0) + count
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.latency.clear()
+            self.phase_seconds.clear()
+            self.db_statements.clear()
+
+    def render(self) -> str:
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels)} {value}")
+
+        with self._lock:
+            metric(
+                "http_requests_total",
+                "counter",
+                "HTTP requests by method, route and status.",
+                [
+                    ({"method": m, "route": r, "status": s}, n)
+                    for (m, r, s), n in sorted(self.requests.items())
+                ],
+            )
+            lines.append("# HELP http_request_duration_seconds HTTP request latency.")
+            lines.append("# TYPE http_request_duration_seconds histogram")
+            for (method, route), histogram in sorted(self.latency.items()):
+                labels = {"method": method, "route": route}
+                for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+                    lines.append(
+                        "http_request_duration_seconds_bucket"
+                        f"{_labels({**labels, 'le': bound})} {count}"
+                    )
+                lines.append(
+                    "http_request_duration_seconds_bucket"
+                    f"{_labels({**labels, 'le': '+Inf'})} {histogram.count}"
+                )
+                lines.append(
+                    f"http_request_duration_seconds_sum{_labels(labels)} "
+                    f"{histogram.sum}"
+                )
+                lines.append(
+                    f"http_request_duration_seconds_count{_labels(labels)} "
+                    f"{histogram.count}"
+                )
+            metric(
+                "http_request_phase_seconds_total",
+                "counter",
+                "Time spent per request phase (auth, jwt, db, hash, endpoint, "
+                "serialize, compress); phases overlap.",
+                [
+                    ({"route": r, "phase": p}, s)
+                    for (r, p), s in sorted(self.phase_seconds.items())
+                ],
+            )
+            metric(
+                "db_statements_total",
+                "counter",
+                "SQL statements executed while serving requests.",
+                [({"route": r}, n) for r, n in sorted(self.db_statements.items())],
+            )
+
+        # Component counters kept by their own modules
+        import changes
+        import group_commit
+        import jobs
+        import oauth2
+        import rate_limit
+        from hashing import Hash
+
+        for name, value in oauth2.token_cache.stats().items():
+            kind = "gauge" if name in ("size", "maxsize") else "counter"
+            suffix = "" if kind == "gauge" else "_total"
+            metric(
+                f"token_cache_{name}{suffix}",
+                kind,
+                f"Verified-token cache {name}.",
+                [({}, value)],
+            )
+        for name, value in Hash.stats().items():
+            if name in ("completed", "rejected"):
+                name += "_total"
+            kind = "counter" if name.endswith("_total") else "gauge"
+            metric(f"hash_pool_{name}", kind, f"bcrypt pool {name}.", [({}, value)])
+        for name, value in group_commit.stats().items():
+            metric(
+                f"group_commit_{name}", "gauge", f"Group commit {name}.", [({}, value)]
+            )
+        for name, value in rate_limit.stats().items():
+            kind = "gauge" if name.endswith("_keys") else "counter"
+            suffix = "" if kind == "gauge" else "_total"
+            metric(
+                f"auth_rate_limit_{name}{suffix}",
+                kind,
+                f"Auth rate limiter {name.replace('_', ' ')}.",
+                [({}, value)],
+            )
+        for name, value in changes.broker.stats().items():
+            kind = "gauge" if name == "subscribers" else "counter"
+            suffix = "" if kind == "gauge" else "_total"
+            metric(
+                f"blog_changes_{name}{suffix}",
+                kind,
+                f"Blog change feed {name}.",
+                [({}, value)],
+            )
+        for name, value in jobs.job_queue.stats().items():
+            kind = "gauge" if name in ("depth", "running") else "counter"
+            suffix = "_total" if kind == "counter" and "latency" not in name else ""
+            metric(
+                f"jobs_{name}{suffix}",
+                kind,
+                f"Background jobs {name.replace('_', ' ')}.",
+                [({}, value)],
+            )
+        pools = database.pool_stats()
+        for name, kind, help_text in (
+            ("checkouts_total", "counter", "Connections checked out of the pool."),
+            ("checked_out", "gauge", "Connections currently checked out."),
+            ("hold_seconds_total", "counter", "Time connections stayed checked out."),
+        ):
+            key = name.removesuffix("_total")
+            metric(
+                f"db_pool_{name}",
+                kind,
+                help_text,
+                [({"pool": role}, stats[key]) for role, stats in pools.items()],
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+registry = MetricsRegistry()
+
+
+def _route_label(scope) -> str:
+    # Label by route template, never the raw path, to bound cardinality
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or "unmatched"
+
+
+class InstrumentationMiddleware:
+    """ASGI middleware that times requests and adds a Server-Timing header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    timings.server_timing(time.perf_counter() - started),
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            registry.observe(
+                scope["method"],
+                _route_label(scope),
+                status_code,
+                time.perf_counter() - started,
+                timings,
+            )
@@ -0,0 +1,355 @@
+# Background jobs with a durable outbox
+#
+# Write handlers enqueue derived work (search index maintenance, ...) with
+# enqueue(db, kind, **payload): a row in job_outbox written in the caller's
+# transaction, so the job exists exactly when the write committed. After
+# the commit a pool of asyncio workers, started in the app lifespan, runs
+# the job once the response is on its way:
+#
+#   claim   the oldest due row is leased (run_after moved JOBS_LEASE seconds
+#           ahead), so a job whose process died is picked up again later
+#   run     handler(db, **payload) and the row's deletion commit together
+#   retry   a failing job is retried after JOBS_RETRY_DELAY * 2^(attempt-1)
+#           seconds; after JOBS_MAX_ATTEMPTS it is kept with run_after NULL
+#           and its last error (python jobs.py status / retry)
+#
+# Jobs run at least once, so handlers must be idempotent. Workers use their
+# own connections (a BEGIN IMMEDIATE pool, one per worker, and a read-only
+# one for the queue depth), never the request pools. On shutdown they drain the due jobs for up to
+# JOBS_DRAIN_TIMEOUT seconds; anything left stays in the outbox for the
+# next start.
+#
+# JOBS=0 runs every job inline inside enqueue() instead (the old
+# behaviour), e.g. for scripts that write without the app running.
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+from sqlalchemy import create_engine, delete, event, func, insert, select, update
+from sqlalchemy.orm import Session, sessionmaker
+import database
+import models
+
+JOBS = os.getenv("JOBS", "1").lower() in ("1", "true", "yes")
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "5"))
+JOBS_RETRY_DELAY = float(os.getenv("JOBS_RETRY_DELAY", "1"))
+JOBS_LEASE = float(os.getenv("JOBS_LEASE", "60"))
+# Idle workers look for due jobs (retries, other processes' jobs) this often
+JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "1"))
+JOBS_DRAIN_TIMEOUT = float(os.getenv("JOBS_DRAIN_TIMEOUT", "10"))
+
+_table = models.Job.__table__
+
+# kind -> handler(db, **payload); the handler must not commit
+HANDLERS: Dict[str, Callable[..., None]] = {}
+
+# Session.info key marking a session that enqueued jobs
+_ENQUEUED = "jobs_enqueued"
+
+
+def handler(kind: str):
+    """Decorator registering the handler of a job kind."""
+
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+
+    return register
+
+
+def enqueue(db: Session, kind: str, **payload) -> None:
+    """
+    Queue a job in db's transaction (no commit).
+
+    Args:
+        db: Session of the write the job derives from
+        kind: Registered job kind
+        payload: JSON-serializable keyword arguments of the handler
+    """
+    if not JOBS:
+        HANDLERS[kind](db, **payload)
+        return
+    now = time.time()
+    db.execute(
+        insert(_table).values(
+            kind=kind,
+            payload=json.dumps(payload),
+            attempts=0,
+            run_after=now,
+            created_at=now,
+        )
+    )
+    db.info[_ENQUEUED] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session: Session) -> None:
+    if session.info.pop(_ENQUEUED, False):
+        job_queue.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session: Session) -> None:
+    session.info.pop(_ENQUEUED, None)
+
+
+class JobQueue:
+    """
+    asyncio worker pool draining job_outbox.
+
+    Each worker claims and runs one job at a time in a thread, so handlers
+    may block on the database.
+    """
+
+    def __init__(
+        self,
+        workers: int = JOBS_WORKERS,
+        max_attempts: int = JOBS_MAX_ATTEMPTS,
+        retry_delay: float = JOBS_RETRY_DELAY,
+        lease: float = JOBS_LEASE,
+        poll_interval: float = JOBS_POLL_INTERVAL,
+    ):
+        self.workers = max(1, workers)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.engine = None
+        self._reader = None
+        self._session = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks = []
+        self._draining = False
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        self.errors = 0
+        self.latency_sum = 0.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self, url: str) -> None:
+        """Start the workers on the running loop."""
+        self.engine = database.create_writer_engine(url, pool_size=self.workers)
+        self._session = sessionmaker(bind=self.engine, autoflush=False)
+        # Counting the outbox must not take the write lock (or a worker's
+        # connection); an in-memory database only exists on the writer
+        self._reader = self.engine
+        if database.uses_file(url):
+            self._reader = create_engine(
+                url, connect_args={"check_same_thread": False}, pool_size=1
+            )
+            database.apply_sqlite_pragmas(self._reader, read_only=True)
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._draining = False
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"jobs-worker-{n}")
+            for n in range(self.workers)
+        ]
+
+    async def stop(self, timeout: float = JOBS_DRAIN_TIMEOUT) -> None:
+        """Run the due jobs (for up to timeout seconds), then stop."""
+        if not self._tasks:
+            return
+        self._draining = True
+        self._wakeup.set()
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+        self.engine.dispose()
+        self._reader.dispose()
+
+    def wake(self) -> None:
+        """Tell idle workers that jobs were committed (any thread)."""
+        loop, wakeup = self._loop, self._wakeup
+        if not self._tasks or loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(wakeup.set)
+
+    async def _work(self) -> None:
+        while True:
+            # Cleared before looking, so a commit made meanwhile wakes us
+            self._wakeup.clear()
+            try:
+                if await asyncio.to_thread(self.run_one):
+                    continue
+            except Exception:
+                # The outbox itself is unavailable (locked, ...): back off
+                self.errors += 1
+            if self._draining:
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def run_one(self) -> bool:
+        """
+        Claim and run the oldest due job.
+
+        Returns:
+            False if no job was due
+        """
+        now = time.time()
+        # Looked up on the read-only connection first, so an idle worker
+        # does not take the write lock every poll
+        if self._count(_table.c.run_after <= now) == 0:
+            return False
+        due = (
+            select(_table.c.id)
+            .where(_table.c.run_after <= now)
+            .order_by(_table.c.run_after)
+            .limit(1)
+            .scalar_subquery()
+        )
+        # Counted before the claim hides the row from join()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            with self._session() as db:
+                job = db.execute(
+                    update(_table)
+                    .where(_table.c.id == due)
+                    .values(run_after=now + self.lease, attempts=_table.c.attempts + 1)
+                    .returning(
+                        _table.c.id,
+                        _table.c.kind,
+                        _table.c.payload,
+                        _table.c.attempts,
+                        _table.c.created_at,
+                    )
+                ).first()
+                db.commit()
+                if job is None:
+                    return False  # another worker was first
+
+                try:
+                    HANDLERS[job.kind](db, **json.loads(job.payload))
+                    db.execute(delete(_table).where(_table.c.id == job.id))
+                    db.commit()
+                except Exception as error:
+                    db.rollback()
+                    self._record_failure(db, job, error)
+                    return True
+
+            with self._lock:
+                self.completed += 1
+                self.latency_sum += time.time() - job.created_at
+            return True
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _record_failure(self, db: Session, job, error: Exception) -> None:
+        if job.attempts >= self.max_attempts:
+            run_after = None  # given up; kept for inspection
+        else:
+            run_after = time.time() + self.retry_delay * 2 ** (job.attempts - 1)
+        db.execute(
+            update(_table)
+            .where(_table.c.id == job.id)
+            .values(run_after=run_after, last_error=repr(error)[:1000])
+        )
+        db.commit()
+        with self._lock:
+            if run_after is None:
+                self.failed += 1
+            else:
+                self.retried += 1
+
+    def join(self, timeout: float = 5.0) -> bool:
+        """
+        Wait until no job is due or running (any thread; for tests and
+        benchmarks).
+
+        Returns:
+            False if jobs were still pending after timeout
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            # Rows first: a job leaves the due rows only once it is in flight
+            if self._count(_table.c.run_after <= time.time()) == 0:
+                with self._lock:
+                    if self._in_flight == 0:
+                        return True
+            time.sleep(0.005)
+        return False
+
+    def _count(self, condition) -> int:
+        engine = self._reader if self.running else database.engine
+        with engine.connect() as conn:
+            return conn.execute(select(func.count()).where(condition)).scalar_one()
+
+    def stats(self) -> dict:
+        """
+        Queue depth and job counters, for GET /metrics.
+
+        depth counts every job not given up on (due, leased or waiting for a
+        retry); latency is from enqueue to completion.
+        """
+        depth = self._count(_table.c.run_after.is_not(None)) if self.running else 0
+        with self._lock:
+            return {
+                "depth": depth,
+                "running": self._in_flight,
+                "completed": self.completed,
+                "retried": self.retried,
+                "failed": self.failed,
+                "errors": self.errors,
+                "latency_seconds_sum": self.latency_sum,
+                "latency_seconds_count": self.completed,
+            }
+
+
+job_queue = JobQueue()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect the background jobs")
+    parser.add_argument("command", choices=["status", "retry"])
+    args = parser.parse_args()
+
+    import migrations
+
+    migrations.upgrade()
+    with database.SessionLocal() as db:
+        if args.command == "retry":
+            retried = db.execute(
+                update(_table)
+                .where(_table.c.run_after.is_(None))
+                .values(run_after=time.time(), attempts=0)
+            ).rowcount
+            db.commit()
+            print(f"Queued {retried} failed job(s) again")
+            return
+        pending = db.execute(
+            select(func.count()).where(_table.c.run_after.is_not(None))
+        ).scalar_one()
+        print(f"{pending} job(s) pending")
+        failed = db.execute(
+            select(_table.c.id, _table.c.kind, _table.c.attempts, _table.c.last_error)
+            .where(_table.c.run_after.is_(None))
+            .order_by(_table.c.id)
+        ).all()
+        print(f"{len(failed)} job(s) failed")
+        for job in failed:
+            print(
+                f"  {job.id:>6} {job.kind} ({job.attempts} attempts): {job.last_error}"
+            )
+
+
+if __name__ == "__main__":
+    main()
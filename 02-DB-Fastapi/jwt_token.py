@@ -1,6 +1,8 @@
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
+
+# jose (and the crypto backends it loads) is imported by the functions below
+# on first use, keeping it out of the app's import time
 
 # Secret key for JWT encoding/decoding
 SECRET_KEY = "your-secret-key-here"  # In production, use environment variables
@@ -19,6 +21,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     Returns:
         Encoded JWT token as string
     """
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -44,6 +48,8 @@ def verify_token(token: str, credentials_exception):
     Raises:
         credentials_exception: If token is invalid or expired
     """
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email = payload.get("sub")
@@ -1,24 +1,105 @@
+# Application factory
+#
+#     uvicorn --factory main:create_app    (or: uvicorn main:app)
+#
+# Importing this module is cheap: the routers, SQLAlchemy models and engines
+# are loaded by create_app(), and nothing connects to the database until the
+# app starts (its lifespan configures the engines and applies migrations).
+# passlib/bcrypt and jose are imported on first use (hashing.pwd_context,
+# jwt_token). test_startup.py holds import and startup to a time budget.
+
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI
-import models
-from database import engine
-from routers import blog, user, authentication
-
-
-app = FastAPI(
-    title="FastAPI Tutorial",
-    description="This is a simple tutorial for FastAPI",
-    version="1.0.0",
-)
-
-# Include routers
-app.include_router(blog.router)
-app.include_router(user.router)
-app.include_router(authentication.router)
-
-# Create all database tables
-# This line creates all tables defined in models.py if they don't exist
-# Base.metadata.create_all() scans all SQLAlchemy models and creates corresponding tables
-models.Base.metadata.create_all(engine)
+from settings import Settings
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """
+    Build the application for settings.
+
+    Args:
+        settings: Defaults to Settings.from_env()
+
+    Returns:
+        FastAPI app; its lifespan owns the engines, pools and workers
+    """
+    settings = settings or Settings.from_env()
+
+    import compression
+    import database
+    import group_commit
+    import hashing
+    import instrumentation
+    import jobs
+    import migrations
+    from routers import metrics
+
+    # use_async_db selects which router set is mounted; both expose the same API
+    if settings.use_async_db:
+        from routers import (
+            async_blog as blog,
+            async_user as user,
+            async_authentication as authentication,
+        )
+    else:
+        from routers import blog, user, authentication
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        database.configure(settings)
+        # Per-request timing of every statement (Server-Timing, /metrics)
+        for engine in database.active_engines():
+            instrumentation.instrument_engine(engine)
+        # Schema changes are applied here, not at import time (see migrations.py)
+        if settings.auto_migrate:
+            migrations.upgrade(settings.database_url)
+        # Post-write side effects (see jobs.py), run after the response
+        if jobs.JOBS:
+            await jobs.job_queue.start(settings.database_url)
+        yield
+        # Drain before the writers stop, so jobs enqueued by the last
+        # requests still run
+        await jobs.job_queue.stop()
+        group_commit.shutdown()
+        hashing.shutdown_pool()
+        await database.dispose()
+
+    app = FastAPI(
+        title="FastAPI Tutorial",
+        description="This is a simple tutorial for FastAPI",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+    app.state.settings = settings
+
+    # gzip/brotli for large JSON bodies (see compression.py); added first so
+    # the instrumentation below wraps it and times the compression too
+    if compression.COMPRESSION:
+        app.add_middleware(compression.CompressionMiddleware)
+    # Per-request timing (Server-Timing header) and the metrics behind /metrics
+    app.add_middleware(instrumentation.InstrumentationMiddleware)
+
+    # Include routers
+    app.include_router(blog.router)
+    app.include_router(user.router)
+    app.include_router(authentication.router)
+    app.include_router(metrics.router)
+    return app
+
+
+def __getattr__(name: str):
+    # `main:app` (uvicorn without --factory, the tests, the benchmarks) is
+    # built from the environment on first access
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Database tables and indexes are created by migrations.py (on startup
+# through the lifespan above, or with `python migrations.py upgrade`)
 
 
 # The /blog endpoint now uses dependency injection to get a DB session
@@ -0,0 +1,211 @@
+# Schema migrations
+#
+# The schema (tables, indexes, the FTS5 search index) is owned by the
+# numbered migrations below instead of Base.metadata.create_all at import
+# time. Applied versions are recorded in schema_migrations; each migration
+# runs in its own BEGIN IMMEDIATE transaction, so concurrent starters wait
+# for each other and a failing migration leaves no half-applied schema.
+#
+#     python migrations.py status
+#     python migrations.py upgrade
+#
+# The app also upgrades on startup (lifespan) unless AUTO_MIGRATE=0
+# (Settings.auto_migrate).
+#
+# Adding a migration: append a Migration with the next version number.
+# Never edit one that has shipped; its DDL is frozen, unlike models.py.
+
+import argparse
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Sequence, Union
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+import database
+
+# A step is a SQL statement or a function run with the migration's connection
+Step = Union[str, Callable[[Connection], None]]
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    steps: Sequence[Step]
+
+
+MIGRATIONS: List[Migration] = [
+    # Tables as create_all used to make them (IF NOT EXISTS: databases
+    # created before migrations existed already have them)
+    Migration(
+        1,
+        "initial_schema",
+        [
+            "CREATE TABLE IF NOT EXISTS users ("
+            "id INTEGER NOT NULL, email VARCHAR, name VARCHAR, password VARCHAR, "
+            "PRIMARY KEY (id), UNIQUE (email))",
+            "CREATE INDEX IF NOT EXISTS ix_users_id ON users (id)",
+            "CREATE TABLE IF NOT EXISTS blogs ("
+            "id INTEGER NOT NULL, title VARCHAR, body VARCHAR, user_id INTEGER, "
+            "PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id))",
+            "CREATE INDEX IF NOT EXISTS ix_blogs_id ON blogs (id)",
+            "CREATE TABLE IF NOT EXISTS resource_versions ("
+            "key VARCHAR NOT NULL, version INTEGER NOT NULL, "
+            "updated_at DATETIME NOT NULL, PRIMARY KEY (key))",
+            "CREATE VIRTUAL TABLE IF NOT EXISTS blogs_fts "
+            "USING fts5(title, body, tokenize='unicode61')",
+        ],
+    ),
+    # A user's blogs in id order (my-blogs, ShowUser pages, User.blogs):
+    # one index range scan instead of a scan of every blog. The user_id
+    # prefix also serves plain user_id lookups.
+    Migration(
+        2,
+        "blogs_user_id_index",
+        ["CREATE INDEX IF NOT EXISTS ix_blogs_user_id_id ON blogs (user_id, id)"],
+    ),
+    # Stored preview and length so list views can skip the body column;
+    # the backfill applies repository.blog.excerpt() as of this migration
+    # (200 characters, the last one replaced by "…" when cut)
+    Migration(
+        3,
+        "blogs_excerpt",
+        [
+            "ALTER TABLE blogs ADD COLUMN excerpt VARCHAR",
+            "ALTER TABLE blogs ADD COLUMN body_length INTEGER",
+            "UPDATE blogs SET body_length = length(body), excerpt = CASE "
+            "WHEN length(body) <= 200 THEN body "
+            "ELSE substr(body, 1, 199) || '…' END",
+        ],
+    ),
+    # Per-author counters (user_stats.py), backfilled from the existing
+    # blogs; their creation time was never stored, so last_post_at starts
+    # out NULL for them
+    Migration(
+        4,
+        "user_blog_stats",
+        [
+            "CREATE TABLE IF NOT EXISTS user_blog_stats ("
+            "user_id INTEGER NOT NULL, blog_count INTEGER NOT NULL, "
+            "body_bytes INTEGER NOT NULL, last_post_at DATETIME, "
+            "PRIMARY KEY (user_id), FOREIGN KEY(user_id) REFERENCES users (id))",
+            "INSERT INTO user_blog_stats (user_id, blog_count, body_bytes) "
+            "SELECT user_id, count(*), "
+            "coalesce(sum(length(CAST(body AS BLOB))), 0) "
+            "FROM blogs WHERE user_id IS NOT NULL GROUP BY user_id",
+        ],
+    ),
+    # Durable outbox of the background jobs (jobs.py); workers pick the
+    # next due job through the run_after index
+    Migration(
+        5,
+        "job_outbox",
+        [
+            "CREATE TABLE IF NOT EXISTS job_outbox ("
+            "id INTEGER NOT NULL, kind VARCHAR NOT NULL, payload VARCHAR NOT NULL, "
+            "attempts INTEGER NOT NULL, run_after FLOAT, created_at FLOAT NOT NULL, "
+            "last_error VARCHAR, PRIMARY KEY (id))",
+            "CREATE INDEX IF NOT EXISTS ix_job_outbox_run_after "
+            "ON job_outbox (run_after)",
+        ],
+    ),
+    # Deleted resources keep their version row as a tombstone, so
+    # conditional GETs stop matching them (versions.check)
+    Migration(
+        6,
+        "resource_version_tombstones",
+        [
+            "ALTER TABLE resource_versions "
+            "ADD COLUMN deleted BOOLEAN NOT NULL DEFAULT 0",
+        ],
+    ),
+]
+
+
+def _ensure_table(conn: Connection) -> None:
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+            "applied_at DATETIME NOT NULL)"
+        )
+    )
+
+
+def _applied(conn: Connection) -> set:
+    return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def status(url: Optional[str] = None) -> List[tuple]:
+    """
+    Return (version, name, applied) for every known migration.
+    """
+    engine = database.create_writer_engine(url or database.SQLALCHEMY_DATABASE_URL)
+    try:
+        with engine.begin() as conn:
+            _ensure_table(conn)
+            applied = _applied(conn)
+    finally:
+        engine.dispose()
+    return [(m.version, m.name, m.version in applied) for m in MIGRATIONS]
+
+
+def upgrade(url: Optional[str] = None) -> List[str]:
+    """
+    Apply every pending migration, oldest first.
+
+    Args:
+        url: Database URL (defaults to the app's)
+
+    Returns:
+        Names of the migrations applied by this call
+    """
+    engine = database.create_writer_engine(url or database.SQLALCHEMY_DATABASE_URL)
+    done = []
+    try:
+        for migration in MIGRATIONS:
+            with engine.begin() as conn:
+                _ensure_table(conn)
+                # Checked under the write lock: another process may have
+                # applied it while we waited
+                if migration.version in _applied(conn):
+                    continue
+                for step in migration.steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(text(step))
+                conn.execute(
+                    text(
+                        "INSERT INTO schema_migrations (version, name, applied_at) "
+                        "VALUES (:version, :name, :applied_at)"
+                    ),
+                    {
+                        "version": migration.version,
+                        "name": migration.name,
+                        "applied_at": datetime.now(timezone.utc).replace(tzinfo=None),
+                    },
+                )
+            done.append(migration.name)
+    finally:
+        engine.dispose()
+    return done
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the database schema")
+    parser.add_argument("command", choices=["status", "upgrade"])
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        applied = upgrade()
+        print(f"Applied {len(applied)} migration(s)")
+        for name in applied:
+            print(f"  {name}")
+        return
+    for version, name, applied in status():
+        print(f"{version:>4}  {'applied' if applied else 'pending':<8} {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,11 @@
 
 # Import SQLAlchemy column types and the Base class
 from sqlalchemy import (
+    Boolean,
     Column,
+    DateTime,
+    Float,
+    Index,
     Integer,
     String,
     ForeignKey,
@@ -21,9 +25,16 @@ class Blog(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String)
     body = Column(String)
+    # Preview for list views and len(body), kept in sync by repository.blog
+    # so lists can leave the (unbounded) body unloaded
+    excerpt = Column(String)
+    body_length = Column(Integer)
     user_id = Column(Integer, ForeignKey("users.id"))
     user = relationship("User", back_populates="blogs")
 
+    # Created by migrations.py (the schema is managed there, not here)
+    __table_args__ = (Index("ix_blogs_user_id_id", "user_id", "id"),)
+
 
 class User(Base):
     __tablename__ = "users"
@@ -32,3 +43,42 @@ class User(Base):
     name = Column(String)
     password = Column(String)
     blogs = relationship("Blog", back_populates="user")
+
+
+class ResourceVersion(Base):
+    # Change counter per cacheable resource, used for ETag / Last-Modified
+    # key is "blogs" (the collection), "blog:<id>" or "user:<id>"
+    __tablename__ = "resource_versions"
+    key = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, nullable=False)
+    # Tombstone: the resource was deleted by the write that made this version
+    deleted = Column(Boolean, nullable=False, default=False)
+
+
+class UserBlogStats(Base):
+    # Per-author counters maintained by repository.blog in the same
+    # transaction as each blog write (see user_stats.py); no row means no
+    # blogs yet. last_post_at is when the author last created a blog.
+    __tablename__ = "user_blog_stats"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    blog_count = Column(Integer, nullable=False, default=0)
+    body_bytes = Column(Integer, nullable=False, default=0)
+    last_post_at = Column(DateTime)
+
+
+class Job(Base):
+    # Outbox of background jobs (jobs.py), written in the transaction of the
+    # write they derive from. run_after is a Unix time: when the job is due,
+    # or until when a worker holds it; NULL once it failed for good.
+    __tablename__ = "job_outbox"
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    payload = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    run_after = Column(Float)
+    created_at = Column(Float, nullable=False)
+    last_error = Column(String)
+
+    # Created by migrations.py
+    __table_args__ = (Index("ix_job_outbox_run_after", "run_after"),)
@@ -1,26 +1,51 @@
+import os
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 import database
 import models
+import schemas
 import jwt_token
+import instrumentation
+from token_cache import TokenCache
 
 # OAuth2 scheme for token extraction
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
+# Verified-token cache
+# TOKEN_CACHE_SIZE=0 disables it; TOKEN_CACHE_TTL caps how long an entry
+# may live even if the token itself expires later (seconds)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+token_cache = TokenCache(maxsize=TOKEN_CACHE_SIZE, max_ttl=TOKEN_CACHE_TTL)
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)
-):
+
+def invalidate_user(user_id: int) -> None:
     """
-    Get the current authenticated user from JWT token.
+    Drop cached tokens for a user. Call after changing or deleting a user
+    through a path that skips ORM events (e.g. query().update()).
+    """
+    token_cache.invalidate_user(user_id)
+
+
+# ORM changes to a User row invalidate its cached tokens automatically
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    invalidate_user(target.id)
+
+
+def resolve_user(db: Session, token: str) -> schemas.UserResponse:
+    """
+    Resolve a JWT token to the user it was issued for.
 
     Args:
-        token: JWT token from Authorization header
         db: Database session
+        token: JWT token from Authorization header
 
     Returns:
-        User model instance
+        Identity (id, name, email) of the token's user
 
     Raises:
         HTTPException: If token is invalid or user not found
@@ -32,7 +57,8 @@ def get_current_user(
     )
 
     # Verify token and get payload
-    payload = jwt_token.verify_token(token, credentials_exception)
+    with instrumentation.timed("jwt"):
+        payload = jwt_token.verify_token(token, credentials_exception)
     email = payload.get("sub")
 
     if email is None:
@@ -43,4 +69,49 @@ def get_current_user(
     if user is None:
         raise credentials_exception
 
-    return user
+    identity = schemas.UserResponse.model_validate(user)
+    token_cache.put(token, identity, identity.id, payload.get("exp"))
+    return identity
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    sessions: database.RequestSessions = Depends(database.request_sessions),
+) -> schemas.UserResponse:
+    """
+    Get the current authenticated user from JWT token.
+
+    Cached tokens are answered without verifying the JWT or querying the DB.
+    Otherwise the user is looked up on the session the route itself uses,
+    created here if the route has not asked for it yet.
+
+    Args:
+        token: JWT token from Authorization header
+        sessions: Database sessions of the request
+
+    Returns:
+        Identity (id, name, email) of the current user
+
+    Raises:
+        HTTPException: If token is invalid or user not found
+    """
+    with instrumentation.timed("auth"):
+        cached = token_cache.get(token)
+        if cached is not None:
+            return cached
+        return resolve_user(sessions.get(sessions.writes), token)
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    sessions: database.RequestSessions = Depends(database.request_sessions),
+) -> schemas.UserResponse:
+    """
+    Async variant of get_current_user for the routers/async_* modules.
+    """
+    with instrumentation.timed("auth"):
+        cached = token_cache.get(token)
+        if cached is not None:
+            return cached
+        db = sessions.get_async(sessions.writes)
+        return await db.run_sync(resolve_user, token)
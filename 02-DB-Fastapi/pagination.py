@@ -0,0 +1,107 @@
+import base64
+import binascii
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import HTTPException, Query, status
+
+# Page size limits shared by every paginated endpoint
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+CURSOR_PREFIX = "id:"
+
+# Largest value SQLite can bind as an INTEGER
+MAX_CURSOR_ID = 2**63 - 1
+
+
+@dataclass(frozen=True)
+class PageParams:
+    """
+    Keyset pagination parameters resolved from the query string.
+
+    Attributes:
+        limit: Maximum number of rows to return (already capped)
+        after_id: Only rows with an id greater than this are returned
+    """
+
+    limit: int = DEFAULT_PAGE_SIZE
+    after_id: int = 0
+
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Encode the id of the last row on a page into an opaque cursor.
+
+    Args:
+        last_id: Primary key of the last row returned
+
+    Returns:
+        URL-safe cursor string
+    """
+    raw = f"{CURSOR_PREFIX}{last_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor: Opaque cursor string from a previous page
+
+    Returns:
+        The id the next page starts after
+
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        if not raw.startswith(CURSOR_PREFIX):
+            raise ValueError(raw)
+        last_id = int(raw[len(CURSOR_PREFIX) :])
+        if not 0 <= last_id <= MAX_CURSOR_ID:
+            raise ValueError(raw)
+        return last_id
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def page_params(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor from a previous page"),
+) -> PageParams:
+    """
+    FastAPI dependency that turns ?limit=&after= into PageParams.
+    """
+    return PageParams(limit=limit, after_id=decode_cursor(after) if after else 0)
+
+
+def paginate(query, id_column, params: PageParams):
+    """
+    Apply keyset pagination to a SQLAlchemy query.
+
+    One extra row is fetched to find out whether another page exists,
+    so no COUNT(*) is ever needed.
+
+    Args:
+        query: Query to paginate
+        id_column: Unique, monotonically increasing column to page on
+        params: Page parameters
+
+    Returns:
+        Tuple of (rows, next_cursor); next_cursor is None on the last page
+    """
+    rows = (
+        query.filter(id_column > params.after_id)
+        .order_by(id_column)
+        .limit(params.limit + 1)
+        .all()
+    )
+    if len(rows) > params.limit:
+        rows = rows[: params.limit]
+        return rows, encode_cursor(rows[-1].id)
+    return rows, None
@@ -0,0 +1,160 @@
+# Admission control for the authentication endpoints
+#
+# /auth/signup, /auth/login and /auth/token each cost a bcrypt computation,
+# so a credential-stuffing burst is CPU exhaustion for the whole service.
+# Every call first takes a token from two buckets:
+#
+#   per client IP  checked by the limit_client dependency, on the event loop,
+#                  before the handler (and its threadpool slot) is reached
+#   per email      checked by admit_email() at the top of the handler,
+#                  before the user lookup and any hashing
+#
+# An empty bucket answers 429 with Retry-After. The client IP is the socket
+# peer; run uvicorn with --proxy-headers behind a trusted reverse proxy.
+#
+# AUTH_RATE_LIMIT=0 disables both limiters. Rates are tokens per second,
+# bursts the bucket sizes.
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+from fastapi import HTTPException, Request, status
+
+AUTH_RATE_LIMIT = os.getenv("AUTH_RATE_LIMIT", "1").lower() in ("1", "true", "yes")
+AUTH_IP_RATE = float(os.getenv("AUTH_IP_RATE", "5"))
+AUTH_IP_BURST = float(os.getenv("AUTH_IP_BURST", "30"))
+AUTH_EMAIL_RATE = float(os.getenv("AUTH_EMAIL_RATE", "0.2"))
+AUTH_EMAIL_BURST = float(os.getenv("AUTH_EMAIL_BURST", "5"))
+# Buckets kept per limiter; the least recently used are dropped beyond it
+AUTH_RATE_LIMIT_KEYS = int(os.getenv("AUTH_RATE_LIMIT_KEYS", "100000"))
+
+
+class _Shard:
+    __slots__ = ("lock", "buckets", "allowed", "rejected")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> [tokens, last refill time], least recently used first
+        self.buckets: "OrderedDict[str, list]" = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by an arbitrary string (IP address, email, ...).
+
+    Each key may spend `burst` requests at once and regains `rate` per
+    second. Keys are spread over independently locked shards, so threadpool
+    workers checking different clients rarely wait on each other.
+
+    Thread safe.
+    """
+
+    def __init__(
+        self, rate: float, burst: float, max_keys: int = 100000, shards: int = 16
+    ):
+        self.rate = rate
+        self.burst = burst
+        self._max_keys_per_shard = max(1, max_keys // shards)
+        self._shards: List[_Shard] = [_Shard() for _ in range(shards)]
+
+    def acquire(self, key: str) -> float:
+        """
+        Take one token for key.
+
+        Returns:
+            0.0 if the request is admitted, otherwise the seconds until a
+            token is available
+        """
+        shard = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+        with shard.lock:
+            bucket = shard.buckets.get(key)
+            if bucket is None:
+                bucket = shard.buckets[key] = [self.burst, now]
+                if len(shard.buckets) > self._max_keys_per_shard:
+                    shard.buckets.popitem(last=False)
+            else:
+                shard.buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                shard.allowed += 1
+                return 0.0
+            shard.rejected += 1
+            if self.rate <= 0:
+                return math.inf
+            return (1 - bucket[0]) / self.rate
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.buckets.clear()
+
+    def stats(self) -> dict:
+        """Return admitted/rejected counters and the number of tracked keys."""
+        totals = {"allowed": 0, "rejected": 0, "keys": 0}
+        for shard in self._shards:
+            with shard.lock:
+                totals["allowed"] += shard.allowed
+                totals["rejected"] += shard.rejected
+                totals["keys"] += len(shard.buckets)
+        return totals
+
+
+ip_limiter = TokenBucketLimiter(AUTH_IP_RATE, AUTH_IP_BURST, AUTH_RATE_LIMIT_KEYS)
+email_limiter = TokenBucketLimiter(
+    AUTH_EMAIL_RATE, AUTH_EMAIL_BURST, AUTH_RATE_LIMIT_KEYS
+)
+
+
+def _too_many_requests(retry_after: float) -> HTTPException:
+    seconds = 3600 if math.isinf(retry_after) else max(1, math.ceil(retry_after))
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many attempts, please retry later",
+        headers={"Retry-After": str(seconds)},
+    )
+
+
+async def limit_client(request: Request) -> None:
+    """
+    Route dependency: spend a token from the caller's per-IP bucket.
+
+    Raises:
+        HTTPException: 429 if the client IP is over its rate
+    """
+    if not AUTH_RATE_LIMIT:
+        return
+    client: Optional[str] = request.client.host if request.client else None
+    retry_after = ip_limiter.acquire(client or "unknown")
+    if retry_after:
+        raise _too_many_requests(retry_after)
+
+
+def admit_email(email: str) -> None:
+    """
+    Spend a token from email's bucket; call before looking up or hashing.
+
+    Raises:
+        HTTPException: 429 if the email is over its rate
+    """
+    if not AUTH_RATE_LIMIT:
+        return
+    retry_after = email_limiter.acquire(email.strip().lower())
+    if retry_after:
+        raise _too_many_requests(retry_after)
+
+
+def stats() -> dict:
+    """Counters of both limiters, for GET /metrics."""
+    return {
+        f"{scope}_{name}": value
+        for scope, limiter in (("ip", ip_limiter), ("email", email_limiter))
+        for name, value in limiter.stats().items()
+    }
@@ -0,0 +1,29 @@
+# Token helpers shared by the sync and async authentication routers
+
+from datetime import timedelta
+from fastapi import HTTPException, status
+import models
+import jwt_token
+
+
+def invalid_credentials() -> HTTPException:
+    """Return the 401 raised for an unknown email or a wrong password."""
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def issue_token(user: models.User) -> dict:
+    """
+    Create the JWT access token response for an authenticated user.
+
+    Returns:
+        JWT access token and token type
+    """
+    access_token_expires = timedelta(minutes=jwt_token.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = jwt_token.create_access_token(
+        data={"sub": user.email, "user_id": user.id}, expires_delta=access_token_expires
+    )
+    return {"access_token": access_token, "token_type": "bearer"}
@@ -0,0 +1,401 @@
+# Blog data access shared by the sync routers (routers/blog.py) and the
+# async routers (routers/async_blog.py, through AsyncSession.run_sync)
+
+from typing import Any, List
+from fastapi import HTTPException, status
+from pydantic import ValidationError, conint
+from sqlalchemy import delete, insert, select
+from sqlalchemy import update as update_statement
+from sqlalchemy.orm import Session, joinedload, load_only
+import jobs
+import models
+import schemas
+import search
+import user_stats
+import versions
+from fieldsets import Fields
+from pagination import MAX_CURSOR_ID, PageParams, paginate
+
+# Loading strategy for blogs serialized as schemas.ShowBlog
+# The author is fetched in the same SELECT (LEFT OUTER JOIN) instead of
+# one lazy load per blog during response serialization
+SHOW_BLOG_OPTIONS = (joinedload(models.Blog.user),)
+
+
+def show_blog_options(fields: Fields = None) -> tuple:
+    """
+    Loading strategy for a (sparse) schemas.ShowBlog.
+
+    Only the requested columns are selected (id always, for the cursor) and
+    the author is joined only when "user" is requested. Reading a column
+    that was left out raises instead of issuing a query per row.
+    """
+    if fields is None:
+        return SHOW_BLOG_OPTIONS
+    columns = [
+        getattr(models.Blog, name)
+        for name in fields
+        if name in ("title", "body", "excerpt", "body_length")
+    ]
+    options = [load_only(models.Blog.id, *columns, raiseload=True)]
+    if "user" in fields:
+        options.append(joinedload(models.Blog.user))
+    return tuple(options)
+
+
+# Largest batch accepted by POST /blog/bulk
+MAX_BULK_ITEMS = 500
+
+# Most IDs one GET/POST /blog/batch may ask for
+MAX_BATCH_IDS = 200
+
+# A blog ID SQLite can bind (larger ones overflow the driver)
+BatchId = conint(ge=1, le=MAX_CURSOR_ID)
+
+# Characters of the body stored as Blog.excerpt
+EXCERPT_LENGTH = 200
+
+
+def excerpt(body: str) -> str:
+    """
+    Preview stored in Blog.excerpt: the body itself when short enough, else
+    its first EXCERPT_LENGTH - 1 characters followed by "…".
+    """
+    if len(body) <= EXCERPT_LENGTH:
+        return body
+    return body[: EXCERPT_LENGTH - 1] + "…"
+
+
+def body_columns(body: str) -> dict:
+    """Blog column values derived from body (body, excerpt, body_length)."""
+    return {"body": body, "excerpt": excerpt(body), "body_length": len(body)}
+
+
+def get_all(db: Session, page: PageParams, fields: Fields = None):
+    """
+    Return one page of blogs from all users.
+
+    Args:
+        db: Database session
+        page: Page size and cursor
+        fields: Sparse fieldset to load (None for the full ShowBlog)
+
+    Returns:
+        Dict with the page items and the next cursor
+    """
+    query = db.query(models.Blog).options(*show_blog_options(fields))
+    blogs, next_cursor = paginate(query, models.Blog.id, page)
+    return {"items": blogs, "next_cursor": next_cursor}
+
+
+def get_for_user(db: Session, user_id: int, page: PageParams, fields: Fields = None):
+    """
+    Return one page of blogs written by a single user.
+
+    Args:
+        db: Database session
+        user_id: Author ID
+        page: Page size and cursor
+        fields: Sparse fieldset to load (None for the full ShowBlog)
+
+    Returns:
+        Dict with the page items and the next cursor
+    """
+    query = (
+        db.query(models.Blog)
+        .options(*show_blog_options(fields))
+        .filter(models.Blog.user_id == user_id)
+    )
+    blogs, next_cursor = paginate(query, models.Blog.id, page)
+    return {"items": blogs, "next_cursor": next_cursor}
+
+
+def show(db: Session, id: int, fields: Fields = None):
+    """
+    Return a single blog with its author (or only the requested fields).
+
+    Raises:
+        HTTPException: If blog not found
+    """
+    blog = (
+        db.query(models.Blog)
+        .options(*show_blog_options(fields))
+        .filter(models.Blog.id == id)
+        .first()
+    )
+    if not blog:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Blog with id {id} not found",
+        )
+    return blog
+
+
+def parse_ids(raw: str) -> List[int]:
+    """
+    Parse the comma separated ?ids= of GET /blog/batch.
+
+    Raises:
+        HTTPException: If an ID is not an integer (400) or not a possible
+            blog ID (422, like the POST body)
+    """
+    try:
+        ids = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be comma separated integers",
+        )
+    if any(not 1 <= id <= MAX_CURSOR_ID for id in ids):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"ids must be between 1 and {MAX_CURSOR_ID}",
+        )
+    return ids
+
+
+def get_many(db: Session, ids: List[int], fields: Fields = None) -> dict:
+    """
+    Return the blogs with the given IDs, in request order, in one query.
+
+    The blogs and their authors come from a single SELECT ... WHERE id IN
+    (...) with the author joined; duplicate IDs are answered once.
+
+    Args:
+        db: Database session
+        ids: Blog IDs, at most MAX_BATCH_IDS
+        fields: Sparse fieldset to load (None for the full ShowBlog)
+
+    Returns:
+        Dict with the found blogs ("items") and the IDs that do not exist
+        ("missing"), both in request order
+
+    Raises:
+        HTTPException: If no ID or more than MAX_BATCH_IDS are given
+    """
+    ids = list(dict.fromkeys(ids))
+    if not ids or len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Ask for between 1 and {MAX_BATCH_IDS} blog ids",
+        )
+    query = (
+        db.query(models.Blog)
+        .options(*show_blog_options(fields))
+        .filter(models.Blog.id.in_(ids))
+    )
+    found = {blog.id: blog for blog in query}
+    return {
+        "items": [found[id] for id in ids if id in found],
+        "missing": [id for id in ids if id not in found],
+    }
+
+
+def create(
+    db: Session,
+    request: schemas.Blog,
+    current_user: schemas.UserResponse,
+    commit: bool = True,
+):
+    """
+    Create a blog owned by current_user.
+
+    Args:
+        db: Database session
+        request: Blog data (title, body)
+        current_user: Owner of the new blog
+        commit: Commit the transaction (group_commit passes False)
+
+    Returns:
+        The new blog with its author
+    """
+    new_blog = models.Blog(
+        title=request.title, user_id=current_user.id, **body_columns(request.body)
+    )
+    db.add(new_blog)
+    db.flush()
+    jobs.enqueue(db, search.REINDEX, ids=[new_blog.id])
+    user_stats.record_posts(db, current_user.id, 1, user_stats.body_bytes(request.body))
+    versions.bump(
+        db,
+        versions.BLOGS,
+        versions.blog_key(new_blog.id),
+        versions.user_key(current_user.id),
+    )
+    if commit:
+        db.commit()
+    # The author is the current user, so build the response from the
+    # identity we already have instead of loading the relationship
+    return schemas.ShowBlog(
+        id=new_blog.id,
+        title=new_blog.title,
+        body=new_blog.body,
+        user=schemas.UserInBlog.model_validate(current_user),
+    )
+
+
+def create_many(
+    db: Session,
+    items: List[Any],
+    current_user: schemas.UserResponse,
+    atomic: bool = False,
+) -> schemas.BulkCreateResult:
+    """
+    Validate and insert many blogs in a single transaction.
+
+    Items are validated one by one so a bad item is reported by index
+    instead of rejecting the whole request. Valid items are inserted with
+    one multi-row INSERT ... RETURNING and indexed with one executemany.
+
+    Args:
+        db: Database session
+        items: Raw JSON objects, each expected to match schemas.Blog
+        current_user: Owner of the new blogs
+        atomic: Insert nothing if any item is invalid
+
+    Returns:
+        IDs of the created blogs and per-item validation errors
+
+    Raises:
+        HTTPException: 422 if atomic and at least one item is invalid
+    """
+    rows = []
+    errors = []
+    for index, item in enumerate(items):
+        try:
+            blog = schemas.Blog.model_validate(item)
+        except ValidationError as error:
+            errors.append(
+                schemas.BulkItemError(
+                    index=index,
+                    errors=error.errors(include_url=False, include_context=False),
+                )
+            )
+            continue
+        rows.append(
+            {"title": blog.title, "user_id": current_user.id, **body_columns(blog.body)}
+        )
+
+    if errors and atomic:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=[error.model_dump() for error in errors],
+        )
+
+    ids = []
+    if rows:
+        # Without sort_by_parameter_order SQLAlchemy sends one multi-row
+        # INSERT ... RETURNING per batch. RETURNING order is unspecified, but
+        # SQLite gives each new row max(rowid) + 1 in VALUES order while this
+        # transaction holds the write lock, so sorted IDs line up with rows.
+        ids = sorted(db.scalars(insert(models.Blog).returning(models.Blog.id), rows))
+        jobs.enqueue(db, search.REINDEX, ids=ids)
+        user_stats.record_posts(
+            db,
+            current_user.id,
+            len(ids),
+            sum(user_stats.body_bytes(row["body"]) for row in rows),
+        )
+        versions.bump(
+            db,
+            versions.BLOGS,
+            versions.user_key(current_user.id),
+            *(versions.blog_key(id) for id in ids),
+        )
+        db.commit()
+    return schemas.BulkCreateResult(created=ids, errors=errors)
+
+
+def write_refused(db: Session, id: int, action: str) -> HTTPException:
+    """
+    Explain why an ownership-checked write on a blog matched no row.
+
+    Only runs on the failure path: one primary key lookup tells a missing
+    blog (404) from one owned by someone else (403).
+
+    Args:
+        db: Database session
+        id: Blog ID
+        action: Verb used in the 403 message ("update", "delete")
+    """
+    if db.execute(select(models.Blog.id).where(models.Blog.id == id)).first() is None:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Blog not found"
+        )
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail=f"Not authorized to {action} this blog",
+    )
+
+
+def destroy(db: Session, id: int, current_user: schemas.UserResponse):
+    """
+    Delete a blog. Only the blog owner can delete it.
+
+    Raises:
+        HTTPException: If blog not found or user not authorized
+    """
+    # One statement deletes the blog only if current_user owns it
+    deleted = db.execute(
+        delete(models.Blog)
+        .where(models.Blog.id == id, models.Blog.user_id == current_user.id)
+        .returning(models.Blog.id, models.Blog.body)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if deleted is None:
+        raise write_refused(db, id, "delete")
+    jobs.enqueue(db, search.REINDEX, ids=[id])
+    user_stats.record_removal(db, current_user.id, user_stats.body_bytes(deleted.body))
+    versions.bump(
+        db,
+        versions.BLOGS,
+        versions.blog_key(id),
+        versions.user_key(current_user.id),
+        deleted={versions.blog_key(id)},
+    )
+    db.commit()
+    return {"detail": "Blog deleted successfully"}
+
+
+def update(
+    db: Session,
+    id: int,
+    request: schemas.Blog,
+    current_user: schemas.UserResponse,
+    commit: bool = True,
+):
+    """
+    Update a blog. Only the blog owner can update it.
+
+    Args:
+        db: Database session
+        id: Blog ID
+        request: Updated blog data (title, body)
+        current_user: Current authenticated user
+        commit: Commit the transaction (group_commit passes False)
+
+    Raises:
+        HTTPException: If blog not found or user not authorized
+    """
+    # Reads the old body size, so it has to precede the blog update; it
+    # changes nothing unless current_user owns the blog
+    user_stats.record_rewrite(
+        db, id, current_user.id, user_stats.body_bytes(request.body)
+    )
+    # One statement updates the blog only if current_user owns it
+    updated = db.scalar(
+        update_statement(models.Blog)
+        .where(models.Blog.id == id, models.Blog.user_id == current_user.id)
+        .values(title=request.title, **body_columns(request.body))
+        .returning(models.Blog.id)
+        .execution_options(synchronize_session=False)
+    )
+    if updated is None:
+        raise write_refused(db, id, "update")
+    jobs.enqueue(db, search.REINDEX, ids=[id])
+    versions.bump(
+        db, versions.BLOGS, versions.blog_key(id), versions.user_key(current_user.id)
+    )
+    if commit:
+        db.commit()
+    return {"detail": "Blog updated successfully"}
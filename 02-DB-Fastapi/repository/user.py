@@ -0,0 +1,143 @@
+# User data access shared by the sync and async user/authentication routers
+
+from typing import Optional
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session, load_only, raiseload
+import models
+import fast_json
+import schemas
+import user_stats
+import versions
+from fieldsets import Fields
+from pagination import PageParams, paginate
+
+# Loading strategy for users serialized as schemas.ShowUser
+# User.blogs is never loaded through the relationship: show_user() queries
+# one page of blogs explicitly, and raiseload turns any accidental full
+# load of the collection into an error instead of a silent extra query
+SHOW_USER_OPTIONS = (raiseload(models.User.blogs),)
+
+
+def show_user_options(fields: Fields = None) -> tuple:
+    """Loading strategy for a (sparse) schemas.ShowUser: only requested columns."""
+    if fields is None:
+        return SHOW_USER_OPTIONS
+    columns = [
+        getattr(models.User, name) for name in fields if name in ("email", "name")
+    ]
+    return (*SHOW_USER_OPTIONS, load_only(models.User.id, *columns, raiseload=True))
+
+
+def show_user(
+    db: Session, user: models.User, page: PageParams, fields: Fields = None
+) -> dict:
+    """
+    Build a ShowUser response with one page of the user's blogs.
+
+    The blogs relationship is never loaded in full; only the requested
+    page is queried, so large authors stay cheap to display, and a sparse
+    fieldset without "blogs" skips that query. The result is a plain dict
+    shaped like schemas.ShowUser (see fast_json), with the user's
+    schemas.UserStats under "stats" when that field is requested.
+    """
+    blogs, next_cursor, stats = [], None, None
+    if fields is None or "blogs" in fields:
+        query = db.query(models.Blog).filter(models.Blog.user_id == user.id)
+        blogs, next_cursor = paginate(query, models.Blog.id, page)
+    if fields is not None and "stats" in fields:
+        stats = user_stats.get(db, user.id)
+    return fast_json.dump_user(user, blogs, next_cursor, fields, stats)
+
+
+def find_by_email(db: Session, email: str) -> Optional[models.User]:
+    """Return the user with this email, or None."""
+    return db.query(models.User).filter(models.User.email == email).first()
+
+
+def show_by_id(
+    db: Session, user_id: int, page: PageParams, fields: Fields = None
+) -> dict:
+    """
+    Return the ShowUser profile for a user ID.
+
+    Raises:
+        HTTPException: If user not found
+    """
+    user = (
+        db.query(models.User)
+        .options(*show_user_options(fields))
+        .filter(models.User.id == user_id)
+        .first()
+    )
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+    return show_user(db, user, page, fields)
+
+
+def show_by_email(
+    db: Session, email: str, page: PageParams, fields: Fields = None
+) -> dict:
+    """
+    Return the ShowUser profile for an email address.
+
+    Raises:
+        HTTPException: If user not found
+    """
+    user = (
+        db.query(models.User)
+        .options(*show_user_options(fields))
+        .filter(models.User.email == email)
+        .first()
+    )
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+    return show_user(db, user, page, fields)
+
+
+def show_stats(db: Session, user_id: int) -> dict:
+    """
+    Return a user's blog statistics (schemas.UserStats) in one lookup.
+
+    Raises:
+        HTTPException: If user not found
+    """
+    stats = user_stats.get(db, user_id)
+    if stats is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+    return stats
+
+
+def ensure_email_available(db: Session, email: str) -> None:
+    """
+    Check that no account uses this email yet.
+
+    Called before hashing the password so duplicate signups fail cheaply.
+
+    Raises:
+        HTTPException: If email already exists
+    """
+    if find_by_email(db, email):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered"
+        )
+
+
+def create(db: Session, request: schemas.UserCreate, hashed_password: str):
+    """
+    Create a user account from an already hashed password.
+    """
+    new_user = models.User(
+        name=request.name, email=request.email, password=hashed_password
+    )
+    db.add(new_user)
+    db.flush()
+    versions.bump(db, versions.user_key(new_user.id))
+    db.commit()
+    db.refresh(new_user)
+    return new_user
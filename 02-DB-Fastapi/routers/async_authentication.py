@@ -0,0 +1,75 @@
+# Async version of routers/authentication.py, mounted when USE_ASYNC_DB is enabled
+# bcrypt runs on the hashing process pool and is awaited, never blocking the loop
+
+from fastapi import Depends, status, APIRouter
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+import compression
+import database
+import rate_limit
+from hashing import Hash
+import schemas
+from repository import user
+from repository.authentication import invalid_credentials, issue_token
+from instrumentation import TimedRoute
+
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=TimedRoute)
+
+
+# Every endpoint here costs a bcrypt computation: callers over their per-IP
+# rate are turned away before the handler runs (see rate_limit.py).
+# Token responses are never compressed: they carry secrets (BREACH).
+limited = [Depends(rate_limit.limit_client)]
+
+
+@router.post(
+    "/signup",
+    status_code=status.HTTP_201_CREATED,
+    response_model=schemas.UserResponse,
+    dependencies=limited,
+)
+async def create_user(
+    request: schemas.UserCreate, db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    Create a new user account.
+    """
+    rate_limit.admit_email(request.email)
+    await db.run_sync(user.ensure_email_available, request.email)
+    hashed_password = await Hash.bcrypt_async(request.password)
+    return await db.run_sync(user.create, request, hashed_password)
+
+
+async def _authenticate(db: AsyncSession, email: str, password: str):
+    rate_limit.admit_email(email)
+    found = await db.run_sync(user.find_by_email, email)
+    if not found:
+        raise invalid_credentials()
+    if not await Hash.verify_async(password, str(found.password)):
+        raise invalid_credentials()
+    return issue_token(found)
+
+
+@router.post("/login", response_model=schemas.Token, dependencies=limited)
+@compression.exempt
+async def login_for_access_token(
+    request: schemas.Login, db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    Authenticate user and return JWT access token.
+    """
+    return await _authenticate(db, request.email, request.password)
+
+
+# Alternative login endpoint using OAuth2PasswordRequestForm (for OpenAPI docs)
+@router.post("/token", response_model=schemas.Token, dependencies=limited)
+@compression.exempt
+async def login_with_form(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(database.get_async_db),
+):
+    """
+    OAuth2 compatible token login endpoint.
+    Uses username field for email (OAuth2 standard).
+    """
+    return await _authenticate(db, form_data.username, form_data.password)
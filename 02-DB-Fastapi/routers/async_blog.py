@@ -0,0 +1,235 @@
+# Async version of routers/blog.py, mounted when USE_ASYNC_DB is enabled
+# Every handler shares its query logic with the sync router through the
+# repository package and runs it on the event loop via AsyncSession.run_sync
+
+from typing import Any, List, Optional
+from fastapi import APIRouter, status, Depends, Query, Body, Header, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+import schemas
+import changes
+import compression
+import database
+import fast_json
+import fieldsets
+import group_commit
+import oauth2
+import search
+import versions
+from fieldsets import Fields
+from pagination import PageParams, page_params
+from repository import blog
+from instrumentation import TimedRoute
+
+router = APIRouter(prefix="/blog", tags=["Blogs"], route_class=TimedRoute)
+
+
+# Get all blogs (public route)
+@router.get("/", status_code=status.HTTP_200_OK, response_model=fieldsets.BLOG_PAGE)
+async def get_all_blogs(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(page_params),
+    fields: Fields = Depends(fieldsets.blog_list_fields),
+    db: AsyncSession = Depends(database.get_async_read_db),
+):
+    """
+    Get blogs from all users, one page at a time. Public endpoint.
+    """
+    variant = versions.page_variant(page) + fieldsets.variant(fields)
+    not_modified = await db.run_sync(
+        versions.check, request, response, versions.BLOGS, variant
+    )
+    if not_modified is not None:
+        return not_modified
+    blogs = await db.run_sync(blog.get_all, page, fields)
+    return fast_json.respond(fast_json.dump_blog_page(blogs, fields), response)
+
+
+# Get blogs by current user (protected route)
+@router.get(
+    "/my-blogs", status_code=status.HTTP_200_OK, response_model=fieldsets.BLOG_PAGE
+)
+async def get_my_blogs(
+    page: PageParams = Depends(page_params),
+    fields: Fields = Depends(fieldsets.blog_list_fields),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user_async),
+    db: AsyncSession = Depends(database.get_async_read_db),
+):
+    """
+    Get blogs created by the current authenticated user, one page at a time.
+    """
+    blogs = await db.run_sync(blog.get_for_user, current_user.id, page, fields)
+    return fast_json.respond(fast_json.dump_blog_page(blogs, fields))
+
+
+# Full-text search (public route)
+# Declared before "/{id}" so "search" is not parsed as a blog id
+@router.get(
+    "/search", status_code=status.HTTP_200_OK, response_model=schemas.SearchPage
+)
+async def search_blogs(
+    q: str = Query(..., min_length=1, max_length=200),
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(database.get_async_read_db),
+):
+    """
+    Search blog titles and bodies. Public endpoint.
+    """
+    return fast_json.respond(await db.run_sync(search.search, q, page))
+
+
+# Get many blogs by ID (public route)
+# Declared before "/{id}" so "batch" is not parsed as a blog id
+@router.get(
+    "/batch", status_code=status.HTTP_200_OK, response_model=fieldsets.BLOG_BATCH
+)
+async def get_blog_batch(
+    ids: str = Query(
+        ..., description=f"Comma separated blog IDs (at most {blog.MAX_BATCH_IDS})"
+    ),
+    fields: Fields = Depends(fieldsets.blog_fields),
+    db: AsyncSession = Depends(database.get_async_read_db),
+):
+    """
+    Get up to MAX_BATCH_IDS blogs in one request and one query. Public endpoint.
+    """
+    batch = await db.run_sync(blog.get_many, blog.parse_ids(ids), fields)
+    return fast_json.respond(fast_json.dump_blog_batch(batch, fields))
+
+
+# Same as GET /blog/batch for ID lists too long for a URL
+@router.post(
+    "/batch", status_code=status.HTTP_200_OK, response_model=fieldsets.BLOG_BATCH
+)
+async def post_blog_batch(
+    ids: List[blog.BatchId] = Body(..., embed=True, max_length=blog.MAX_BATCH_IDS),
+    fields: Fields = Depends(fieldsets.blog_fields),
+    db: AsyncSession = Depends(database.get_async_read_db),
+):
+    """
+    Get up to MAX_BATCH_IDS blogs listed in the body ({"ids": [...]}).
+    """
+    batch = await db.run_sync(blog.get_many, ids, fields)
+    return fast_json.respond(fast_json.dump_blog_batch(batch, fields))
+
+
+# Change feed (public route, server-sent events)
+# Declared before "/{id}" so "changes" is not parsed as a blog id
+@router.get("/changes", response_class=StreamingResponse)
+@compression.exempt
+async def blog_changes(last_event_id: Optional[str] = Header(None)):
+    """
+    Stream blog creates, updates and deletes as server-sent events.
+    """
+    return StreamingResponse(
+        changes.event_stream(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Get blog by ID (public route)
+@router.get(
+    "/{id}",
+    status_code=status.HTTP_200_OK,
+    response_model=fieldsets.BLOG,
+)
+async def get_blog_by_id(
+    id: int,
+    request: Request,
+    response: Response,
+    fields: Fields = Depends(fieldsets.blog_fields),
+    db: AsyncSession = Depends(database.get_async_read_db),
+):
+    """
+    Get a specific blog by ID. Public endpoint.
+    """
+    not_modified = await db.run_sync(
+        versions.check,
+        request,
+        response,
+        versions.blog_key(id),
+        fieldsets.variant(fields),
+    )
+    if not_modified is not None:
+        return not_modified
+    found = await db.run_sync(blog.show, id, fields)
+    return fast_json.respond(fast_json.dump_blog(found, fields), response)
+
+
+# Create a blog (protected route)
+@router.post(
+    "/",
+    status_code=status.HTTP_201_CREATED,
+    response_model=schemas.ShowBlog,
+)
+async def create_blog(
+    request: schemas.Blog,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user_async),
+):
+    """
+    Create a new blog post. Requires authentication.
+    """
+    if group_commit.GROUP_COMMIT:
+        created = await group_commit.run_async(blog.create, request, current_user)
+    else:
+        created = await db.run_sync(blog.create, request, current_user)
+    changes.publish_blog(changes.CREATED, created.id, current_user.id)
+    return created
+
+
+# Create many blogs at once (protected route)
+@router.post(
+    "/bulk",
+    status_code=status.HTTP_201_CREATED,
+    response_model=schemas.BulkCreateResult,
+)
+async def create_blogs_bulk(
+    items: List[Any] = Body(..., max_length=blog.MAX_BULK_ITEMS),
+    atomic: bool = False,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user_async),
+):
+    """
+    Create up to MAX_BULK_ITEMS blogs in one transaction. Requires authentication.
+    """
+    result = await db.run_sync(blog.create_many, items, current_user, atomic)
+    for id in result.created:
+        changes.publish_blog(changes.CREATED, id, current_user.id)
+    return result
+
+
+# Delete blog (protected route - only owner can delete)
+@router.delete("/{id}", status_code=status.HTTP_200_OK)
+async def delete_blog(
+    id: int,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user_async),
+):
+    """
+    Delete a blog post. Only the blog owner can delete their blog.
+    """
+    deleted = await db.run_sync(blog.destroy, id, current_user)
+    changes.publish_blog(changes.DELETED, id, current_user.id)
+    return deleted
+
+
+# Update blog (protected route - only owner can update)
+@router.put("/{id}", status_code=status.HTTP_202_ACCEPTED)
+async def update_blog(
+    id: int,
+    request: schemas.Blog,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user_async),
+):
+    """
+    Update a blog post. Only the blog owner can update their blog.
+    """
+    if group_commit.GROUP_COMMIT:
+        updated = await group_commit.run_async(blog.update, id, request, current_user)
+    else:
+        updated = await db.run_sync(blog.update, id, request, current_user)
+    changes.publish_blog(changes.UPDATED, id, current_user.id)
+    return updated
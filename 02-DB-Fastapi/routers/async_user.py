@@ -0,0 +1,96 @@
+# Async version of routers/user.py, mounted when USE_ASYNC_DB is enabled
+
+from fastapi import APIRouter, Depends, Path, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+import schemas
+import database
+import fast_json
+import fieldsets
+import oauth2
+import versions
+from fieldsets import Fields
+from pagination import MAX_CURSOR_ID, PageParams, page_params
+from repository import user
+from instrumentation import TimedRoute
+
+router = APIRouter(prefix="/user", tags=["Users"], route_class=TimedRoute)
+
+
+# Get current user profile
+@router.get("/me", response_model=fieldsets.USER)
+async def get_current_user_profile(
+    page: PageParams = Depends(page_params),
+    fields: Fields = Depends(fieldsets.user_fields),
+    db: AsyncSession = Depends(database.get_async_read_db),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user_async),
+):
+    """
+    Get the current authenticated user's profile information.
+    """
+    profile = await db.run_sync(user.show_user, current_user, page, fields)
+    return fast_json.respond(profile)
+
+
+# Get user by ID (protected route)
+@router.get("/{user_id}", response_model=fieldsets.USER)
+async def get_user_by_id(
+    user_id: int,
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(page_params),
+    fields: Fields = Depends(fieldsets.user_fields),
+    db: AsyncSession = Depends(database.get_async_read_db),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user_async),
+):
+    """
+    Get user profile by ID. Requires authentication.
+    """
+    not_modified = await db.run_sync(
+        versions.check,
+        request,
+        response,
+        versions.user_key(user_id),
+        versions.page_variant(page) + fieldsets.variant(fields),
+    )
+    if not_modified is not None:
+        return not_modified
+    profile = await db.run_sync(user.show_by_id, user_id, page, fields)
+    return fast_json.respond(profile, response)
+
+
+# Get user by email (protected route)
+@router.get("/email/{email}", response_model=fieldsets.USER)
+async def get_user_by_email(
+    email: str,
+    page: PageParams = Depends(page_params),
+    fields: Fields = Depends(fieldsets.user_fields),
+    db: AsyncSession = Depends(database.get_async_read_db),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user_async),
+):
+    """
+    Get user profile by email. Requires authentication.
+    """
+    profile = await db.run_sync(user.show_by_email, email, page, fields)
+    return fast_json.respond(profile)
+
+
+# Get a user's blog statistics (protected route)
+# user_id is bounded: larger ids cannot be bound as an SQLite INTEGER
+@router.get("/{user_id}/stats", response_model=schemas.UserStats)
+async def get_user_stats(
+    request: Request,
+    response: Response,
+    user_id: int = Path(..., le=MAX_CURSOR_ID),
+    db: AsyncSession = Depends(database.get_async_read_db),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user_async),
+):
+    """
+    Get how many blogs a user wrote, their total size and the last post time.
+    """
+    not_modified = await db.run_sync(
+        versions.check, request, response, versions.user_key(user_id), "stats"
+    )
+    if not_modified is not None:
+        return not_modified
+    stats = await db.run_sync(user.show_stats, user_id)
+    return fast_json.respond(stats, response)
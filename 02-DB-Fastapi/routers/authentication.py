@@ -1,18 +1,29 @@
-from fastapi import Depends, status, HTTPException, APIRouter
+from fastapi import Depends, status, APIRouter
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from datetime import timedelta
+import compression
 import database
+import rate_limit
 from hashing import Hash
-import models
 import schemas
-import jwt_token
+from repository import user
+from repository.authentication import invalid_credentials, issue_token
+from instrumentation import TimedRoute
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=TimedRoute)
+
+
+# Every endpoint here costs a bcrypt computation: callers over their per-IP
+# rate are turned away before the handler runs (see rate_limit.py).
+# Token responses are never compressed: they carry secrets (BREACH).
+limited = [Depends(rate_limit.limit_client)]
 
 
 @router.post(
-    "/signup", status_code=status.HTTP_201_CREATED, response_model=schemas.UserResponse
+    "/signup",
+    status_code=status.HTTP_201_CREATED,
+    response_model=schemas.UserResponse,
+    dependencies=limited,
 )
 def create_user(request: schemas.UserCreate, db: Session = Depends(database.get_db)):
     """
@@ -26,33 +37,22 @@ def create_user(request: schemas.UserCreate, db: Session = Depends(database.get_
         Created user information (without password)
 
     Raises:
-        HTTPException: If email already exists
+        HTTPException: If email already exists, or 429 when rate limited
     """
+    rate_limit.admit_email(request.email)
+
     # Check if user already exists
-    existing_user = (
-        db.query(models.User).filter(models.User.email == request.email).first()
-    )
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered"
-        )
+    user.ensure_email_available(db, request.email)
 
     # Hash the password
     hashed_password = Hash.bcrypt(request.password)
 
     # Create new user
-    new_user = models.User(
-        name=request.name, email=request.email, password=hashed_password
-    )
-
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-
-    return new_user
+    return user.create(db, request, hashed_password)
 
 
-@router.post("/login", response_model=schemas.Token)
+@router.post("/login", response_model=schemas.Token, dependencies=limited)
+@compression.exempt
 def login_for_access_token(
     request: schemas.Login, db: Session = Depends(database.get_db)
 ):
@@ -67,36 +67,26 @@ def login_for_access_token(
         JWT access token and token type
 
     Raises:
-        HTTPException: If credentials are invalid
+        HTTPException: If credentials are invalid, or 429 when rate limited
     """
+    rate_limit.admit_email(request.email)
+
     # Find user by email
-    user = db.query(models.User).filter(models.User.email == request.email).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    found = user.find_by_email(db, request.email)
+    if not found:
+        raise invalid_credentials()
 
     # Verify password
-    if not Hash.verify(request.password, str(user.password)):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    if not Hash.verify(request.password, str(found.password)):
+        raise invalid_credentials()
 
     # Create access token
-    access_token_expires = timedelta(minutes=jwt_token.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = jwt_token.create_access_token(
-        data={"sub": user.email, "user_id": user.id}, expires_delta=access_token_expires
-    )
-
-    return {"access_token": access_token, "token_type": "bearer"}
+    return issue_token(found)
 
 
 # Alternative login endpoint using OAuth2PasswordRequestForm (for OpenAPI docs)
-@router.post("/token", response_model=schemas.Token)
+@router.post("/token", response_model=schemas.Token, dependencies=limited)
+@compression.exempt
 def login_with_form(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(database.get_db),
@@ -106,27 +96,16 @@ def login_with_form(
     Uses username field for email (OAuth2 standard).
     This endpoint is automatically used by FastAPI's interactive docs.
     """
+    rate_limit.admit_email(form_data.username)
+
     # Find user by email (username field in OAuth2 form)
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    found = user.find_by_email(db, form_data.username)
+    if not found:
+        raise invalid_credentials()
 
     # Verify password
-    if not Hash.verify(form_data.password, str(user.password)):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    if not Hash.verify(form_data.password, str(found.password)):
+        raise invalid_credentials()
 
     # Create access token
-    access_token_expires = timedelta(minutes=jwt_token.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = jwt_token.create_access_token(
-        data={"sub": user.email, "user_id": user.id}, expires_delta=access_token_expires
-    )
-
-    return {"access_token": access_token, "token_type": "bearer"}
+    return issue_token(found)
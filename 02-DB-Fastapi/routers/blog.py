@@ -1,65 +1,213 @@
-from fastapi import APIRouter, status, Depends, HTTPException
-from typing import List
-import models
+from typing import Any, List, Optional
+from fastapi import APIRouter, status, Depends, Query, Body, Header, Request, Response
+from fastapi.responses import StreamingResponse
 import schemas
+import changes
+import compression
 import database
+import fast_json
+import fieldsets
+import group_commit
 import oauth2
+import search
+import versions
+from fieldsets import Fields
+from pagination import PageParams, page_params
+from repository import blog
 from sqlalchemy.orm import Session
+from instrumentation import TimedRoute
 
 
-router = APIRouter(prefix="/blog", tags=["Blogs"])
+router = APIRouter(prefix="/blog", tags=["Blogs"], route_class=TimedRoute)
 
 
 # Get all blogs (public route)
-@router.get("/", status_code=status.HTTP_200_OK, response_model=List[schemas.ShowBlog])
-def get_all_blogs(db: Session = Depends(database.get_db)):
+@router.get("/", status_code=status.HTTP_200_OK, response_model=fieldsets.BLOG_PAGE)
+def get_all_blogs(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(page_params),
+    fields: Fields = Depends(fieldsets.blog_list_fields),
+    db: Session = Depends(database.get_read_db),
+):
     """
-    Get all blogs from all users. Public endpoint.
+    Get blogs from all users, one page at a time. Public endpoint.
+
+    Answers If-None-Match / If-Modified-Since with 304 when no blog changed.
 
     Args:
+        request: Incoming request (conditional headers)
+        response: Response the ETag and Last-Modified headers are set on
+        page: Page size and cursor (?limit=&after=)
+        fields: Sparse fieldset (?fields=id,title or ?view=excerpt)
         db: Database session
 
     Returns:
-        List of all blogs with user information
+        Page of blogs with user information and the cursor of the next page
     """
-    blogs = db.query(models.Blog).all()
-    return blogs
+    variant = versions.page_variant(page) + fieldsets.variant(fields)
+    not_modified = versions.check(db, request, response, versions.BLOGS, variant)
+    if not_modified is not None:
+        return not_modified
+    page_content = fast_json.dump_blog_page(blog.get_all(db, page, fields), fields)
+    return fast_json.respond(page_content, response)
 
 
 # Get blogs by current user (protected route)
 @router.get(
-    "/my-blogs", status_code=status.HTTP_200_OK, response_model=List[schemas.ShowBlog]
+    "/my-blogs", status_code=status.HTTP_200_OK, response_model=fieldsets.BLOG_PAGE
 )
 def get_my_blogs(
-    current_user: models.User = Depends(oauth2.get_current_user),
-    db: Session = Depends(database.get_db),
+    page: PageParams = Depends(page_params),
+    fields: Fields = Depends(fieldsets.blog_list_fields),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user),
+    db: Session = Depends(database.get_read_db),
 ):
     """
-    Get all blogs created by the current authenticated user.
+    Get blogs created by the current authenticated user, one page at a time.
 
     Args:
+        page: Page size and cursor (?limit=&after=)
+        fields: Sparse fieldset (?fields=id,title or ?view=excerpt)
         current_user: Current authenticated user
         db: Database session
 
     Returns:
-        List of blogs created by the current user
+        Page of blogs created by the current user and the next cursor
+    """
+    blogs = blog.get_for_user(db, current_user.id, page, fields)
+    return fast_json.respond(fast_json.dump_blog_page(blogs, fields))
+
+
+# Full-text search (public route)
+# Declared before "/{id}" so "search" is not parsed as a blog id
+@router.get(
+    "/search", status_code=status.HTTP_200_OK, response_model=schemas.SearchPage
+)
+def search_blogs(
+    q: str = Query(..., min_length=1, max_length=200),
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(database.get_read_db),
+):
+    """
+    Search blog titles and bodies. Public endpoint.
+
+    Args:
+        q: Words to search for (all must match)
+        page: Page size and cursor (?limit=&after=)
+        db: Database session
+
+    Returns:
+        Page of hits, best match first, with highlighted snippets
+    """
+    return fast_json.respond(search.search(db, q, page))
+
+
+# Get many blogs by ID (public route)
+# Declared before "/{id}" so "batch" is not parsed as a blog id
+@router.get(
+    "/batch", status_code=status.HTTP_200_OK, response_model=fieldsets.BLOG_BATCH
+)
+def get_blog_batch(
+    ids: str = Query(
+        ..., description=f"Comma separated blog IDs (at most {blog.MAX_BATCH_IDS})"
+    ),
+    fields: Fields = Depends(fieldsets.blog_fields),
+    db: Session = Depends(database.get_read_db),
+):
+    """
+    Get up to MAX_BATCH_IDS blogs in one request and one query. Public endpoint.
+
+    Args:
+        ids: Comma separated blog IDs (?ids=3,1,2)
+        fields: Sparse fieldset (?fields=id,title); None for every field
+        db: Database session
+
+    Returns:
+        The blogs in request order and the IDs that were not found
+
+    Raises:
+        HTTPException: If ids is malformed, empty or too long
+    """
+    batch = blog.get_many(db, blog.parse_ids(ids), fields)
+    return fast_json.respond(fast_json.dump_blog_batch(batch, fields))
+
+
+# Same as GET /blog/batch for ID lists too long for a URL
+@router.post(
+    "/batch", status_code=status.HTTP_200_OK, response_model=fieldsets.BLOG_BATCH
+)
+def post_blog_batch(
+    ids: List[blog.BatchId] = Body(..., embed=True, max_length=blog.MAX_BATCH_IDS),
+    fields: Fields = Depends(fieldsets.blog_fields),
+    db: Session = Depends(database.get_read_db),
+):
+    """
+    Get up to MAX_BATCH_IDS blogs listed in the body ({"ids": [...]}).
+
+    Args:
+        ids: Blog IDs
+        fields: Sparse fieldset (?fields=id,title); None for every field
+        db: Database session
+
+    Returns:
+        The blogs in request order and the IDs that were not found
+
+    Raises:
+        HTTPException: If ids is empty
+    """
+    batch = blog.get_many(db, ids, fields)
+    return fast_json.respond(fast_json.dump_blog_batch(batch, fields))
+
+
+# Change feed (public route, server-sent events)
+# Declared before "/{id}" so "changes" is not parsed as a blog id.
+# Not compressed: every event is flushed on its own and is a few dozen bytes
+@router.get("/changes", response_class=StreamingResponse)
+@compression.exempt
+async def blog_changes(last_event_id: Optional[str] = Header(None)):
+    """
+    Stream blog creates, updates and deletes as server-sent events.
+
+    Reconnecting clients send Last-Event-ID (EventSource does) and get the
+    events they missed, or a "reset" event when those are gone.
+
+    Args:
+        last_event_id: Id of the last event the client received
+
+    Returns:
+        Endless text/event-stream response
     """
-    blogs = db.query(models.Blog).filter(models.Blog.user_id == current_user.id).all()
-    return blogs
+    return StreamingResponse(
+        changes.event_stream(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # Get blog by ID (public route)
 @router.get(
     "/{id}",
     status_code=status.HTTP_200_OK,
-    response_model=schemas.ShowBlog,
+    response_model=fieldsets.BLOG,
 )
-def get_blog_by_id(id: int, db: Session = Depends(database.get_db)):
+def get_blog_by_id(
+    id: int,
+    request: Request,
+    response: Response,
+    fields: Fields = Depends(fieldsets.blog_fields),
+    db: Session = Depends(database.get_read_db),
+):
     """
     Get a specific blog by ID. Public endpoint.
 
+    Answers If-None-Match / If-Modified-Since with 304 without loading the blog.
+
     Args:
         id: Blog ID
+        request: Incoming request (conditional headers)
+        response: Response the ETag and Last-Modified headers are set on
+        fields: Sparse fieldset (?fields=id,title); None for every field
         db: Database session
 
     Returns:
@@ -68,13 +216,13 @@ def get_blog_by_id(id: int, db: Session = Depends(database.get_db)):
     Raises:
         HTTPException: If blog not found
     """
-    blog = db.query(models.Blog).filter(models.Blog.id == id).first()
-    if not blog:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Blog with id {id} not found",
-        )
-    return blog
+    not_modified = versions.check(
+        db, request, response, versions.blog_key(id), fieldsets.variant(fields)
+    )
+    if not_modified is not None:
+        return not_modified
+    found = blog.show(db, id, fields)
+    return fast_json.respond(fast_json.dump_blog(found, fields), response)
 
 
 # Create a blog (protected route)
@@ -86,7 +234,7 @@ def get_blog_by_id(id: int, db: Session = Depends(database.get_db)):
 def create_blog(
     request: schemas.Blog,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user),
 ):
     """
     Create a new blog post. Requires authentication.
@@ -99,13 +247,45 @@ def create_blog(
     Returns:
         Created blog with user information
     """
-    new_blog = models.Blog(
-        title=request.title, body=request.body, user_id=current_user.id
-    )
-    db.add(new_blog)
-    db.commit()
-    db.refresh(new_blog)
-    return new_blog
+    if group_commit.GROUP_COMMIT:
+        created = group_commit.run(blog.create, request, current_user)
+    else:
+        created = blog.create(db, request, current_user)
+    changes.publish_blog(changes.CREATED, created.id, current_user.id)
+    return created
+
+
+# Create many blogs at once (protected route)
+@router.post(
+    "/bulk",
+    status_code=status.HTTP_201_CREATED,
+    response_model=schemas.BulkCreateResult,
+)
+def create_blogs_bulk(
+    items: List[Any] = Body(..., max_length=blog.MAX_BULK_ITEMS),
+    atomic: bool = False,
+    db: Session = Depends(database.get_db),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user),
+):
+    """
+    Create up to MAX_BULK_ITEMS blogs in one transaction. Requires authentication.
+
+    Args:
+        items: List of blog objects (title, body)
+        atomic: Reject the whole batch if any item is invalid
+        db: Database session
+        current_user: Current authenticated user
+
+    Returns:
+        IDs of the created blogs, in request order, and per-item errors
+
+    Raises:
+        HTTPException: If atomic and any item is invalid
+    """
+    result = blog.create_many(db, items, current_user, atomic)
+    for id in result.created:
+        changes.publish_blog(changes.CREATED, id, current_user.id)
+    return result
 
 
 # Delete blog (protected route - only owner can delete)
@@ -113,7 +293,7 @@ def create_blog(
 def delete_blog(
     id: int,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user),
 ):
     """
     Delete a blog post. Only the blog owner can delete their blog.
@@ -129,22 +309,9 @@ def delete_blog(
     Raises:
         HTTPException: If blog not found or user not authorized
     """
-    blog = db.query(models.Blog).filter(models.Blog.id == id).first()
-    if not blog:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Blog not found"
-        )
-
-    # Check if current user is the owner of the blog
-    if getattr(blog, "user_id") != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to delete this blog",
-        )
-
-    db.delete(blog)
-    db.commit()
-    return {"detail": "Blog deleted successfully"}
+    deleted = blog.destroy(db, id, current_user)
+    changes.publish_blog(changes.DELETED, id, current_user.id)
+    return deleted
 
 
 # Update blog (protected route - only owner can update)
@@ -153,7 +320,7 @@ def update_blog(
     id: int,
     request: schemas.Blog,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user),
 ):
     """
     Update a blog post. Only the blog owner can update their blog.
@@ -170,24 +337,9 @@ def update_blog(
     Raises:
         HTTPException: If blog not found or user not authorized
     """
-    blog = db.query(models.Blog).filter(models.Blog.id == id).first()
-    if not blog:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Blog not found",
-        )
-
-    # Check if current user is the owner of the blog
-    if getattr(blog, "user_id") != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this blog",
-        )
-
-    # Update blog fields using SQLAlchemy update method
-    db.query(models.Blog).filter(models.Blog.id == id).update(
-        {models.Blog.title: request.title, models.Blog.body: request.body}
-    )
-    db.commit()
-
-    return {"detail": "Blog updated successfully"}
+    if group_commit.GROUP_COMMIT:
+        updated = group_commit.run(blog.update, id, request, current_user)
+    else:
+        updated = blog.update(db, id, request, current_user)
+    changes.publish_blog(changes.UPDATED, id, current_user.id)
+    return updated
@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+import instrumentation
+
+router = APIRouter(tags=["Monitoring"])
+
+
+# Prometheus scrape endpoint (public route, hidden from the API docs)
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """
+    Export request latency, SQL and component counters in Prometheus format.
+
+    Returns:
+        Metrics in the Prometheus text exposition format
+    """
+    return PlainTextResponse(
+        instrumentation.registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
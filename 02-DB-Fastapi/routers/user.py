@@ -1,83 +1,145 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Path, Request, Response
 from sqlalchemy.orm import Session
-import models
 import schemas
 import database
+import fast_json
+import fieldsets
 import oauth2
+import versions
+from fieldsets import Fields
+from pagination import MAX_CURSOR_ID, PageParams, page_params
+from repository import user
+from instrumentation import TimedRoute
 
-router = APIRouter(prefix="/user", tags=["Users"])
+router = APIRouter(prefix="/user", tags=["Users"], route_class=TimedRoute)
 
 
 # Get current user profile
-@router.get("/me", response_model=schemas.ShowUser)
+@router.get("/me", response_model=fieldsets.USER)
 def get_current_user_profile(
-    current_user: models.User = Depends(oauth2.get_current_user),
+    page: PageParams = Depends(page_params),
+    fields: Fields = Depends(fieldsets.user_fields),
+    db: Session = Depends(database.get_read_db),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user),
 ):
     """
     Get the current authenticated user's profile information.
 
     Args:
+        page: Page size and cursor for the embedded blogs (?limit=&after=)
+        fields: Sparse fieldset (?fields=id,name); None for every field
+        db: Database session
         current_user: Current authenticated user from JWT token
 
     Returns:
-        User profile with blogs
+        User profile with one page of blogs
     """
-    return current_user
+    return fast_json.respond(user.show_user(db, current_user, page, fields))
 
 
 # Get user by ID (protected route)
-@router.get("/{user_id}", response_model=schemas.ShowUser)
+@router.get("/{user_id}", response_model=fieldsets.USER)
 def get_user_by_id(
     user_id: int,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(page_params),
+    fields: Fields = Depends(fieldsets.user_fields),
+    db: Session = Depends(database.get_read_db),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user),
 ):
     """
     Get user profile by ID. Requires authentication.
 
+    Answers If-None-Match / If-Modified-Since with 304 when neither the user
+    nor their blogs changed.
+
     Args:
         user_id: ID of the user to retrieve
+        request: Incoming request (conditional headers)
+        response: Response the ETag and Last-Modified headers are set on
+        page: Page size and cursor for the embedded blogs (?limit=&after=)
+        fields: Sparse fieldset (?fields=id,name); None for every field
         db: Database session
         current_user: Current authenticated user
 
     Returns:
-        User profile with blogs
+        User profile with one page of blogs
 
     Raises:
         HTTPException: If user not found
     """
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
-        )
-    return user
+    variant = versions.page_variant(page) + fieldsets.variant(fields)
+    not_modified = versions.check(
+        db, request, response, versions.user_key(user_id), variant
+    )
+    if not_modified is not None:
+        return not_modified
+    return fast_json.respond(user.show_by_id(db, user_id, page, fields), response)
 
 
 # Get user by email (protected route)
-@router.get("/email/{email}", response_model=schemas.ShowUser)
+@router.get("/email/{email}", response_model=fieldsets.USER)
 def get_user_by_email(
     email: str,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    page: PageParams = Depends(page_params),
+    fields: Fields = Depends(fieldsets.user_fields),
+    db: Session = Depends(database.get_read_db),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user),
 ):
     """
     Get user profile by email. Requires authentication.
 
     Args:
         email: Email of the user to retrieve
+        page: Page size and cursor for the embedded blogs (?limit=&after=)
+        fields: Sparse fieldset (?fields=id,name); None for every field
+        db: Database session
+        current_user: Current authenticated user
+
+    Returns:
+        User profile with one page of blogs
+
+    Raises:
+        HTTPException: If user not found
+    """
+    return fast_json.respond(user.show_by_email(db, email, page, fields))
+
+
+# Get a user's blog statistics (protected route)
+# Declared after /email/{email} so "/user/email/stats" stays an email lookup
+# user_id is bounded: larger ids cannot be bound as an SQLite INTEGER
+@router.get("/{user_id}/stats", response_model=schemas.UserStats)
+def get_user_stats(
+    request: Request,
+    response: Response,
+    user_id: int = Path(..., le=MAX_CURSOR_ID),
+    db: Session = Depends(database.get_read_db),
+    current_user: schemas.UserResponse = Depends(oauth2.get_current_user),
+):
+    """
+    Get how many blogs a user wrote, their total size and the last post time.
+
+    The counters are maintained on every blog write, so this is a single
+    primary-key lookup however many blogs the user has. Answers conditional
+    requests with 304 like GET /user/{user_id}.
+
+    Args:
+        user_id: ID of the user
+        request: Incoming request (conditional headers)
+        response: Response the ETag and Last-Modified headers are set on
         db: Database session
         current_user: Current authenticated user
 
     Returns:
-        User profile with blogs
+        The user's blog statistics
 
     Raises:
         HTTPException: If user not found
     """
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
-        )
-    return user
+    not_modified = versions.check(
+        db, request, response, versions.user_key(user_id), "stats"
+    )
+    if not_modified is not None:
+        return not_modified
+    return fast_json.respond(user.show_stats(db, user_id), response)
@@ -2,8 +2,9 @@
 # This file defines the data models used for API request/response validation and serialization
 
 # Import Pydantic BaseModel for creating data validation schemas
+from datetime import datetime
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 
 class Blog(BaseModel):
@@ -73,11 +74,61 @@ class ShowUser(BaseModel):
     email: str
     name: str
     blogs: List[BlogInUser] = []
+    # Cursor for the next page of this user's blogs (None when all are shown)
+    blogs_next_cursor: Optional[str] = None
 
     class Config:
         from_attributes = True
 
 
+# Per-author counters (user_stats.py), GET /user/{user_id}/stats and
+# ?fields=stats on the user endpoints; last_post_at is None until the
+# author's first blog created after the counters were introduced
+class UserStats(BaseModel):
+    blog_count: int
+    body_bytes: int
+    last_post_at: Optional[datetime] = None
+
+
+# Paginated list of blogs returned by the list endpoints
+class BlogPage(BaseModel):
+    items: List[ShowBlog]
+    next_cursor: Optional[str] = None
+
+
+# Result of GET/POST /blog/batch: found blogs and unknown IDs, both in
+# request order
+class BlogBatch(BaseModel):
+    items: List[ShowBlog]
+    missing: List[int] = []
+
+
+# Result of POST /blog/bulk: IDs are in the order of the accepted items,
+# errors point at rejected items by their position in the request
+class BulkItemError(BaseModel):
+    index: int
+    errors: List[Dict[str, Any]]
+
+
+class BulkCreateResult(BaseModel):
+    created: List[int]
+    errors: List[BulkItemError] = []
+
+
+# Full-text search hit; snippet is HTML: escaped blog text with the matched
+# words in <b></b>
+class SearchHit(BaseModel):
+    id: int
+    title: str
+    snippet: str
+    rank: float
+
+
+class SearchPage(BaseModel):
+    items: List[SearchHit]
+    next_cursor: Optional[str] = None
+
+
 class Login(BaseModel):
     email: str
     password: str
@@ -0,0 +1,191 @@
+# Full-text search over blogs using an SQLite FTS5 index
+#
+# blogs_fts is a standalone FTS5 table whose rowid is the blog id, created by
+# migrations.py. The blog repository enqueues a REINDEX job (jobs.py) in the
+# same transaction as every blog write (create/update/delete); the job
+# brings the entries of those blogs in line with the blogs table shortly
+# after the commit. The index can be rebuilt from scratch with:
+#
+#     python search.py rebuild
+
+import argparse
+import html
+from fastapi import HTTPException, status
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+import jobs
+from pagination import PageParams, encode_cursor
+
+FTS_TABLE = "blogs_fts"
+
+# Job kind re-indexing blogs by id (payload: ids)
+REINDEX = "reindex_blogs"
+
+# Number of tokens shown around a match in the returned snippet
+SNIPPET_TOKENS = 12
+
+# Match markers for snippet() (private-use characters): the snippet is
+# HTML-escaped first, then they become <b></b>, so blog text can never
+# inject markup into it
+_MATCH_START = "\ue000"
+_MATCH_END = "\ue001"
+
+
+def index_blog(db: Session, blog_id: int, title: str, body: str) -> None:
+    """Add or replace the index entry for a blog (no commit)."""
+    index_blogs(db, [{"id": blog_id, "title": title, "body": body}])
+
+
+def index_blogs(db: Session, rows) -> None:
+    """
+    Add or replace index entries for many blogs in one executemany call.
+
+    Args:
+        db: Database session
+        rows: Iterable of dicts with "id", "title" and "body"
+    """
+    rows = list(rows)
+    if rows:
+        db.execute(
+            text(
+                f"INSERT OR REPLACE INTO {FTS_TABLE}(rowid, title, body) "
+                "VALUES (:id, :title, :body)"
+            ),
+            rows,
+        )
+
+
+def remove_blog(db: Session, blog_id: int) -> None:
+    """Remove a blog from the index (no commit)."""
+    db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": blog_id})
+
+
+@jobs.handler(REINDEX)
+def reindex_blogs(db: Session, ids) -> None:
+    """
+    Make the index entries of some blogs match the blogs table (no commit).
+
+    Idempotent, and safe in any order: every run copies the blogs as they
+    are now and removes the entries of blogs that no longer exist.
+    """
+    rows = db.execute(
+        text(
+            "SELECT id, coalesce(title, '') AS title, coalesce(body, '') AS body "
+            "FROM blogs WHERE id IN :ids"
+        ).bindparams(bindparam("ids", expanding=True)),
+        {"ids": list(ids)},
+    ).mappings()
+    rows = [dict(row) for row in rows]
+    index_blogs(db, rows)
+    found = {row["id"] for row in rows}
+    for blog_id in set(ids) - found:
+        remove_blog(db, blog_id)
+
+
+def rebuild(db: Session) -> int:
+    """
+    Re-create every index entry from the blogs table.
+
+    Returns:
+        Number of blogs indexed
+    """
+    db.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    db.execute(
+        text(
+            f"INSERT INTO {FTS_TABLE}(rowid, title, body) "
+            "SELECT id, coalesce(title, ''), coalesce(body, '') FROM blogs"
+        )
+    )
+    db.commit()
+    return db.execute(text(f"SELECT count(*) FROM {FTS_TABLE}")).scalar_one()
+
+
+def to_match_query(q: str) -> str:
+    """
+    Turn free text into an FTS5 query that matches every word.
+
+    Each word is quoted so user input can never be parsed as FTS5 syntax
+    (operators, column filters, unbalanced quotes).
+    """
+    terms = ['"' + term.replace('"', '""') + '"' for term in q.split()]
+    return " ".join(terms)
+
+
+def highlight(snippet: str) -> str:
+    """HTML-escape a snippet() result and mark its matches with <b></b>."""
+    escaped = html.escape(snippet, quote=False)
+    return escaped.replace(_MATCH_START, "<b>").replace(_MATCH_END, "</b>")
+
+
+def search(db: Session, q: str, page: PageParams):
+    """
+    Return one page of blogs matching q, best match first.
+
+    Ranked results cannot be keyset-paginated on id, so the cursor encodes
+    the offset of the next page instead.
+
+    Args:
+        db: Database session
+        q: Free-text query
+        page: Page size and cursor (page.after_id is the offset)
+
+    Returns:
+        Dict with the page items and the next cursor
+
+    Raises:
+        HTTPException: If the query cannot be searched
+    """
+    match = to_match_query(q)
+    if not match:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Empty search query"
+        )
+    try:
+        rows = db.execute(
+            text(
+                f"SELECT rowid AS id, title, "
+                f"snippet({FTS_TABLE}, 1, :start, :end, '…', {SNIPPET_TOKENS}) "
+                f"AS snippet, bm25({FTS_TABLE}) AS rank "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match "
+                "ORDER BY rank LIMIT :limit OFFSET :offset"
+            ),
+            {
+                "match": match,
+                "start": _MATCH_START,
+                "end": _MATCH_END,
+                "limit": page.limit + 1,
+                "offset": page.after_id,
+            },
+        ).all()
+    except OperationalError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid search query"
+        )
+
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        next_cursor = encode_cursor(page.after_id + page.limit)
+    items = [{**row._asdict(), "snippet": highlight(row.snippet)} for row in rows]
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the blog search index")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    import database
+    import migrations
+
+    migrations.upgrade()
+    db = database.SessionLocal()
+    try:
+        print(f"Indexed {rebuild(db)} blogs")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Application settings
+#
+# create_app(settings) builds an app from an explicit Settings instance;
+# Settings.from_env() reads the environment variables the app has always
+# used, so deployments configure it exactly as before.
+
+import os
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def env_choice(name: str, default: str, allowed: Iterable[str]) -> str:
+    """
+    Read environment variable name, which must be one of allowed.
+
+    Raises:
+        ValueError: If it is set to anything else (the message lists allowed)
+    """
+    value = os.getenv(name, default)
+    allowed = tuple(allowed)
+    if value not in allowed:
+        raise ValueError(f"{name}={value!r}: expected one of {', '.join(allowed)}")
+    return value
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Configuration consumed by main.create_app and database.configure.
+
+    Attributes:
+        database_url: SQLAlchemy URL of the database (DATABASE_URL)
+        use_async_db: Mount the async routers on aiosqlite (USE_ASYNC_DB)
+        async_database_url: URL for the async engines (ASYNC_DATABASE_URL);
+            defaults to database_url with the aiosqlite driver
+        db_read_pool: Separate query_only pool for reads (DB_READ_POOL)
+        auto_migrate: Apply pending migrations on startup (AUTO_MIGRATE)
+    """
+
+    database_url: str = "sqlite:///./blog.db"
+    use_async_db: bool = False
+    async_database_url: Optional[str] = None
+    db_read_pool: bool = True
+    auto_migrate: bool = True
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            database_url=os.getenv("DATABASE_URL", cls.database_url),
+            use_async_db=_flag("USE_ASYNC_DB", "0"),
+            async_database_url=os.getenv("ASYNC_DATABASE_URL"),
+            db_read_pool=_flag("DB_READ_POOL", "1"),
+            auto_migrate=_flag("AUTO_MIGRATE", "1"),
+        )
+
+    @property
+    def resolved_async_database_url(self) -> str:
+        if self.async_database_url:
+            return self.async_database_url
+        return self.database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
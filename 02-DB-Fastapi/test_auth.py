@@ -0,0 +1,77 @@
+# Tests for token verification and the verified-token cache in oauth2.py
+
+import database
+import models
+import oauth2
+from conftest import count_queries
+from token_cache import TokenCache
+
+
+def test_cached_token_skips_user_lookup(client, auth_headers):
+    oauth2.token_cache.clear()
+    assert client.get("/blog/my-blogs", headers=auth_headers).status_code == 200
+    before = oauth2.token_cache.stats()
+
+    with count_queries() as counter:
+        response = client.get("/blog/my-blogs", headers=auth_headers)
+    assert response.status_code == 200
+    # Only the blog page query runs; the user lookup comes from the cache
+    assert counter.count == 1
+    assert oauth2.token_cache.stats()["hits"] == before["hits"] + 1
+
+
+def test_invalid_token_is_rejected(client):
+    response = client.get("/blog/my-blogs", headers={"Authorization": "Bearer nope"})
+    assert response.status_code == 401
+
+
+def test_user_update_invalidates_cached_tokens(client, auth_headers):
+    me = client.get("/user/me", headers=auth_headers).json()
+    assert oauth2.token_cache.get(auth_headers["Authorization"][7:]) is not None
+
+    db = database.SessionLocal()
+    try:
+        user = db.get(models.User, me["id"])
+        user.name = "Renamed"
+        db.commit()
+    finally:
+        db.close()
+
+    assert oauth2.token_cache.get(auth_headers["Authorization"][7:]) is None
+    assert client.get("/user/me", headers=auth_headers).json()["name"] == "Renamed"
+
+
+def test_cache_expiry_and_lru_bound():
+    cache = TokenCache(maxsize=2, max_ttl=60)
+    cache.put("expired", "a", 1, exp=0)
+    assert cache.get("expired") is None
+
+    cache.put("t1", "a", 1, exp=None)
+    cache.put("t2", "b", 2, exp=None)
+    cache.get("t1")
+    cache.put("t3", "c", 3, exp=None)
+    assert cache.get("t2") is None
+    assert cache.get("t1") == "a"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_hash_pool_rejects_when_saturated(client, monkeypatch):
+    import hashing
+
+    monkeypatch.setattr(hashing, "HASH_MAX_PENDING", 0)
+    response = client.post(
+        "/auth/signup",
+        json={"name": "Busy", "email": "busy@example.com", "password": "secret"},
+    )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert hashing.Hash.stats()["rejected"] >= 1
+
+
+def test_hash_pool_records_timings(auth_headers):
+    import hashing
+
+    stats = hashing.Hash.stats()
+    assert stats["completed"] >= 2
+    assert stats["pending"] == 0
+    assert stats["hash_seconds_total"] > 0
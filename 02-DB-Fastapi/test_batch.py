@@ -0,0 +1,68 @@
+# GET/POST /blog/batch: many blogs by ID in one request and one query
+
+from conftest import count_queries
+from pagination import MAX_CURSOR_ID
+from repository.blog import MAX_BATCH_IDS
+
+
+def _create(client, headers, count):
+    return [
+        client.post(
+            "/blog/", json={"title": f"batch {i}", "body": "b"}, headers=headers
+        ).json()["id"]
+        for i in range(count)
+    ]
+
+
+def test_batch_keeps_request_order_and_reports_missing(client, auth_headers):
+    first, second, third = _create(client, auth_headers, 3)
+    ids = [third, 999999, first, third, second]
+    with count_queries() as counter:
+        response = client.get("/blog/batch", params={"ids": ",".join(map(str, ids))})
+    assert response.status_code == 200
+    # Blogs and authors in a single SELECT ... IN with the author joined
+    assert counter.count == 1
+    assert " IN (" in counter.statements[0] and "JOIN users" in counter.statements[0]
+
+    body = response.json()
+    assert [item["id"] for item in body["items"]] == [third, first, second]
+    assert body["missing"] == [999999]
+    assert all(item["user"]["id"] for item in body["items"])
+    assert body["items"][1] == client.get(f"/blog/{first}").json()
+
+
+def test_post_variant_and_sparse_fields(client, auth_headers):
+    ids = _create(client, auth_headers, 2)
+    response = client.post(
+        "/blog/batch", params={"fields": "id,title"}, json={"ids": ids[::-1]}
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "items": [
+            {"id": ids[1], "title": "batch 1"},
+            {"id": ids[0], "title": "batch 0"},
+        ],
+        "missing": [],
+    }
+
+
+def test_batch_size_is_capped(client):
+    too_many = list(range(1, MAX_BATCH_IDS + 2))
+    assert client.post("/blog/batch", json={"ids": too_many}).status_code == 422
+    response = client.get("/blog/batch", params={"ids": ",".join(map(str, too_many))})
+    assert response.status_code == 400
+    assert client.get("/blog/batch", params={"ids": ","}).status_code == 400
+    assert client.get("/blog/batch", params={"ids": "1,x"}).status_code == 400
+    assert client.post("/blog/batch", json={"ids": []}).status_code == 400
+
+
+def test_ids_outside_sqlite_integers_are_rejected(client):
+    too_big = 2**70
+    response = client.get("/blog/batch", params={"ids": f"1,{too_big}"})
+    assert response.status_code == 422
+    assert client.get("/blog/batch", params={"ids": "0"}).status_code == 422
+    assert client.post("/blog/batch", json={"ids": [1, too_big]}).status_code == 422
+    assert client.post("/blog/batch", json={"ids": [MAX_CURSOR_ID]}).json() == {
+        "items": [],
+        "missing": [MAX_CURSOR_ID],
+    }
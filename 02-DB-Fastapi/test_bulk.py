@@ -0,0 +1,45 @@
+# Tests for POST /blog/bulk
+
+from conftest import count_queries
+
+
+def test_bulk_insert_is_batched(client, auth_headers):
+    items = [{"title": f"bulk {i}", "body": "b"} for i in range(200)]
+    client.get("/user/me", headers=auth_headers)  # warm the token cache
+    with count_queries() as counter:
+        response = client.post("/blog/bulk", json=items, headers=auth_headers)
+    assert response.status_code == 201, response.text
+    ids = response.json()["created"]
+    assert len(ids) == 200 and ids == sorted(ids)
+    # One multi-row INSERT ... RETURNING, one outbox row for the search job, one
+    # upsert of the author's stats and one for the resource versions
+    assert counter.count == 4, counter.statements
+
+    blog = client.get(f"/blog/{ids[-1]}").json()
+    assert blog["title"] == "bulk 199"
+
+
+def test_bulk_reports_item_errors(client, auth_headers):
+    items = [{"title": "ok", "body": "b"}, {"title": "missing body"}, "nope"]
+    response = client.post("/blog/bulk", json=items, headers=auth_headers)
+    assert response.status_code == 201
+    body = response.json()
+    assert len(body["created"]) == 1
+    assert [error["index"] for error in body["errors"]] == [1, 2]
+
+
+def test_bulk_atomic_rejects_whole_batch(client, auth_headers):
+    before = client.get("/blog/my-blogs", headers=auth_headers).json()["items"]
+    items = [{"title": "ok", "body": "b"}, {"title": "missing body"}]
+    response = client.post(
+        "/blog/bulk", params={"atomic": True}, json=items, headers=auth_headers
+    )
+    assert response.status_code == 422
+    after = client.get("/blog/my-blogs", headers=auth_headers).json()["items"]
+    assert after == before
+
+
+def test_bulk_size_cap(client, auth_headers):
+    items = [{"title": "t", "body": "b"}] * 501
+    response = client.post("/blog/bulk", json=items, headers=auth_headers)
+    assert response.status_code == 422
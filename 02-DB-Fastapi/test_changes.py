@@ -0,0 +1,153 @@
+# Blog change feed: the in-process broker and GET /blog/changes (SSE)
+
+import asyncio
+import json
+import threading
+
+from fastapi import FastAPI
+
+import changes
+from changes import ChangeBroker
+from compression import CompressionMiddleware
+from routers import blog as blog_router
+
+
+def _events(chunks):
+    """Parse SSE frames into (id, event, data) tuples, skipping comments."""
+    events = []
+    for frame in b"".join(chunks).decode().split("\n\n"):
+        fields = dict(
+            line.split(": ", 1) for line in frame.splitlines() if ": " in line
+        )
+        if "event" in fields:
+            events.append((fields["id"], fields["event"], json.loads(fields["data"])))
+    return events
+
+
+async def _read_stream(stream, count):
+    chunks = []
+    async for chunk in stream:
+        chunks.append(chunk)
+        if len(_events(chunks)) >= count:
+            break
+    await stream.aclose()
+    return _events(chunks)
+
+
+def test_live_events_reach_every_subscriber():
+    broker = ChangeBroker(buffer_size=8, log_size=8)
+
+    async def scenario():
+        streams = [changes.event_stream(source=broker) for _ in range(2)]
+        for stream in streams:
+            await anext(stream)  # subscribed
+        # Handlers publish from threadpool threads
+        worker = threading.Thread(
+            target=broker.publish, args=("created",), kwargs={"id": 1}
+        )
+        worker.start()
+        worker.join()
+        return await asyncio.gather(*(_read_stream(s, 1) for s in streams))
+
+    first, second = asyncio.run(scenario())
+    assert first == second == [(f"{broker.epoch}-1", "created", {"id": 1})]
+    assert broker.stats() == {"subscribers": 0, "published": 1, "dropped": 0}
+
+
+def test_resume_from_last_event_id_or_reset():
+    broker = ChangeBroker(buffer_size=8, log_size=3)
+    for id in range(1, 6):
+        broker.publish("updated", id=id)
+
+    async def replay(last_event_id):
+        return await _read_stream(
+            changes.event_stream(last_event_id, source=broker),
+            1 if last_event_id else 0,
+        )
+
+    async def scenario():
+        resumed = changes.event_stream(f"{broker.epoch}-3", source=broker)
+        return [
+            await _read_stream(resumed, 2),
+            # Event 1 has left the three-event log
+            await replay(f"{broker.epoch}-1"),
+            # An id from another process (restart)
+            await replay("0badcafe-4"),
+        ]
+
+    resumed, gap, restarted = asyncio.run(scenario())
+    assert [data["id"] for _, _, data in resumed] == [4, 5]
+    assert gap == restarted == [(f"{broker.epoch}-5", "reset", {})]
+
+
+def test_slow_subscriber_is_dropped():
+    broker = ChangeBroker(buffer_size=2, log_size=10)
+
+    async def scenario():
+        stream = changes.event_stream(source=broker)
+        await anext(stream)  # subscribed, never reads while events arrive
+        for id in range(1, 6):
+            broker.publish("created", id=id)
+        await asyncio.sleep(0)  # let the deliveries run
+        # The buffered events come out, then the stream ends
+        return [chunk async for chunk in stream]
+
+    chunks = asyncio.run(scenario())
+    assert [data["id"] for _, _, data in _events(chunks)] == [1, 2]
+    assert broker.stats() == {"subscribers": 0, "published": 5, "dropped": 1}
+
+
+def test_endpoint_streams_api_writes(client, auth_headers):
+    start = changes.broker.stats()["published"]
+    blog_id = client.post(
+        "/blog/", json={"title": "t", "body": "b"}, headers=auth_headers
+    ).json()["id"]
+    client.put(
+        f"/blog/{blog_id}", json={"title": "t2", "body": "b"}, headers=auth_headers
+    )
+    client.delete(f"/blog/{blog_id}", headers=auth_headers)
+
+    # TestClient cannot read an endless response; drive the route over ASGI
+    app = FastAPI()
+    app.include_router(blog_router.router)
+    app = CompressionMiddleware(app, minimum_size=1)
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/blog/changes",
+        "headers": [
+            (b"last-event-id", f"{changes.broker.epoch}-{start}".encode()),
+            (b"accept-encoding", b"gzip"),
+        ],
+        "query_string": b"",
+    }
+    sent = []
+
+    async def scenario():
+        disconnected = asyncio.Event()
+        requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            bodies = [m.get("body", b"") for m in sent[1:]]
+            if len(_events(bodies)) >= 3:
+                disconnected.set()
+
+        await asyncio.wait_for(app(scope, receive, send), 5)
+
+    asyncio.run(scenario())
+    headers = dict(sent[0]["headers"])
+    assert headers[b"content-type"].startswith(b"text/event-stream")
+    assert b"content-encoding" not in headers
+    events = _events([m.get("body", b"") for m in sent[1:]])
+    assert [(kind, data) for _, kind, data in events] == [
+        (kind, {"id": blog_id, "user_id": events[0][2]["user_id"]})
+        for kind in ("created", "updated", "deleted")
+    ]
+    assert changes.broker.stats()["subscribers"] == 0
@@ -0,0 +1,137 @@
+# Tests for the gzip/brotli response compression in compression.py
+
+import asyncio
+import zlib
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+import compression
+from compression import CompressionMiddleware, negotiate
+
+BIG = {
+    "items": [{"title": f"title {i}", "body": "lorem ipsum " * 20} for i in range(50)]
+}
+
+
+def test_negotiate(monkeypatch):
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("gzip;q=1.0, br;q=0.5") == "gzip"
+    assert negotiate("br;q=0, *") == "gzip"
+    assert negotiate("identity") is None
+    assert negotiate("") is None
+    monkeypatch.setattr(compression, "brotli", None)
+    assert negotiate("br") is None
+
+
+def test_large_list_is_compressed_with_weak_etag(client, auth_headers):
+    for i in range(10):
+        client.post(
+            "/blog/", json={"title": f"t{i}", "body": "x" * 200}, headers=auth_headers
+        )
+    response = client.get(
+        "/blog/", params={"limit": 50}, headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert "compress;dur=" in response.headers["server-timing"]
+    assert len(response.json()["items"]) >= 10
+
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+    revalidated = client.get(
+        "/blog/",
+        params={"limit": 50},
+        headers={"Accept-Encoding": "gzip", "If-None-Match": etag},
+    )
+    assert revalidated.status_code == 304
+
+
+def test_small_and_identity_responses_are_untouched(client, auth_headers):
+    created = client.post(
+        "/blog/", json={"title": "t", "body": "b"}, headers=auth_headers
+    ).json()
+    small = client.get(
+        f"/blog/{created['id']}",
+        params={"fields": "id"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert "content-encoding" not in small.headers
+    assert small.headers["vary"] == "Accept-Encoding"
+
+    identity = client.get(
+        "/blog/", params={"limit": 50}, headers={"Accept-Encoding": "identity"}
+    )
+    assert "content-encoding" not in identity.headers
+    assert not identity.headers["etag"].startswith("W/")
+
+
+def test_exempt_route_is_never_compressed():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=10)
+
+    @app.get("/secret")
+    @compression.exempt
+    def secret():
+        return BIG
+
+    @app.get("/public")
+    def public():
+        return JSONResponse(BIG)
+
+    with TestClient(app) as test_client:
+        headers = {"Accept-Encoding": "gzip"}
+        assert (
+            "content-encoding"
+            not in test_client.get("/secret", headers=headers).headers
+        )
+        assert (
+            test_client.get("/public", headers=headers).headers["content-encoding"]
+            == "gzip"
+        )
+
+
+def test_streamed_chunks_are_flushed_one_by_one():
+    chunks = [b'{"part": %d, "pad": "%s"}\n' % (i, b"y" * 100) for i in range(5)]
+
+    async def produce():
+        for chunk in chunks:
+            yield chunk
+
+    async def app(scope, receive, send):
+        await StreamingResponse(produce(), media_type="application/json")(
+            scope, receive, send
+        )
+
+    middleware = CompressionMiddleware(app, minimum_size=10**6)
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", b"gzip")],
+    }
+    sent = []
+
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()  # the client never disconnects
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+
+    start = dict(sent[0]["headers"])
+    assert start[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in start
+    decoder = zlib.decompressobj(31)
+    bodies = [message for message in sent[1:] if message.get("body")]
+    # Every chunk decodes as soon as it arrives, despite the size threshold
+    for chunk, message in zip(chunks, bodies):
+        assert decoder.decompress(message["body"]) == chunk
+    assert sent[-1]["more_body"] is False
@@ -0,0 +1,30 @@
+# Tests for the SQLite engine profile and the read-only pool in database.py
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import database
+import settings
+
+
+def test_production_profile_pragmas():
+    with database.engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -65536
+
+
+def test_read_pool_is_separate_and_read_only(client):
+    assert database.read_engine is not database.engine
+    with database.read_engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM users")).scalar() >= 0
+        with pytest.raises(OperationalError, match="readonly"):
+            conn.execute(text("DELETE FROM users"))
+
+
+def test_unknown_profile_lists_the_allowed_ones(monkeypatch):
+    monkeypatch.setenv("DB_PROFILE", "fast")
+    with pytest.raises(ValueError, match="expected one of default, production"):
+        settings.env_choice("DB_PROFILE", "production", database.ENGINE_PROFILES)
@@ -0,0 +1,81 @@
+# Stored excerpts (Blog.excerpt / body_length) and the ?view=excerpt lists
+
+import migrations
+from conftest import count_queries
+from repository.blog import EXCERPT_LENGTH, excerpt
+from sqlalchemy import create_engine, text
+
+LONG_BODY = "é" + "word " * 200
+
+
+def test_excerpt_view_leaves_body_unloaded(client, auth_headers):
+    created = client.post(
+        "/blog/", json={"title": "long", "body": LONG_BODY}, headers=auth_headers
+    ).json()
+    with count_queries() as counter:
+        response = client.get(
+            "/blog/my-blogs", params={"view": "excerpt"}, headers=auth_headers
+        )
+    item = response.json()["items"][-1]
+    assert item == {
+        "title": "long",
+        "id": created["id"],
+        "user": created["user"],
+        "excerpt": LONG_BODY[: EXCERPT_LENGTH - 1] + "…",
+        "body_length": len(LONG_BODY),
+    }
+    assert "blogs.body AS" not in counter.statements[-1]
+
+    # An explicit fieldset wins over the view
+    listed = client.get("/blog/", params={"view": "excerpt", "fields": "id"})
+    assert all(set(item) == {"id"} for item in listed.json()["items"])
+    every_field = ",".join(("title", "body", "id", "user"))
+    listed = client.get("/blog/", params={"view": "excerpt", "fields": every_field})
+    assert all("body" in item for item in listed.json()["items"])
+
+
+def test_update_and_bulk_keep_excerpt_in_sync(client, auth_headers):
+    created = client.post(
+        "/blog/", json={"title": "t", "body": LONG_BODY}, headers=auth_headers
+    ).json()
+    client.put(
+        f"/blog/{created['id']}",
+        json={"title": "t", "body": "short"},
+        headers=auth_headers,
+    )
+    fields = {"fields": "excerpt,body_length"}
+    assert client.get(f"/blog/{created['id']}", params=fields).json() == {
+        "excerpt": "short",
+        "body_length": 5,
+    }
+
+    bulk = client.post(
+        "/blog/bulk", json=[{"title": "b", "body": LONG_BODY}], headers=auth_headers
+    ).json()
+    stored = client.get(f"/blog/{bulk['created'][0]}", params=fields).json()
+    assert stored == {"excerpt": excerpt(LONG_BODY), "body_length": len(LONG_BODY)}
+
+
+def test_migration_backfill_matches_excerpt(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path}/backfill.db"
+    bodies = ["", "short", LONG_BODY, "x" * EXCERPT_LENGTH, "x" * (EXCERPT_LENGTH + 1)]
+    monkeypatch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS[:2])
+    migrations.upgrade(url)
+    engine = create_engine(url)
+    try:
+        with engine.begin() as conn:
+            conn.execute(
+                text("INSERT INTO blogs (title, body) VALUES ('t', :body)"),
+                [{"body": body} for body in bodies],
+            )
+        monkeypatch.undo()
+        assert "blogs_excerpt" in migrations.upgrade(url)
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT body, excerpt, body_length FROM blogs ORDER BY id")
+            ).all()
+    finally:
+        engine.dispose()
+    assert [(r.excerpt, r.body_length) for r in rows] == [
+        (excerpt(body), len(body)) for body in bodies
+    ]
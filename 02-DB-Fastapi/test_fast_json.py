@@ -0,0 +1,51 @@
+# The fast_json dumpers must produce exactly what the pydantic models would
+
+import json
+
+import database
+import fast_json
+import models
+import schemas
+from repository import blog
+from pagination import PageParams
+
+
+def test_dumpers_match_schemas(client, auth_headers):
+    client.post("/blog/", json={"title": "é ✓", "body": "b"}, headers=auth_headers)
+    db = database.SessionLocal()
+    try:
+        page = blog.get_all(db, PageParams(limit=50))
+        assert fast_json.dump_blog_page(page) == schemas.BlogPage.model_validate(
+            page
+        ).model_dump(mode="json")
+        batch = blog.get_many(db, [item.id for item in page["items"]] + [0])
+        assert fast_json.dump_blog_batch(batch) == schemas.BlogBatch.model_validate(
+            batch
+        ).model_dump(mode="json")
+
+        user = db.query(models.User).first()
+        blogs = db.query(models.Blog).filter(models.Blog.user_id == user.id).all()
+        expected = schemas.ShowUser(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            blogs=[schemas.BlogInUser.model_validate(b) for b in blogs],
+            blogs_next_cursor="abc",
+        ).model_dump(mode="json")
+        assert fast_json.dump_user(user, blogs, "abc") == expected
+    finally:
+        db.close()
+
+
+def test_stdlib_fallback(monkeypatch):
+    monkeypatch.setattr(fast_json, "orjson", None)
+    response = fast_json.respond({"title": "é", "items": [1, None]})
+    assert json.loads(response.body) == {"title": "é", "items": [1, None]}
+    assert response.headers["content-type"] == "application/json"
+
+
+def test_list_route_keeps_etag(client):
+    response = client.get("/blog/")
+    assert response.status_code == 200
+    assert response.headers["etag"]
+    assert "items" in response.json()
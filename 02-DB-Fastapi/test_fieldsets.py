@@ -0,0 +1,102 @@
+# Sparse fieldsets (?fields=) on the blog and user read endpoints
+
+from pydantic import create_model
+
+import schemas
+from conftest import count_queries
+
+
+def sparse_model(model, fields):
+    """model reduced to fields, as the sparse response is documented to be."""
+    return create_model(
+        f"Sparse{model.__name__}",
+        **{
+            name: (info.annotation, ...)
+            for name, info in model.model_fields.items()
+            if name in fields
+        },
+    )
+
+
+def test_list_selects_only_requested_columns(client, auth_headers):
+    client.post("/blog/", json={"title": "t", "body": "secret"}, headers=auth_headers)
+    with count_queries() as counter:
+        response = client.get("/blog/", params={"fields": "id, title"})
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert items and all(set(item) == {"id", "title"} for item in items)
+
+    page_query = counter.statements[-1]
+    assert "blogs.body" not in page_query
+    assert "JOIN users" not in page_query
+    model = sparse_model(schemas.ShowBlog, ("id", "title"))
+    assert all(model.model_validate(item) for item in items)
+
+
+def test_user_field_joins_author(client, auth_headers):
+    created = client.post(
+        "/blog/", json={"title": "t", "body": "b"}, headers=auth_headers
+    ).json()
+    with count_queries() as counter:
+        response = client.get(f"/blog/{created['id']}", params={"fields": "user"})
+    assert response.json() == {"user": created["user"]}
+    assert "JOIN users" in counter.statements[-1]
+    assert "blogs.title" not in counter.statements[-1]
+
+    mine = client.get(
+        "/blog/my-blogs", params={"fields": "body"}, headers=auth_headers
+    ).json()
+    assert mine["items"] == [{"body": "b"}]
+
+
+def test_every_field_is_the_full_representation(client):
+    full = client.get("/blog/")
+    listed = client.get("/blog/", params={"fields": "user,id,body,title"})
+    assert listed.json() == full.json()
+    assert listed.headers["etag"] == full.headers["etag"]
+    sparse = client.get("/blog/", params={"fields": "id"})
+    assert sparse.headers["etag"] != full.headers["etag"]
+
+
+def test_user_without_blogs_skips_blog_query(client, auth_headers):
+    client.get("/user/me", headers=auth_headers)  # warm the token cache
+    with count_queries() as counter:
+        response = client.get(
+            "/user/me", params={"fields": "name"}, headers=auth_headers
+        )
+    assert response.json() == {"name": "Test"}
+    assert counter.count == 0
+
+    me = client.get("/user/me", params={"fields": "id,blogs"}, headers=auth_headers)
+    assert set(me.json()) == {"id", "blogs", "blogs_next_cursor"}
+
+    with count_queries() as counter:
+        by_id = client.get(
+            f"/user/{me.json()['id']}",
+            params={"fields": "email"},
+            headers=auth_headers,
+        )
+    assert set(by_id.json()) == {"email"}
+    assert "users.password" not in counter.statements[-1]
+
+
+def test_unknown_field_is_rejected(client):
+    response = client.get("/blog/", params={"fields": "id,password"})
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
+    assert client.get("/blog/", params={"fields": ","}).status_code == 400
+
+
+def test_openapi_documents_sparse_responses(client):
+    openapi = client.get("/openapi.json").json()
+    schemas_ = openapi["components"]["schemas"]
+    assert schemas_["SparseShowBlog"].get("required", []) == []
+    assert {"excerpt", "body_length"} <= set(schemas_["SparseShowBlog"]["properties"])
+    assert "stats" in schemas_["SparseShowUser"]["properties"]
+
+    get_blog = openapi["paths"]["/blog/{id}"]["get"]["responses"]["200"]["content"]
+    refs = {ref["$ref"] for ref in get_blog["application/json"]["schema"]["anyOf"]}
+    assert refs == {
+        "#/components/schemas/ShowBlog",
+        "#/components/schemas/SparseShowBlog",
+    }
@@ -0,0 +1,84 @@
+# Tests for group_commit (GROUP_COMMIT=1 write batching)
+
+import threading
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+import database
+import group_commit
+import schemas
+from repository import blog
+
+
+@pytest.fixture
+def identity(client, auth_headers):
+    me = client.get("/user/me", headers=auth_headers).json()
+    return schemas.UserResponse(id=me["id"], name=me["name"], email=me["email"])
+
+
+@pytest.fixture
+def committer():
+    committer = group_commit.GroupCommitter(
+        database.SQLALCHEMY_DATABASE_URL, max_delay=0.2, max_batch=64
+    )
+    commits = []
+    event.listen(committer.engine, "commit", lambda conn: commits.append(conn))
+    committer.commits = commits
+    yield committer
+    committer.close()
+
+
+def test_concurrent_writes_share_one_commit(committer, identity):
+    futures = [
+        committer.submit(blog.create, schemas.Blog(title=f"g{i}", body="b"), identity)
+        for i in range(10)
+    ]
+    missing = committer.submit(
+        blog.update, 10**9, schemas.Blog(title="x", body="y"), identity
+    )
+    ids = [future.result(timeout=5).id for future in futures]
+    with pytest.raises(HTTPException) as error:
+        missing.result(timeout=5)
+
+    assert error.value.status_code == 404
+    assert len(set(ids)) == 10
+    assert len(committer.commits) == 1
+    assert committer.stats()["largest_batch"] == 11
+
+
+def test_failed_job_does_not_undo_the_others(client, committer, identity):
+    created = committer.submit(
+        blog.create, schemas.Blog(title="kept", body="b"), identity
+    )
+    other_user = schemas.UserResponse(id=10**9, name="x", email="x@example.com")
+    denied = committer.submit(
+        blog.update, 1, schemas.Blog(title="x", body="y"), other_user
+    )
+    blog_id = created.result(timeout=5).id
+    with pytest.raises(HTTPException):
+        denied.result(timeout=5)
+    assert client.get(f"/blog/{blog_id}").json()["title"] == "kept"
+
+
+def test_routes_use_committer_when_enabled(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(group_commit, "GROUP_COMMIT", True)
+    results = []
+
+    def post(i):
+        response = client.post(
+            "/blog/", json={"title": f"r{i}", "body": "b"}, headers=auth_headers
+        )
+        results.append(response.status_code)
+
+    threads = [threading.Thread(target=post, args=(i,)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    group_commit.shutdown()
+
+    assert results == [201] * 5
+    items = client.get("/blog/my-blogs", headers=auth_headers).json()["items"]
+    assert sorted(item["title"] for item in items) == [f"r{i}" for i in range(5)]
@@ -0,0 +1,44 @@
+# Tests for the Server-Timing header and GET /metrics
+
+
+def _phases(response):
+    header = response.headers["server-timing"]
+    return {part.split(";")[0].strip(): part for part in header.split(",")}
+
+
+def test_server_timing_phases(client, auth_headers):
+    client.post("/blog/", json={"title": "t", "body": "b"}, headers=auth_headers)
+    response = client.get("/blog/my-blogs", headers=auth_headers)
+    assert response.status_code == 200
+    phases = _phases(response)
+    assert {"auth", "db", "endpoint", "serialize", "total"} <= phases.keys()
+    assert 'desc="' in phases["db"]
+
+
+def test_server_timing_reports_hashing(client):
+    response = client.post(
+        "/auth/signup",
+        json={"name": "n", "email": "timing@example.com", "password": "secret"},
+    )
+    assert response.status_code == 201
+    assert "hash" in _phases(response)
+
+
+def test_metrics_endpoint(client, auth_headers):
+    client.get("/blog/my-blogs", headers=auth_headers)
+    client.get("/blog/999999")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert (
+        'http_request_duration_seconds_bucket{method="GET",route="/blog/my-blogs",'
+        'le="+Inf"}' in body
+    )
+    assert 'http_requests_total{method="GET",route="/blog/{id}",status="404"}' in body
+    assert 'db_statements_total{route="/blog/my-blogs"}' in body
+    assert (
+        'http_request_phase_seconds_total{route="/blog/my-blogs",phase="auth"}' in body
+    )
+    assert "token_cache_hits_total" in body
+    assert "hash_pool_completed_total" in body
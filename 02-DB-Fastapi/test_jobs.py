@@ -0,0 +1,108 @@
+# Background jobs: the outbox, retries and shutdown drain (jobs.py)
+
+import asyncio
+import time
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import sessionmaker
+
+import database
+import jobs
+import migrations
+import models
+
+ran = []
+
+
+@jobs.handler("test_record")
+def _record(db, value):
+    ran.append(value)
+
+
+@jobs.handler("test_fail")
+def _fail(db, value):
+    raise ValueError(f"cannot handle {value}")
+
+
+def test_jobs_run_only_after_their_transaction_commits(client):
+    ran.clear()
+    db = database.SessionLocal()
+    try:
+        jobs.enqueue(db, "test_record", value="rolled back")
+        db.rollback()
+        jobs.enqueue(db, "test_record", value="committed")
+        db.commit()
+    finally:
+        db.close()
+    assert jobs.job_queue.join()
+    assert ran == ["committed"]
+
+    metrics = client.get("/metrics").text
+    assert "jobs_completed_total" in metrics
+    assert "jobs_depth 0" in metrics
+
+
+def test_failing_job_is_retried_then_kept(client, monkeypatch):
+    monkeypatch.setattr(jobs.job_queue, "max_attempts", 3)
+    monkeypatch.setattr(jobs.job_queue, "retry_delay", 0.01)
+    monkeypatch.setattr(jobs.job_queue, "poll_interval", 0.01)
+    before = jobs.job_queue.stats()
+
+    db = database.SessionLocal()
+    try:
+        jobs.enqueue(db, "test_fail", value=7)
+        db.commit()
+        deadline = time.monotonic() + 5
+        while jobs.job_queue.stats()["failed"] == before["failed"]:
+            assert time.monotonic() < deadline, "job was not given up on"
+            time.sleep(0.01)
+
+        job = db.scalars(select(models.Job).where(models.Job.kind == "test_fail")).one()
+        assert (job.attempts, job.run_after) == (3, None)
+        assert "cannot handle 7" in job.last_error
+        db.delete(job)
+        db.commit()
+    finally:
+        db.close()
+    assert jobs.job_queue.stats()["retried"] == before["retried"] + 2
+
+
+def test_stop_drains_due_jobs(tmp_path):
+    url = f"sqlite:///{tmp_path}/jobs.db"
+    migrations.upgrade(url)
+    ran.clear()
+
+    async def scenario():
+        # Never polls: only the shutdown drain can run the jobs
+        queue = jobs.JobQueue(workers=2, poll_interval=60)
+        await queue.start(url)
+        with sessionmaker(bind=queue.engine)() as db:
+            for value in range(5):
+                jobs.enqueue(db, "test_record", value=value)
+            db.commit()
+        await queue.stop()
+        return queue.stats()
+
+    stats = asyncio.run(scenario())
+    assert sorted(ran) == list(range(5))
+    assert stats["completed"] == 5 and stats["running"] == 0
+
+
+def test_idle_workers_do_not_take_the_write_lock(tmp_path):
+    url = f"sqlite:///{tmp_path}/idle.db"
+    migrations.upgrade(url)
+    statements = []
+
+    async def scenario():
+        queue = jobs.JobQueue(workers=2, poll_interval=0.01)
+        await queue.start(url)
+        event.listen(
+            queue.engine,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+        await asyncio.sleep(0.1)  # several polls of an empty outbox
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert statements == []
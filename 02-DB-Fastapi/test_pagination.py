@@ -0,0 +1,24 @@
+# Cursor validation shared by every paginated endpoint (pagination.py)
+
+import pytest
+
+from pagination import MAX_CURSOR_ID, encode_cursor
+
+
+@pytest.mark.parametrize("path", ["/blog/", "/blog/my-blogs", "/blog/search"])
+def test_out_of_range_cursors_are_rejected(client, auth_headers, path):
+    params = {"q": "anything"} if path.endswith("search") else {}
+    for cursor in (encode_cursor(-1), encode_cursor(MAX_CURSOR_ID + 1), "%%%"):
+        response = client.get(
+            path, params={**params, "after": cursor}, headers=auth_headers
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
+
+    response = client.get(
+        path,
+        params={**params, "after": encode_cursor(MAX_CURSOR_ID)},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["items"] == []
@@ -0,0 +1,122 @@
+# SQL statement budgets for the blog and user endpoints
+# A budget that stops holding usually means an N+1 lazy load crept back in
+
+import re
+
+import pytest
+
+BLOG_COUNT = 30
+
+
+@pytest.fixture
+def seeded(client, auth_headers):
+    for i in range(BLOG_COUNT):
+        response = client.post(
+            "/blog/", json={"title": f"t{i}", "body": "body"}, headers=auth_headers
+        )
+        assert response.status_code == 201
+    return auth_headers
+
+
+def test_list_blogs(client, seeded, assert_max_queries):
+    # version lookup for the ETag + the page itself
+    with assert_max_queries(2):
+        response = client.get("/blog/", params={"limit": BLOG_COUNT})
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert len(items) == BLOG_COUNT
+    assert all(item["user"]["email"] for item in items)
+
+
+def test_my_blogs(client, seeded, assert_max_queries):
+    with assert_max_queries(2):
+        response = client.get(
+            "/blog/my-blogs", params={"limit": BLOG_COUNT}, headers=seeded
+        )
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == BLOG_COUNT
+
+
+def test_get_blog_by_id(client, seeded, assert_max_queries):
+    blog_id = client.get("/blog/my-blogs", headers=seeded).json()["items"][0]["id"]
+    with assert_max_queries(2):
+        response = client.get(f"/blog/{blog_id}")
+    assert response.status_code == 200
+    assert response.json()["user"] is not None
+
+
+def test_create_blog(client, auth_headers, assert_max_queries):
+    with assert_max_queries(6):
+        response = client.post(
+            "/blog/", json={"title": "t", "body": "b"}, headers=auth_headers
+        )
+    assert response.status_code == 201
+    assert response.json()["user"]["id"]
+
+
+def test_current_user_profile(client, seeded, assert_max_queries):
+    with assert_max_queries(2):
+        response = client.get("/user/me", params={"limit": 50}, headers=seeded)
+    assert response.status_code == 200
+    assert len(response.json()["blogs"]) == BLOG_COUNT
+
+
+def test_user_by_id_and_email(client, seeded, assert_max_queries):
+    me = client.get("/user/me", headers=seeded).json()
+    with assert_max_queries(4):
+        response = client.get(f"/user/{me['id']}", headers=seeded)
+    assert response.status_code == 200
+    with assert_max_queries(3):
+        response = client.get(f"/user/email/{me['email']}", headers=seeded)
+    assert response.status_code == 200
+
+
+def _blog_statements(counter):
+    # Statements on the blogs table itself (not blogs_fts, user_blog_stats or
+    # resource_versions, even when they read blogs in a subquery)
+    target = re.compile(r"^(SELECT\b.*?\bFROM|UPDATE|DELETE FROM|INSERT INTO) blogs\b")
+    return [s for s in counter.statements if target.match(" ".join(s.split()))]
+
+
+def test_update_and_delete_are_one_blog_statement(
+    client, auth_headers, assert_max_queries
+):
+    blog_id = client.post(
+        "/blog/", json={"title": "t", "body": "b"}, headers=auth_headers
+    ).json()["id"]
+
+    # author stats + conditional UPDATE ... RETURNING + search job + version
+    with assert_max_queries(4) as counter:
+        response = client.put(
+            f"/blog/{blog_id}", json={"title": "t2", "body": "b2"}, headers=auth_headers
+        )
+    assert response.status_code == 202
+    assert [s.split()[0] for s in _blog_statements(counter)] == ["UPDATE"]
+
+    with assert_max_queries(4) as counter:
+        response = client.delete(f"/blog/{blog_id}", headers=auth_headers)
+    assert response.status_code == 200
+    assert [s.split()[0] for s in _blog_statements(counter)] == ["DELETE"]
+    assert client.get(f"/blog/{blog_id}").status_code == 404
+
+
+def test_refused_writes_tell_missing_from_forbidden(client, auth_headers):
+    owner_headers = auth_headers
+    blog_id = client.post(
+        "/blog/", json={"title": "mine", "body": "b"}, headers=owner_headers
+    ).json()["id"]
+    client.post(
+        "/auth/signup",
+        json={"name": "Other", "email": "other@example.com", "password": "secret"},
+    )
+    token = client.post(
+        "/auth/login", json={"email": "other@example.com", "password": "secret"}
+    ).json()["access_token"]
+    other = {"Authorization": f"Bearer {token}"}
+
+    edit = {"title": "stolen", "body": "b"}
+    assert client.put(f"/blog/{blog_id}", json=edit, headers=other).status_code == 403
+    assert client.delete(f"/blog/{blog_id}", headers=other).status_code == 403
+    assert client.put("/blog/999999", json=edit, headers=other).status_code == 404
+    assert client.delete("/blog/999999", headers=other).status_code == 404
+    assert client.get(f"/blog/{blog_id}").json()["title"] == "mine"
@@ -0,0 +1,98 @@
+# Every query the routers run must be served by an index: EXPLAIN QUERY PLAN
+# may not report a full table scan ("SCAN <table>") or a temporary b-tree
+# for sorting, and every "table.column = ?" filter must be part of the index
+# key used for that table. (Without an index on blogs.user_id, my-blogs is
+# planned as a rowid range search: no SCAN, but it still reads every blog.)
+# A primary key lookup (rowid=?) covers the other filters on that table, as
+# they are checked against at most one row (ownership-checked writes).
+# FTS5 virtual tables are exempt; they use their own index.
+
+import re
+
+import database
+from conftest import count_queries
+
+EQUALITY = re.compile(r"\b(\w+)\.(\w+) = \?")
+
+
+def _unindexed_filters(statement, details):
+    missing = []
+    for table, column in sorted(set(EQUALITY.findall(statement))):
+        key = "rowid=?" if column == "id" else f"{column}=?"
+        if any(
+            detail.startswith(f"SEARCH {table} ") and "(rowid=?)" in detail
+            for detail in details
+        ):
+            continue
+        if not any(
+            detail.startswith(f"SEARCH {table} ") and key in detail
+            for detail in details
+        ):
+            missing.append(f"{table}.{column} not in the index key")
+    return missing
+
+
+def _exercise_every_route(client, headers):
+    created = client.post(
+        "/blog/", json={"title": "plan", "body": "b"}, headers=headers
+    )
+    blog_id = created.json()["id"]
+    client.post("/blog/bulk", json=[{"title": "x", "body": "y"}] * 3, headers=headers)
+    page = client.get("/blog/", params={"limit": 2}).json()
+    client.get("/blog/", params={"limit": 2, "after": page["next_cursor"]})
+    client.get("/blog/my-blogs", params={"limit": 2}, headers=headers)
+    client.get("/blog/search", params={"q": "plan"})
+    client.get(f"/blog/{blog_id}")
+    client.get("/blog/batch", params={"ids": f"{blog_id},{blog_id + 1}"})
+    client.put(f"/blog/{blog_id}", json={"title": "p", "body": "b"}, headers=headers)
+    me = client.get("/user/me", headers=headers).json()
+    client.get(f"/user/{me['id']}", params={"limit": 2}, headers=headers)
+    client.get(f"/user/email/{me['email']}", headers=headers)
+    client.get(f"/user/{me['id']}/stats", headers=headers)
+    client.delete(f"/blog/{blog_id}", headers=headers)
+    client.post(
+        "/auth/signup",
+        json={"name": "p", "email": "plans@example.com", "password": "secret"},
+    )
+    client.post("/auth/login", json={"email": me["email"], "password": "secret"})
+    client.post("/auth/token", data={"username": me["email"], "password": "secret"})
+
+
+def test_router_queries_use_indexes(client, auth_headers):
+    # A fresh token so the user lookup in get_current_user runs as well
+    login = client.post(
+        "/auth/login",
+        json={
+            "email": client.get("/user/me", headers=auth_headers).json()["email"],
+            "password": "secret",
+        },
+    ).json()
+    headers = {"Authorization": f"Bearer {login['access_token']}"}
+
+    with count_queries() as counter:
+        _exercise_every_route(client, headers)
+
+    checked = 0
+    problems = []
+    with database.engine.connect() as conn:
+        for statement, parameters, executemany in counter.executions:
+            verb = statement.lstrip().split(None, 1)[0].upper()
+            if executemany or verb not in ("SELECT", "UPDATE", "DELETE"):
+                continue
+            plan = conn.exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + statement, parameters
+            ).all()
+            checked += 1
+            details = [row[-1] for row in plan]
+            if any("VIRTUAL TABLE" in detail for detail in details):
+                # Ranked FTS5 results are sorted by bm25() after the match
+                continue
+            for detail in details:
+                if detail.startswith("SCAN ") or "TEMP B-TREE" in detail:
+                    problems.append(f"{detail}\n    {statement}")
+            for missing in _unindexed_filters(statement, details):
+                problems.append(f"{missing} ({details})\n    {statement}")
+        conn.rollback()
+
+    assert checked >= 10
+    assert not problems, "\n".join(problems)
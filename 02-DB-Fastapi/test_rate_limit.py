@@ -0,0 +1,66 @@
+# Tests for the auth admission control in rate_limit.py
+
+import rate_limit
+from hashing import Hash
+from rate_limit import TokenBucketLimiter
+
+
+def test_bucket_spends_burst_then_refills(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    limiter = TokenBucketLimiter(rate=2, burst=3)
+
+    assert [limiter.acquire("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("a") == 0.5
+    # Other keys have their own bucket
+    assert limiter.acquire("b") == 0.0
+
+    now[0] += 0.5
+    assert limiter.acquire("a") == 0.0
+    assert limiter.stats() == {"allowed": 5, "rejected": 1, "keys": 2}
+
+
+def test_least_recently_used_keys_are_dropped():
+    limiter = TokenBucketLimiter(rate=1, burst=1, max_keys=2, shards=1)
+    for key in ("a", "b", "c"):
+        limiter.acquire(key)
+    assert limiter.stats()["keys"] == 2
+
+
+def test_email_limit_rejects_before_hashing(client, monkeypatch):
+    email = "stuffed@example.com"
+    response = client.post(
+        "/auth/signup", json={"name": "Victim", "email": email, "password": "secret"}
+    )
+    assert response.status_code == 201
+    monkeypatch.setattr(rate_limit, "email_limiter", TokenBucketLimiter(0.001, 2))
+
+    attempt = {"email": email.upper(), "password": "wrong"}
+    assert client.post("/auth/login", json=attempt).status_code == 401
+    assert client.post("/auth/login", json=attempt).status_code == 401
+
+    hashed = Hash.stats()["completed"]
+    response = client.post("/auth/login", json=attempt)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    form = {"username": email, "password": "secret"}
+    assert client.post("/auth/token", data=form).status_code == 429
+    assert Hash.stats()["completed"] == hashed
+
+
+def test_ip_limit_applies_to_every_auth_endpoint(client, monkeypatch):
+    monkeypatch.setattr(rate_limit, "ip_limiter", TokenBucketLimiter(0.001, 1))
+    signup = {"name": "x", "email": "ip-limited@example.com", "password": "secret"}
+    assert client.post("/auth/signup", json=signup).status_code == 201
+    assert client.post("/auth/signup", json=signup).status_code == 429
+    assert client.post("/auth/login", json=signup).status_code == 429
+
+    metrics = client.get("/metrics").text
+    assert "auth_rate_limit_ip_rejected_total 2" in metrics
+
+
+def test_disabled_limiter_admits_everything(client, monkeypatch):
+    monkeypatch.setattr(rate_limit, "AUTH_RATE_LIMIT", False)
+    monkeypatch.setattr(rate_limit, "ip_limiter", TokenBucketLimiter(0, 0))
+    attempt = {"email": "nobody@example.com", "password": "x"}
+    assert client.post("/auth/login", json=attempt).status_code == 401
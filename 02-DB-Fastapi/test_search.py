@@ -0,0 +1,78 @@
+# Tests for GET /blog/search and the FTS5 index maintenance
+
+from sqlalchemy import text
+
+import database
+import jobs
+import search
+
+
+def _search(client, q, **params):
+    # The index is maintained by background jobs after each write
+    assert jobs.job_queue.join()
+    response = client.get("/blog/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_index_follows_create_update_delete(client, auth_headers):
+    blog = client.post(
+        "/blog/",
+        json={"title": "Zebra crossing", "body": "stripes everywhere"},
+        headers=auth_headers,
+    ).json()
+    hits = _search(client, "zebra")["items"]
+    assert [hit["id"] for hit in hits] == [blog["id"]]
+
+    client.put(
+        f"/blog/{blog['id']}",
+        json={"title": "Giraffe", "body": "long necks"},
+        headers=auth_headers,
+    )
+    assert _search(client, "zebra")["items"] == []
+    assert "<b>necks</b>" in _search(client, "necks")["items"][0]["snippet"]
+
+    client.delete(f"/blog/{blog['id']}", headers=auth_headers)
+    assert _search(client, "giraffe")["items"] == []
+
+
+def test_search_pages_and_escapes_syntax(client, auth_headers):
+    for i in range(3):
+        client.post(
+            "/blog/",
+            json={"title": f"Walrus {i}", "body": "tusks"},
+            headers=auth_headers,
+        )
+    first = _search(client, "walrus", limit=2)
+    assert len(first["items"]) == 2
+    second = _search(client, "walrus", limit=2, after=first["next_cursor"])
+    assert len(second["items"]) == 1 and second["next_cursor"] is None
+
+    # FTS5 operators and stray quotes are searched as plain words
+    assert _search(client, 'walrus OR "NEAR(')["items"] == []
+
+
+def test_rebuild_restores_index(client, auth_headers):
+    client.post(
+        "/blog/", json={"title": "Narwhal", "body": "horn"}, headers=auth_headers
+    )
+    assert jobs.job_queue.join()  # or the reindex job would undo the wipe
+    db = database.SessionLocal()
+    try:
+        db.execute(text(f"DELETE FROM {search.FTS_TABLE}"))
+        db.commit()
+        assert _search(client, "narwhal")["items"] == []
+        assert search.rebuild(db) >= 1
+    finally:
+        db.close()
+    assert len(_search(client, "narwhal")["items"]) == 1
+
+
+def test_snippet_escapes_blog_markup(client, auth_headers):
+    client.post(
+        "/blog/",
+        json={"title": "Markup", "body": "<script>alert(1)</script> & pelican"},
+        headers=auth_headers,
+    )
+    snippet = _search(client, "pelican")["items"][0]["snippet"]
+    assert snippet == "&lt;script&gt;alert(1)&lt;/script&gt; &amp; <b>pelican</b>"
@@ -0,0 +1,66 @@
+# Request-scoped lazy sessions and pool checkout metrics (database.py)
+
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, model_validator
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import database
+from instrumentation import TimedRoute
+
+
+def _checkouts():
+    return sum(pool["checkouts"] for pool in database.pool_stats().values())
+
+
+def _checked_out():
+    return sum(pool["checked_out"] for pool in database.pool_stats().values())
+
+
+def test_authenticated_read_holds_one_connection(client, auth_headers):
+    # First use of the token: the user lookup shares the route's read session
+    before = _checkouts()
+    response = client.get("/user/me", headers=auth_headers)
+    assert response.status_code == 200
+    assert _checkouts() - before == 1
+    assert _checked_out() == 0
+
+
+def test_rejected_requests_never_check_out(client, auth_headers):
+    client.get("/user/me", headers=auth_headers)  # token now cached
+    before = _checkouts()
+    bad_token = {"Authorization": "Bearer not-a-jwt"}
+    assert client.get("/blog/my-blogs", headers=bad_token).status_code == 401
+    response = client.post("/blog/", json={"title": "t"}, headers=auth_headers)
+    assert response.status_code == 422
+    assert _checkouts() == before
+
+
+def test_connection_released_before_serialization(client):
+    seen = {}
+
+    class Probe(BaseModel):
+        value: int
+
+        @model_validator(mode="after")
+        def record(self):
+            seen["serialize"] = _checked_out()
+            return self
+
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/probe", response_model=Probe)
+    def probe(db: Session = Depends(database.get_read_db)):
+        value = db.execute(text("SELECT 1")).scalar_one()
+        seen["endpoint"] = _checked_out()
+        return {"value": value}
+
+    app = FastAPI()
+    app.include_router(router)
+    assert TestClient(app).get("/probe").json() == {"value": 1}
+    assert seen == {"endpoint": 1, "serialize": 0}
+
+    metrics = client.get("/metrics").text
+    assert 'db_pool_checkouts_total{pool="write"}' in metrics
+    assert "db_pool_hold_seconds_total" in metrics
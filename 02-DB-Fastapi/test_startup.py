@@ -0,0 +1,68 @@
+# Import and startup time budget
+#
+# Each measurement runs in a fresh interpreter so nothing is already cached
+# in sys.modules. The budgets are generous for a developer machine; tighten
+# or loosen them on CI with STARTUP_IMPORT_BUDGET / STARTUP_BUDGET (seconds).
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+
+IMPORT_BUDGET = float(os.getenv("STARTUP_IMPORT_BUDGET", "2.0"))
+STARTUP_BUDGET = float(os.getenv("STARTUP_BUDGET", "3.0"))
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.create_app()
+created = time.perf_counter()
+import database
+configured = "engine" in vars(database)
+from fastapi.testclient import TestClient
+client_ready = time.perf_counter()
+with TestClient(app) as client:
+    started_up = time.perf_counter()
+    status = client.get("/blog/").status_code
+print(json.dumps({
+    "import": imported - started,
+    "create_app": created - imported,
+    "lifespan": started_up - client_ready,
+    "configured_before_startup": configured,
+    "lazy_modules": sorted(m for m in ("passlib", "bcrypt", "jose") if m in sys.modules),
+    "status": status,
+}))
+"""
+
+
+def _probe(tmp_path) -> dict:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path}/startup.db")
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=APP_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_startup_is_lazy_and_within_budget(tmp_path):
+    timings = _probe(tmp_path)
+
+    # Building the app neither connects nor loads the crypto libraries;
+    # a read request does not need them either
+    assert timings["configured_before_startup"] is False
+    assert timings["lazy_modules"] == []
+    assert timings["status"] == 200
+
+    assert timings["import"] <= IMPORT_BUDGET, timings
+    startup = timings["import"] + timings["create_app"] + timings["lifespan"]
+    assert startup <= STARTUP_BUDGET, timings
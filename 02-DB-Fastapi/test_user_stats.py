@@ -0,0 +1,106 @@
+# Per-author blog statistics maintained on every blog write (user_stats.py)
+
+from sqlalchemy import text
+
+import database
+import schemas
+import user_stats
+from conftest import count_queries
+
+
+def _stats(client, headers):
+    me = client.get("/user/me", params={"fields": "id,stats"}, headers=headers).json()
+    response = client.get(f"/user/{me['id']}/stats", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == me["stats"]
+    return me["id"], schemas.UserStats.model_validate(response.json())
+
+
+def test_counters_follow_every_write(client, auth_headers):
+    user_id, stats = _stats(client, auth_headers)
+    assert (stats.blog_count, stats.body_bytes, stats.last_post_at) == (0, 0, None)
+
+    first = client.post(
+        "/blog/", json={"title": "a", "body": "12345"}, headers=auth_headers
+    ).json()["id"]
+    client.post(
+        "/blog/bulk",
+        json=[{"title": "b", "body": "xy"}, {"title": "c", "body": "z"}],
+        headers=auth_headers,
+    )
+    _, stats = _stats(client, auth_headers)
+    assert (stats.blog_count, stats.body_bytes) == (3, 8)
+    assert stats.last_post_at is not None
+
+    # Bytes, not characters: "é" is two bytes in UTF-8
+    client.put(f"/blog/{first}", json={"title": "a", "body": "é"}, headers=auth_headers)
+    _, stats = _stats(client, auth_headers)
+    assert (stats.blog_count, stats.body_bytes) == (3, 5)
+
+    client.delete(f"/blog/{first}", headers=auth_headers)
+    _, stats = _stats(client, auth_headers)
+    assert (stats.blog_count, stats.body_bytes) == (2, 3)
+
+
+def test_refused_update_leaves_counters_alone(client, auth_headers):
+    blog_id = client.post(
+        "/blog/", json={"title": "t", "body": "abc"}, headers=auth_headers
+    ).json()["id"]
+    client.post(
+        "/auth/signup",
+        json={"name": "S", "email": "stats@example.com", "password": "secret"},
+    )
+    token = client.post(
+        "/auth/login", json={"email": "stats@example.com", "password": "secret"}
+    ).json()["access_token"]
+    other = {"Authorization": f"Bearer {token}"}
+
+    edit = {"title": "t", "body": "much longer body"}
+    assert client.put(f"/blog/{blog_id}", json=edit, headers=other).status_code == 403
+    assert _stats(client, other)[1].body_bytes == 0
+    assert _stats(client, auth_headers)[1].body_bytes == 3
+
+
+def test_stats_endpoint_is_one_lookup(client, auth_headers):
+    client.post("/blog/", json={"title": "t", "body": "b"}, headers=auth_headers)
+    user_id, _ = _stats(client, auth_headers)
+
+    with count_queries() as counter:
+        response = client.get(f"/user/{user_id}/stats", headers=auth_headers)
+    # version lookup for the ETag + the stats row
+    assert counter.count == 2
+    assert "blogs." not in counter.statements[-1]
+
+    etag = response.headers["etag"]
+    revalidated = client.get(
+        f"/user/{user_id}/stats", headers={**auth_headers, "If-None-Match": etag}
+    )
+    assert revalidated.status_code == 304
+    assert client.get("/user/999999/stats", headers=auth_headers).status_code == 404
+
+
+def test_reconcile_reports_and_fixes_drift(client, auth_headers):
+    client.post("/blog/", json={"title": "t", "body": "1234"}, headers=auth_headers)
+    user_id, _ = _stats(client, auth_headers)
+
+    db = database.SessionLocal()
+    try:
+        assert user_stats.reconcile(db) == []
+        db.execute(
+            text("UPDATE user_blog_stats SET blog_count = 7 WHERE user_id = :id"),
+            {"id": user_id},
+        )
+        db.commit()
+
+        expected = [user_stats.Drift(user_id, 7, 1, 4, 4)]
+        assert user_stats.reconcile(db, fix=False) == expected
+        assert user_stats.reconcile(db) == expected
+        assert user_stats.reconcile(db) == []
+    finally:
+        db.close()
+    assert _stats(client, auth_headers)[1].blog_count == 1
+
+
+def test_stats_of_out_of_range_user_id(client, auth_headers):
+    response = client.get(f"/user/{2**70}/stats", headers=auth_headers)
+    assert response.status_code == 422
@@ -0,0 +1,100 @@
+# Conditional GET: ETag / Last-Modified on blog and user reads
+
+from conftest import count_queries
+
+
+def _create(client, headers, title="t"):
+    response = client.post(
+        "/blog/", json={"title": title, "body": "b"}, headers=headers
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_blog_etag_304_skips_blog_query(client, auth_headers):
+    blog_id = _create(client, auth_headers)
+    first = client.get(f"/blog/{blog_id}")
+    etag = first.headers["etag"]
+    assert etag.startswith('"') and "last-modified" in first.headers
+
+    with count_queries() as counter:
+        response = client.get(f"/blog/{blog_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert counter.count == 1, counter.statements
+
+
+def test_blog_etag_changes_on_write(client, auth_headers):
+    blog_id = _create(client, auth_headers)
+    etag = client.get(f"/blog/{blog_id}").headers["etag"]
+    client.put(
+        f"/blog/{blog_id}", json={"title": "new", "body": "b"}, headers=auth_headers
+    )
+    response = client.get(f"/blog/{blog_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["title"] == "new"
+    assert response.headers["etag"] != etag
+
+    etag = response.headers["etag"]
+    client.delete(f"/blog/{blog_id}", headers=auth_headers)
+    response = client.get(f"/blog/{blog_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 404
+
+
+def test_list_etag_depends_on_page_and_collection(client, auth_headers):
+    _create(client, auth_headers)
+    etag = client.get("/blog/", params={"limit": 5}).headers["etag"]
+    assert client.get("/blog/", params={"limit": 6}).headers["etag"] != etag
+    response = client.get(
+        "/blog/", params={"limit": 5}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    _create(client, auth_headers)
+    response = client.get(
+        "/blog/", params={"limit": 5}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+
+
+def test_user_if_modified_since(client, auth_headers):
+    me = client.get("/user/me", headers=auth_headers).json()
+    first = client.get(f"/user/{me['id']}", headers=auth_headers)
+    assert first.status_code == 200
+    headers = {**auth_headers, "If-Modified-Since": first.headers["last-modified"]}
+    response = client.get(f"/user/{me['id']}", headers=headers)
+    assert response.status_code == 304
+
+    # A new blog bumps the author's version
+    _create(client, auth_headers)
+    headers = {**auth_headers, "If-None-Match": first.headers["etag"]}
+    response = client.get(f"/user/{me['id']}", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["blogs"]) == 1
+
+
+def test_if_modified_since_without_zone_is_utc(client, auth_headers):
+    blog_id = _create(client, auth_headers)
+    headers = {"If-Modified-Since": "Wed, 21 Oct 2099 07:28:00 -0000"}
+    assert client.get(f"/blog/{blog_id}", headers=headers).status_code == 304
+    headers = {"If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 -0000"}
+    assert client.get(f"/blog/{blog_id}", headers=headers).status_code == 200
+
+
+def test_wildcard_if_none_match_on_missing_resource_is_404(client, auth_headers):
+    headers = {**auth_headers, "If-None-Match": "*"}
+    assert client.get("/blog/999999", headers=headers).status_code == 404
+    assert client.get("/user/999999/stats", headers=headers).status_code == 404
+
+    blog_id = _create(client, auth_headers)
+    assert client.get(f"/blog/{blog_id}", headers=headers).status_code == 304
+
+
+def test_deleted_blog_matches_no_conditional_get(client, auth_headers):
+    blog_id = _create(client, auth_headers)
+    last_modified = client.get(f"/blog/{blog_id}").headers["last-modified"]
+    client.delete(f"/blog/{blog_id}", headers=auth_headers)
+
+    for headers in ({"If-None-Match": "*"}, {"If-Modified-Since": last_modified}):
+        assert client.get(f"/blog/{blog_id}", headers=headers).status_code == 404
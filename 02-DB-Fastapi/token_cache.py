@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified bearer tokens.
+
+    Maps a raw JWT to the identity it resolved to, so repeated requests with
+    the same token skip signature verification, JSON decoding and the user
+    lookup. An entry lives until the token's own `exp` (or `max_ttl`, if that
+    is shorter) and can be dropped early with invalidate_user().
+
+    Thread safe: sync routes resolve users from threadpool workers.
+    """
+
+    def __init__(self, maxsize: int = 1024, max_ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[str, Tuple[object, int, float]]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[object]:
+        """Return the cached identity for token, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            identity, user_id, expires_at = entry
+            if expires_at <= time.time():
+                self._remove(token, user_id)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return identity
+
+    def put(self, token: str, identity, user_id: int, exp: Optional[float]) -> None:
+        """
+        Cache identity for token.
+
+        Args:
+            token: Raw JWT string
+            identity: Resolved user identity to return on later hits
+            user_id: ID used by invalidate_user()
+            exp: Token expiry as a unix timestamp (the JWT `exp` claim)
+        """
+        if self.maxsize <= 0:
+            return
+        expires_at = time.time() + self.max_ttl
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        with self._lock:
+            if token in self._entries:
+                self._remove(token, self._entries[token][1])
+            self._entries[token] = (identity, user_id, expires_at)
+            self._tokens_by_user.setdefault(user_id, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                old_token, (_, old_user_id, _) = next(iter(self._entries.items()))
+                self._remove(old_token, old_user_id)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop every cached token that resolved to user_id."""
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token, user_id)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current size."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, token: str, user_id: int) -> None:
+        # Caller holds the lock
+        self._entries.pop(token, None)
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
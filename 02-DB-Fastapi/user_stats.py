@@ -0,0 +1,219 @@
+# Per-author blog statistics (blog count, total body bytes, last post time)
+#
+# user_blog_stats holds one row per author, created by migrations.py. The
+# blog repository updates it in the same transaction as every blog write
+# (create, bulk create, update, delete), so reading an author's stats is a
+# single primary-key lookup instead of loading and counting their blogs.
+#
+# The counters can drift if blogs are written behind the repository's back
+# (SQL shell, restored backups). Recompute them from the blogs table and
+# print every author whose stored values were wrong with:
+#
+#     python user_stats.py reconcile [--dry-run]
+#
+# last_post_at cannot be recomputed (blogs carry no timestamp) and is left
+# untouched by reconcile().
+
+import argparse
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional
+from sqlalchemy import LargeBinary, cast, func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+import models
+
+_table = models.UserBlogStats.__table__
+
+
+def body_bytes(body: Optional[str]) -> int:
+    """Size of a blog body as stored (UTF-8 bytes)."""
+    return len(body.encode("utf-8")) if body else 0
+
+
+def _stored_bytes(column):
+    # SQL equivalent of body_bytes(): length() of a BLOB counts bytes
+    return func.coalesce(func.length(cast(column, LargeBinary)), 0)
+
+
+def record_posts(db: Session, user_id: int, count: int, size: int) -> None:
+    """
+    Count count new blogs of size body bytes in total (no commit).
+
+    The author's row is created on their first blog.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    stmt = insert(_table).values(
+        user_id=user_id, blog_count=count, body_bytes=size, last_post_at=now
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[_table.c.user_id],
+        set_={
+            "blog_count": _table.c.blog_count + stmt.excluded.blog_count,
+            "body_bytes": _table.c.body_bytes + stmt.excluded.body_bytes,
+            "last_post_at": stmt.excluded.last_post_at,
+        },
+    )
+    db.execute(stmt)
+
+
+def record_removal(db: Session, user_id: int, size: int) -> None:
+    """Uncount one deleted blog of size body bytes (no commit)."""
+    db.execute(
+        update(_table)
+        .where(_table.c.user_id == user_id)
+        .values(
+            blog_count=_table.c.blog_count - 1,
+            body_bytes=_table.c.body_bytes - size,
+        )
+    )
+
+
+def record_rewrite(db: Session, blog_id: int, user_id: int, size: int) -> None:
+    """
+    Account for a blog body being replaced by one of size bytes (no commit).
+
+    Must run before the blog row is updated: the old size is read from it in
+    the same statement. Nothing changes unless user_id owns the blog.
+    """
+    old_size = (
+        select(_stored_bytes(models.Blog.body))
+        .where(models.Blog.id == blog_id, models.Blog.user_id == user_id)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(_table)
+        .where(_table.c.user_id == user_id)
+        .values(body_bytes=_table.c.body_bytes + size - func.coalesce(old_size, size))
+    )
+
+
+def get(db: Session, user_id: int) -> Optional[dict]:
+    """
+    Return the stats of a user shaped like schemas.UserStats.
+
+    Returns:
+        Dict of JSON types, zeros for a user without blogs, or None if the
+        user does not exist
+    """
+    row = db.execute(
+        select(
+            models.User.id,
+            _table.c.blog_count,
+            _table.c.body_bytes,
+            _table.c.last_post_at,
+        )
+        .outerjoin(_table, _table.c.user_id == models.User.id)
+        .where(models.User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+    last_post_at = None
+    if row.last_post_at is not None:
+        # The JSON form pydantic gives an aware UTC datetime
+        last_post_at = row.last_post_at.isoformat() + "Z"
+    return {
+        "blog_count": row.blog_count or 0,
+        "body_bytes": row.body_bytes or 0,
+        "last_post_at": last_post_at,
+    }
+
+
+@dataclass(frozen=True)
+class Drift:
+    user_id: int
+    stored_count: int
+    actual_count: int
+    stored_bytes: int
+    actual_bytes: int
+
+
+def reconcile(db: Session, fix: bool = True) -> List[Drift]:
+    """
+    Recompute every author's counters from the blogs table.
+
+    Args:
+        db: Database session
+        fix: Store the recomputed values (and commit)
+
+    Returns:
+        One Drift per user whose stored counters were wrong
+    """
+    actual = {
+        row.user_id: (row.blog_count, row.body_bytes)
+        for row in db.execute(
+            select(
+                models.Blog.user_id,
+                func.count().label("blog_count"),
+                func.sum(_stored_bytes(models.Blog.body)).label("body_bytes"),
+            )
+            .where(models.Blog.user_id.is_not(None))
+            .group_by(models.Blog.user_id)
+        )
+    }
+    stored = {
+        row.user_id: (row.blog_count, row.body_bytes)
+        for row in db.execute(
+            select(_table.c.user_id, _table.c.blog_count, _table.c.body_bytes)
+        )
+    }
+    drift = []
+    for user_id in sorted(actual.keys() | stored.keys()):
+        stored_count, stored_bytes = stored.get(user_id, (0, 0))
+        actual_count, actual_bytes = actual.get(user_id, (0, 0))
+        if (stored_count, stored_bytes) != (actual_count, actual_bytes):
+            drift.append(
+                Drift(user_id, stored_count, actual_count, stored_bytes, actual_bytes)
+            )
+    if fix and drift:
+        stmt = insert(_table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[_table.c.user_id],
+            set_={
+                "blog_count": stmt.excluded.blog_count,
+                "body_bytes": stmt.excluded.body_bytes,
+            },
+        )
+        db.execute(
+            stmt,
+            [
+                {
+                    "user_id": d.user_id,
+                    "blog_count": d.actual_count,
+                    "body_bytes": d.actual_bytes,
+                }
+                for d in drift
+            ],
+        )
+        db.commit()
+    return drift
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage per-author blog statistics")
+    parser.add_argument("command", choices=["reconcile"])
+    parser.add_argument(
+        "--dry-run", action="store_true", help="report drift without fixing it"
+    )
+    args = parser.parse_args()
+
+    import database
+    import migrations
+
+    migrations.upgrade()
+    db = database.SessionLocal()
+    try:
+        drift = reconcile(db, fix=not args.dry_run)
+    finally:
+        db.close()
+    for d in drift:
+        print(
+            f"user {d.user_id}: blog_count {d.stored_count} -> {d.actual_count}, "
+            f"body_bytes {d.stored_bytes} -> {d.actual_bytes}"
+        )
+    verb = "found" if args.dry_run else "fixed"
+    print(f"Drift {verb} for {len(drift)} user(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# Per-resource version tracking for conditional GET (ETag / Last-Modified)
+#
+# Write paths call bump() inside their own transaction; read handlers call
+# check() before touching the resource. When the client already holds the
+# current version, check() returns a 304 after a single primary-key lookup,
+# so neither the resource rows nor the response body are produced.
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Collection, Optional, Tuple
+from fastapi import Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+import models
+from pagination import PageParams
+
+BLOGS = "blogs"
+
+_table = models.ResourceVersion.__table__
+
+
+def blog_key(blog_id: int) -> str:
+    return f"blog:{blog_id}"
+
+
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def page_variant(page: PageParams) -> str:
+    """ETag variant for a paginated representation."""
+    return f"{page.limit}:{page.after_id}"
+
+
+def bump(db: Session, *keys: str, deleted: Collection[str] = ()) -> None:
+    """
+    Increment the version of every key in one statement (no commit).
+
+    Missing keys are created at version 1.
+
+    Args:
+        db: Database session
+        keys: Resource keys written by the transaction
+        deleted: Those of keys whose resource the transaction deleted
+    """
+    if not keys:
+        return
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    stmt = insert(_table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[_table.c.key],
+        set_={
+            "version": _table.c.version + 1,
+            "updated_at": stmt.excluded.updated_at,
+            "deleted": stmt.excluded.deleted,
+        },
+    )
+    db.execute(
+        stmt,
+        [
+            {"key": key, "version": 1, "updated_at": now, "deleted": key in deleted}
+            for key in keys
+        ],
+    )
+
+
+def get(db: Session, key: str) -> Tuple[int, Optional[datetime], bool]:
+    """
+    Return (version, updated_at, deleted) for key; (0, None, False) if never
+    bumped.
+    """
+    row = db.execute(
+        select(_table.c.version, _table.c.updated_at, _table.c.deleted).where(
+            _table.c.key == key
+        )
+    ).first()
+    if row is None:
+        return 0, None, False
+    return row.version, row.updated_at.replace(tzinfo=timezone.utc), row.deleted
+
+
+def make_etag(key: str, version: int, variant: str = "") -> str:
+    """Strong ETag for one version of a resource (variant: e.g. page params)."""
+    digest = hashlib.sha1(f"{key}:{version}:{variant}".encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def _not_modified(request: Request, etag: str, updated_at: Optional[datetime]):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since and uses the
+        # weak comparison (RFC 9110): compression.py sends W/"..." for the
+        # compressed representation of the same version
+        candidates = [
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        ]
+        return "*" in candidates or etag in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and updated_at is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            # "-0000" dates parse as naive; they are UTC all the same
+            since = since.replace(tzinfo=timezone.utc)
+        return updated_at.replace(microsecond=0) <= since
+    return False
+
+
+def check(
+    db: Session, request: Request, response: Response, key: str, variant: str = ""
+) -> Optional[Response]:
+    """
+    Answer a conditional GET for key.
+
+    Args:
+        db: Database session
+        request: Incoming request (If-None-Match / If-Modified-Since)
+        response: FastAPI response; validator headers are added to it
+        key: Resource key, e.g. versions.blog_key(id)
+        variant: Extra input that changes the representation (page params)
+
+    Returns:
+        A 304 response to return as-is, or None to build the full response
+    """
+    version, updated_at, deleted = get(db, key)
+    headers = {"ETag": make_etag(key, version, variant)}
+    if updated_at is not None:
+        headers["Last-Modified"] = format_datetime(updated_at, usegmt=True)
+    # Never written or deleted: there is no current representation to match
+    # ("If-None-Match: *" included); the handler answers 404 if it is gone
+    if version and not deleted and _not_modified(request, headers["ETag"], updated_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None